@@ -0,0 +1,94 @@
+"""
+Benchmark concurrent bookings, each worker on a connection of its own, when every worker books a Room of its own and
+when every worker books the same Room. Bookings of one Room wait on each other's lock, bookings of different Rooms
+do not, so only the first scales with workers.
+
+Writes Reservations, far in the future, of Rooms numbered BENCH-<n>, which are created if missing. Run from src
+against a migrated scratch database:
+
+    $ python3 -m benchmarks.booking_concurrency --workers 1 2 4 8 --bookings 25
+
+Every booking also refreshes the current and upcoming view, and refreshes of one view wait on each other.
+Pass --without-view-refresh to measure bookings alone.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reservations.settings')
+
+import django  # NOQA isort:skip
+django.setup()
+
+from django.db import connection  # NOQA isort:skip
+from django.db.models import Max, signals  # NOQA isort:skip
+
+from reservations.api.models import Guest, Reservation, Room, reservation_saved  # NOQA isort:skip
+
+
+def rooms(count):
+    return [Room.objects.get_or_create(number='BENCH-{}'.format(number), hotel=None)[0] for number in range(count)]
+
+
+def first_free_night(room_ids):
+    # Bookings are made from after every earlier run's, so no run conflicts with another.
+    latest = Reservation.objects.filter(room_id__in=room_ids).aggregate(latest=Max('out_date'))['latest']
+    return max(latest or date(2100, 1, 1), date(2100, 1, 1))
+
+
+def run(workers, bookings, same_room):
+    """
+    Bookings per second of the given number of workers, each making the given number of one night bookings.
+    """
+    # A Guest and nights of each worker's own, so workers wait on nothing but the lock of a Room they share:
+    # not on stay statistics of the same Guest, nor on occupancy counts of the same nights.
+    guests = [Guest.objects.get_or_create(first_name='Bench', last_name=str(worker))[0] for worker in range(workers)]
+    booked_rooms = rooms(1 if same_room else workers)
+    start_night = first_free_night([room.pk for room in booked_rooms])
+    barrier = threading.Barrier(workers + 1)
+
+    def work(worker):
+        room = booked_rooms[0 if same_room else worker]
+        try:
+            barrier.wait()
+            for booking in range(bookings):
+                # Workers take turns at nights, leaving a night between bookings.
+                night = start_night + timedelta(days=2 * (booking * workers + worker))
+                Reservation.objects.create(in_date=night, out_date=night + timedelta(days=1), guest=guests[worker], room=room)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return round(workers * bookings / (time.perf_counter() - start), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--bookings', type=int, default=25, help='Bookings made by each worker.')
+    parser.add_argument('--without-view-refresh', action='store_true')
+    args = parser.parse_args()
+
+    if args.without_view_refresh:
+        signals.post_save.disconnect(reservation_saved, sender=Reservation)
+
+    results = {}
+    for workers in args.workers:
+        results[workers] = {
+            'own_room_bookings_per_second': run(workers, args.bookings, same_room=False),
+            'same_room_bookings_per_second': run(workers, args.bookings, same_room=True),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
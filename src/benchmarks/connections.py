@@ -0,0 +1,98 @@
+"""
+Benchmark connection setup and statement planning for the Reservation hot paths,
+with and without pooled connections and prepared statements.
+
+Run from src against a migrated database:
+
+    $ python3 -m benchmarks.connections --iterations 500
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reservations.settings')
+
+import django  # NOQA isort:skip
+django.setup()
+
+from django.db import connections, transaction  # NOQA isort:skip
+from django.db.utils import load_backend  # NOQA isort:skip
+from django.utils import timezone  # NOQA isort:skip
+
+from reservations.api.models import (  # NOQA isort:skip
+    CURRENT_AND_UPCOMING_DEFAULT_DAYS, CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT, ROOM_NIGHT_CLAIM_STATEMENT, Room
+)
+
+
+def connection_setup(engine, iterations):
+    """
+    Mean seconds to open a connection, run a trivial query and close it again, as every request does.
+    """
+    backend = load_backend(engine)
+    wrapper = backend.DatabaseWrapper(dict(connections['default'].settings_dict, ENGINE=engine), 'benchmark')
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        wrapper.close()
+    return (time.perf_counter() - start) / iterations
+
+
+def planning(statement, params, iterations):
+    """
+    Median planning and total execution milliseconds of a statement, executed ad hoc and prepared.
+    Each execution is rolled back, so statements which write leave nothing behind.
+    """
+    connection = connections['default']
+    # The ad hoc form of the statement takes named parameters in place of $1, $2, ...
+    ad_hoc_sql = re.sub(r'\$(\d+)', r'%(\1)s', statement.sql)
+    ad_hoc_params = {str(index + 1): param for index, param in enumerate(params)}
+    statement.prepare()
+
+    results = {}
+    for name, sql, sql_params in (('ad hoc', ad_hoc_sql, ad_hoc_params), ('prepared', statement.execute_sql, params)):
+        planning_times = []
+        execution_times = []
+        for _ in range(iterations):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + sql, sql_params)
+                plan = cursor.fetchone()[0]
+                transaction.set_rollback(True)
+            plan = plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+            planning_times.append(plan['Planning Time'])
+            execution_times.append(plan['Planning Time'] + plan['Execution Time'])
+        results[name] = (statistics.median(planning_times), statistics.median(execution_times))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    print('Connection setup, mean per request')
+    for engine in ('django.db.backends.postgresql', 'reservations.db.backends.postgresql_pool'):
+        print('  {:<45} {:8.3f} ms'.format(engine, connection_setup(engine, args.iterations) * 1000))
+
+    today = timezone.now().date()
+    statements = [(CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT, [CURRENT_AND_UPCOMING_DEFAULT_DAYS])]
+    # Claiming nights is the conflict check of every booking. Nights must be of a Room which exists.
+    room_id = Room.objects.values_list('pk', flat=True).first()
+    if room_id is None:
+        print('No Rooms, so claiming nights is not benchmarked')
+    else:
+        statements.insert(0, (ROOM_NIGHT_CLAIM_STATEMENT, [uuid.uuid4(), room_id, today, today + timedelta(days=3), timezone.now()]))
+    for statement, params in statements:
+        print('{}, median planning / planning + execution'.format(statement.name))
+        for name, (planning_time, total_time) in planning(statement, params, args.iterations).items():
+            print('  {:<45} {:8.3f} ms / {:8.3f} ms'.format(name, planning_time, total_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark Guest name search against a large Guest table.
+
+Guests are generated inside a transaction which is rolled back afterwards, so the database is left as it was.
+Searches are made for the names of randomly sampled Guests: with a typo for similarity searches, and by their first
+few letters for prefix searches.
+Run from src against a migrated database:
+
+    $ python3 -m benchmarks.guest_search --guests 1000000
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reservations.settings')
+
+import django  # NOQA isort:skip
+django.setup()
+
+from django.db import connection, transaction  # NOQA isort:skip
+
+from reservations.api.models import Guest  # NOQA isort:skip
+
+# Generated names are two or three syllables of a consonant, a vowel and optionally another consonant.
+CONSONANTS = 'bcdfghjklmnprstvwz'
+VOWELS = 'aeiou'
+
+
+class Rollback(Exception):
+    pass
+
+
+def generate_guests(count):
+    syllable = (
+        "substr('{0}', 1 + (random() * {1})::int, 1) || substr('{2}', 1 + (random() * {3})::int, 1) || "
+        "CASE WHEN random() < 0.5 THEN substr('{0}', 1 + (random() * {1})::int, 1) ELSE '' END"
+    ).format(CONSONANTS, len(CONSONANTS) - 1, VOWELS, len(VOWELS) - 1)
+    name = "initcap({0} || {0} || CASE WHEN random() < 0.5 THEN {0} ELSE '' END)".format(syllable)
+
+    with connection.cursor() as cursor:
+        # One in ten Guests is mononymous.
+        cursor.execute("""
+          INSERT INTO {} (id, created, first_name, last_name)
+          SELECT md5(random()::text || n)::uuid, now(), {},
+                 CASE WHEN n %% 10 = 0 THEN NULL ELSE {} END
+          FROM generate_series(1, %s) AS n
+        """.format(Guest._meta.db_table, name, name), [count])
+        cursor.execute('ANALYZE {}'.format(Guest._meta.db_table))
+
+
+def typo(name):
+    # Drop a letter from the middle of the name.
+    return name[:len(name) // 2] + name[len(name) // 2 + 1:]
+
+
+def searches(sample):
+    yield 'similar, last name', [(typo(guest.last_name or guest.first_name), False) for guest in sample]
+    yield 'similar, full name', [
+        ('{} {}'.format(typo(guest.first_name), guest.last_name or ''), False) for guest in sample
+    ]
+    yield 'prefix, 3 letters', [(guest.first_name[:3], True) for guest in sample]
+    yield 'prefix, full name', [
+        ('{} {}'.format(guest.first_name[:3], (guest.last_name or '')[:2]), True) for guest in sample
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guests', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=25)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            start = time.perf_counter()
+            generate_guests(args.guests)
+            print('Generated {} Guests in {:.1f} s'.format(args.guests, time.perf_counter() - start))
+
+            sample = list(Guest.objects.order_by('?')[:args.iterations])
+            for name, queries in searches(sample):
+                timings = []
+                found = 0
+                for query, prefix in queries:
+                    start = time.perf_counter()
+                    results = list(Guest.objects.search(query, prefix=prefix)[:args.limit])
+                    timings.append(time.perf_counter() - start)
+                    found += bool(results)
+                print('  {:<20} median {:7.2f} ms, 95th percentile {:7.2f} ms, {} of {} found'.format(
+                    name, statistics.median(timings) * 1000,
+                    sorted(timings)[int(len(timings) * 0.95)] * 1000, found, len(queries)
+                ))
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark cold start and steady state throughput of serving the API with runserver and with gunicorn.
+
+Each server is started in turn with throttling turned off (see benchmarks.serving_settings). Reports the seconds from
+starting the server to its first successful response, the latency of the first request to each endpoint against
+the median of the requests after it, and the throughput and latency of concurrent clients reading current and upcoming
+Reservations over keep-alive connections.
+Run from src against a migrated database with Reservations to read:
+
+    $ python3 -m benchmarks.serving --clients 8 --seconds 20
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+HOST = 'localhost'
+PORT = 8123
+
+ENDPOINTS = (
+    '/reservations/current_and_upcoming',
+    '/reservations/arrivals',
+    '/rooms',
+    '/guests',
+)
+
+SERVERS = (
+    ('runserver', [sys.executable, 'manage.py', 'runserver', '{}:{}'.format(HOST, PORT)]),
+    ('gunicorn', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', '{}:{}'.format(HOST, PORT),
+                  '--access-logfile', '/dev/null', 'reservations.wsgi']),
+)
+
+
+def get(connection, path):
+    """
+    Milliseconds to GET a path over the given connection, reconnecting if the server has closed it.
+    """
+    start = time.perf_counter()
+    try:
+        connection.request('GET', path, headers={'Host': HOST})
+        response = connection.getresponse()
+    except (http.client.RemoteDisconnected, ConnectionError):
+        # runserver closes every connection after its response, so the request is made again on a new one.
+        connection.close()
+        connection.request('GET', path, headers={'Host': HOST})
+        response = connection.getresponse()
+    response.read()
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status != 200:
+        raise RuntimeError('GET {} responded {}'.format(path, response.status))
+    return elapsed
+
+
+def wait_until_serving(process, timeout=120):
+    """
+    Seconds until the server first responds successfully.
+    """
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError('Server exited with {}'.format(process.returncode))
+        try:
+            connection = http.client.HTTPConnection(HOST, PORT, timeout=timeout)
+            # The API root is cheap and not one of the endpoints benchmarked below.
+            connection.request('OPTIONS', '/', headers={'Host': HOST})
+            if connection.getresponse().status < 500:
+                return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('Server did not start within {} seconds'.format(timeout))
+
+
+def first_requests(repeat):
+    """
+    Latency of the first request to each endpoint and the median of those after it, in milliseconds.
+    """
+    results = {}
+    for path in ENDPOINTS:
+        connection = http.client.HTTPConnection(HOST, PORT)
+        latencies = [get(connection, path) for _ in range(repeat + 1)]
+        connection.close()
+        results[path] = {'first_ms': round(latencies[0], 1), 'median_after_ms': round(statistics.median(latencies[1:]), 1)}
+    return results
+
+
+def throughput(clients, seconds):
+    """
+    Requests per second and latency percentiles of concurrent clients reading current and upcoming Reservations.
+    """
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        connection = http.client.HTTPConnection(HOST, PORT)
+        own = []
+        while time.perf_counter() < deadline:
+            own.append(get(connection, ENDPOINTS[0]))
+        connection.close()
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(latencies[len(latencies) // 2], 1),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20, help='Requests to each endpoint after the first.')
+    args = parser.parse_args()
+
+    environment = dict(os.environ, DJANGO_SETTINGS_MODULE='benchmarks.serving_settings')
+    results = {}
+    for name, command in SERVERS:
+        # A process group of its own, so runserver's reloader and gunicorn's workers are stopped along with it.
+        process = subprocess.Popen(command, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                   start_new_session=True)
+        try:
+            results[name] = {'ready_seconds': round(wait_until_serving(process), 2)}
+            results[name]['first_requests'] = first_requests(args.repeat)
+            results[name]['throughput'] = throughput(args.clients, args.seconds)
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait()
+        time.sleep(1)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+"""
+Settings for benchmarking the API under load, without the throttling which would otherwise reject most requests.
+"""
+from reservations.settings import *  # NOQA
+
+# View sets which declare their own throttles are held to these rates.
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_THROTTLE_CLASSES=(), DEFAULT_THROTTLE_RATES={  # NOQA
+    'anon': '1000000/second',
+    'user': '1000000/second',
+})
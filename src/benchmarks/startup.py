@@ -0,0 +1,111 @@
+"""
+Report what starting the application costs in imports, for each settings profile: the full profile web processes
+load, and the lean profile management commands and workers load (see reservations/worker_settings.py).
+
+Each profile is started in a fresh interpreter with `python -X importtime`, set up, and has a management command
+loaded without running it. Reports the fastest of several starts, and the import milliseconds of each package, most
+expensive first, under each profile. Run from src, without needing a database:
+
+    $ python3 -m benchmarks.startup --runs 5 --command archive_reservations
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = (
+    ('full', 'reservations.settings'),
+    ('lean', 'reservations.worker_settings'),
+)
+
+STARTUP = """
+import django
+django.setup()
+from django.core.management import get_commands, load_command_class
+load_command_class(get_commands()[{command!r}], {command!r})
+"""
+
+# `import time: <self microseconds> | <cumulative microseconds> | <indented module name>`
+IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+\d+ \| +(\S+)')
+
+
+def start(settings_module, command):
+    """
+    Start the application in a fresh interpreter.
+    :return: tuple of seconds taken and dict of module name to microseconds spent importing it, excluding its imports
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module, PYTHONPATH=SRC)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP.format(command=command)],
+        cwd=SRC, env=env, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError('Starting with {} failed:\n{}'.format(settings_module, result.stderr))
+    return seconds, {match.group(2): int(match.group(1)) for match in map(IMPORT_TIME.match, result.stderr.splitlines()) if match}
+
+
+def by_package(import_times, depth):
+    """
+    Sum import times by package, naming each package by the first `depth` parts of its modules' names.
+    :return: dict of package name to milliseconds
+    """
+    packages = defaultdict(float)
+    for module, microseconds in import_times.items():
+        packages['.'.join(module.split('.')[:depth])] += microseconds / 1000
+    return packages
+
+
+def profile(command, runs, depth):
+    """
+    Start with each settings profile in turn, so each is slowed alike by anything else running.
+    :return: list of tuples of the profile's name, fastest seconds to start, modules imported,
+             and fastest import milliseconds of each package
+    """
+    results = {name: ([], [], defaultdict(list)) for name, _ in PROFILES}
+    for _ in range(runs):
+        for name, settings_module in PROFILES:
+            seconds, modules, packages = results[name]
+            run_seconds, import_times = start(settings_module, command)
+            seconds.append(run_seconds)
+            modules.append(len(import_times))
+            for package, milliseconds in by_package(import_times, depth).items():
+                packages[package].append(milliseconds)
+
+    reports = []
+    for name, _ in PROFILES:
+        seconds, modules, packages = results[name]
+        # Packages imported in only some runs count as not imported in the others.
+        reports.append((name, min(seconds), max(modules), {
+            package: min(times + [0.0] * (runs - len(times))) for package, times in packages.items()
+        }))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--command', default='archive_reservations', help='Management command loaded once set up.')
+    parser.add_argument('--depth', type=int, default=1, help='Parts of module names packages are named by.')
+    parser.add_argument('--top', type=int, default=30, help='Packages reported.')
+    args = parser.parse_args()
+
+    results = profile(args.command, args.runs, args.depth)
+
+    print('{:<40}'.format('') + ''.join('{:>12}'.format(name) for name, _, _, _ in results))
+    print('{:<40}'.format('start up, s') + ''.join('{:>12.3f}'.format(seconds) for _, seconds, _, _ in results))
+    print('{:<40}'.format('modules imported') + ''.join('{:>12.0f}'.format(modules) for _, _, modules, _ in results))
+    print('{:<40}'.format('imports, ms') + ''.join('{:>12.1f}'.format(sum(packages.values())) for _, _, _, packages in results))
+    full_packages = results[0][3]
+    for package in sorted(full_packages, key=full_packages.get, reverse=True)[:args.top]:
+        print('  {:<38}'.format(package) + ''.join('{:>12.1f}'.format(packages.get(package, 0.0)) for _, _, _, packages in results))
+
+
+if __name__ == '__main__':
+    main()
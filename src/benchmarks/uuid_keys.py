@@ -0,0 +1,78 @@
+"""
+Benchmark inserting rows keyed by random (version 4) and time-ordered (version 7) UUIDs.
+
+Each kind of key is inserted into its own table shaped like reservations_reservation, in batches as a busy API would,
+inside a transaction which is rolled back afterwards, so the database is left as it was.
+Reports insert throughput and the size of the resulting primary key index.
+Run from src against a migrated database:
+
+    $ python3 -m benchmarks.uuid_keys --rows 1000000
+"""
+import argparse
+import io
+import os
+import time
+import uuid
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reservations.settings')
+
+import django  # NOQA isort:skip
+django.setup()
+
+from django.db import connection, transaction  # NOQA isort:skip
+
+from reservations.api.utils.uuids import uuid7  # NOQA isort:skip
+
+GENERATORS = (
+    ('uuid4', uuid.uuid4),
+    ('uuid7', uuid7),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+def insert(cursor, table, generate, rows, batch_size):
+    cursor.execute("""
+      CREATE TEMPORARY TABLE {} (
+        id uuid PRIMARY KEY, created timestamptz, in_date date, out_date date, guest_id uuid, room_id uuid
+      )
+    """.format(table))
+
+    start = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        buffer = io.StringIO()
+        for _ in range(min(batch_size, rows - offset)):
+            buffer.write('{}\t2018-01-01 00:00:00+00\t2018-01-01\t2018-01-02\t{}\t{}\n'.format(
+                generate(), uuid.uuid4(), uuid.uuid4()
+            ))
+        buffer.seek(0)
+        cursor.cursor.copy_expert('COPY {} FROM STDIN'.format(table), buffer)
+    elapsed = time.perf_counter() - start
+
+    cursor.execute("SELECT pg_relation_size('{}_pkey')".format(table))
+    index_size, = cursor.fetchone()
+    return elapsed, index_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            for name, generate in GENERATORS:
+                elapsed, index_size = insert(cursor, 'benchmark_{}'.format(name), generate, args.rows, args.batch_size)
+                print('{}: inserted {} rows in {:.1f} s, {:,.0f} rows/s, primary key index {:.1f} MB'.format(
+                    name, args.rows, elapsed, args.rows / elapsed, index_size / 1024 / 1024
+                ))
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
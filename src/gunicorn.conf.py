@@ -0,0 +1,55 @@
+"""
+Gunicorn configuration for serving the API in production. Run from src:
+
+    $ gunicorn -c gunicorn.conf.py reservations.wsgi
+
+The application is loaded and warmed up once in the master process, then forked into workers which each serve
+requests with a pool of threads. Each worker warms up its own database connections before accepting requests.
+
+Signals to the master process:
+
+    HUP   Gracefully replace every worker with a new one, e.g. after changing this configuration.
+          The application is preloaded, so code changes need a new master: see USR2.
+    USR2  Start a new master running the current code alongside the old one. Once its workers are serving,
+          send WINCH and then QUIT to the old master to stop it gracefully.
+    TERM  Stop gracefully, waiting up to the graceful timeout for requests in progress.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Worker processes, and threads serving requests in each. Each thread holds one pooled database connection,
+# so threads should not exceed DATABASE_POOL_MAX_SIZE.
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Load the application in the master so workers share its imports and primed caches, and start warm.
+preload_app = True
+
+# Seconds a request may take before its worker is restarted, and workers are given to finish requests when stopping.
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Replace each worker after this many requests, staggered so they are not all replaced at once.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+def when_ready(server):
+    # The application has been loaded, and no worker forked yet.
+    from reservations import warmup
+    if workers > 1 and not warmup.cache_is_shared():
+        server.log.warning('Serving with %s workers without a shared cache: set REDIS_HOST, or each worker serves '
+                           'front desk lists and cached responses which others have invalidated', workers)
+    warmup.warm_application()
+
+
+def post_fork(server, worker):
+    # Runs in the new worker before it accepts requests.
+    from reservations import warmup
+    warmup.warm_worker(connections_per_database=threads)
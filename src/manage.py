@@ -2,8 +2,27 @@
 import os
 import sys
 
+# Commands which need only what Reservations need start with the lean settings of reservations/worker_settings.py,
+# unless DJANGO_SETTINGS_MODULE says otherwise.
+LEAN_COMMANDS = (
+    'archive_reservations',
+    'bulk_import',
+    'process_side_effects',
+    'rebuild_occupancy',
+    'sync_hotel_views',
+    'sync_pgviews',
+    'warm_front_desk',
+)
+
+
+def settings_module(argv):
+    if len(argv) > 1 and argv[1] in LEAN_COMMANDS:
+        return "reservations.worker_settings"
+    return "reservations.settings"
+
+
 if __name__ == "__main__":
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "reservations.settings")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module(sys.argv))
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ReservationsConfig(AppConfig):
     name = 'reservations'
+
+    def ready(self):
+        # Connect the signal receivers keeping caches current, and register the side effect queue gauges.
+        from reservations.api.utils import front_desk, lookup_cache, response_cache, side_effects  # NOQA
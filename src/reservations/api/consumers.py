@@ -0,0 +1,101 @@
+import abc
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.generic.http import AsyncHttpConsumer
+from channels.http import AsgiHandler
+from django.conf import settings
+from django.http import QueryDict
+
+from reservations.api.models import current_and_upcoming_view
+from reservations.api.utils import changes
+
+
+class LongPollConsumer(AsyncHttpConsumer, metaclass=abc.ABCMeta):
+    """
+    Serves a read endpoint the same as Django does, except that a client which already holds the latest version of
+    what it reads waits for the next version before being answered. Waiting clients are held on the event loop, not
+    on a thread, so thousands of them cost no more than their sockets. Once the wait is over, the request is answered
+    by the Django view in a thread, through the same middleware, authentication and throttling as any other request.
+    """
+
+    def header(self, name):
+        for key, value in self.scope['headers']:
+            if key.decode('latin1').lower() == name:
+                return value.decode('latin1')
+        return None
+
+    @property
+    def query_params(self):
+        return QueryDict(self.scope['query_string'].decode())
+
+    def hotel_id(self):
+        return None
+
+    @abc.abstractmethod
+    def known_version(self):
+        """
+        The version the client last read, or None if it should be answered at once.
+        """
+
+    def replicas(self):
+        """
+        Read replicas the view may answer from, which hold a new version only after it is announced.
+        """
+        return []
+
+    async def handle(self, body):
+        try:
+            known = self.known_version()
+            name, using = current_and_upcoming_view(self.hotel_id())
+        except ValueError:
+            # Malformed versions and Hotels are for the view to reject.
+            known = None
+        if known is not None:
+            loop = asyncio.get_event_loop()
+            deadline = loop.time() + changes.wait_seconds(self.header('prefer'))
+            version = await changes.listener(using).wait_past(name, known, deadline - loop.time())
+            # A woken client answered from a replica yet to hold the new version would be told nothing changed,
+            # and poll again at once. It is answered once the replicas hold it, or when its wait is over.
+            if version is not None:
+                await changes.replicated(name, version, self.replicas(), max(deadline - loop.time(), 0))
+
+        handler = AsgiHandler(self.scope)
+        handler.send = async_to_sync(self.send)
+        await handler.handle(body)
+
+
+class CurrentAndUpcomingReservationConsumer(LongPollConsumer):
+    """
+    GET /reservations/current_and_upcoming with the ETag last read as If-None-Match waits for a change,
+    then is answered with the Reservations or, if there was no change, 304 Not Modified.
+    """
+
+    def known_version(self):
+        return changes.version_of(self.header('if-none-match'))
+
+    def replicas(self):
+        # The Reservations of Rooms not in any Hotel are read from a read replica, those of a Hotel never are.
+        return settings.RESERVATIONS_READ_REPLICAS if self.hotel_id() is None else []
+
+
+class HotelCurrentAndUpcomingReservationConsumer(CurrentAndUpcomingReservationConsumer):
+    """
+    GET /hotels/<id>/current_and_upcoming, waiting the same as CurrentAndUpcomingReservationConsumer.
+    """
+
+    def hotel_id(self):
+        return self.scope['url_route']['kwargs']['pk']
+
+
+class ChangesConsumer(LongPollConsumer):
+    """
+    GET /reservations/changes?since=<version> waits for the version to be passed, then is answered with the new one.
+    """
+
+    def hotel_id(self):
+        return self.query_params.get('hotel')
+
+    def known_version(self):
+        since = self.query_params.get('since')
+        return int(since) if since is not None else None
@@ -1,57 +1,188 @@
+import logging
+import time
 import uuid
+from collections import defaultdict
+from datetime import timedelta
 
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
-from django.db.models import Q, signals
-from django.dispatch import receiver
+from django.db import DatabaseError, connections, models, router, transaction
+from django.db.models import Q, Value, signals
+from django.db.models.functions import Greatest
+from django.dispatch import Signal, receiver
 from django.utils import timezone
 from django_pgviews import view as pg
 from enumchoicefield import ChoiceEnum, EnumChoiceField
 from model_utils import FieldTracker
 
+from reservations.api.utils import lookups  # NOQA Registers the iprefix lookup.
+from reservations.api.utils.hotels import across_hotels, hotel_database
 from reservations.api.utils.indestructable_model import IndestructableModel
+from reservations.api.utils.prepared import PreparedStatement
+from reservations.api.utils.uuids import uuid7
+
+logger = logging.getLogger(__name__)
+
+
+class GuestQuerySet(models.QuerySet):
+    def search(self, query, prefix=False):
+        """
+        Find Guests by name, best matches first.
+        Every word of the query must match the Guest's first name or last name, either by trigram similarity,
+        which tolerates typos, or when `prefix` is given by the name starting with the word, for autocompletion.
+        Both are served by the pg_trgm indexes on first_name and last_name.
+        :param query: words to search for
+        :param prefix: match names starting with each word instead of names similar to it
+        :return: GuestQuerySet annotated with `rank`
+        """
+        lookup = 'iprefix' if prefix else 'trigram_similar'
+        terms = query.split()
+
+        queryset = self
+        for term in terms:
+            queryset = queryset.filter(
+                Q(**{'first_name__' + lookup: term}) | Q(**{'last_name__' + lookup: term})
+            )
+
+        # Mononymous Guests have no last name to compare with, and GREATEST ignores the NULL similarity.
+        rank = sum(
+            (Greatest(TrigramSimilarity('first_name', term), TrigramSimilarity('last_name', term)) for term in terms),
+            Value(0.0)
+        )
+        return queryset.annotate(rank=rank).order_by('-rank', 'last_name', 'first_name')
 
 
 class Guest(IndestructableModel):
     class Meta:
         ordering = ('last_name', 'first_name')
 
+    objects = GuestQuerySet.as_manager()
+
     ##############
     # Attributes #
     ##############
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     first_name = models.CharField(max_length=255)
     last_name = models.CharField(max_length=255, null=True)  # https://en.wikipedia.org/wiki/Mononymous_person
 
 
+# A property whose Rooms are reserved. Each Hotel's current and upcoming Reservations have a materialized view
+# of their own, and a Hotel's Rooms and Reservations may live on a database of their own,
+# see reservations.api.utils.hotels.
+class Hotel(IndestructableModel):
+    class Meta:
+        ordering = ('name',)
+
+    ##############
+    # Attributes #
+    ##############
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    name = models.CharField(max_length=255, unique=True)
+
+
 class Room(IndestructableModel):
     class Meta:
         ordering = ('number',)
+        # Room numbers are unique within their Hotel. Numbers of Rooms not in any Hotel are unique among themselves,
+        # by the room_number_without_hotel partial index.
+        unique_together = (('hotel', 'number'),)
 
     ##############
     # Attributes #
     ##############
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
-    number = models.CharField(max_length=255, null=False, unique=True)  # A room "number" may contain alphanumerics
+    number = models.CharField(max_length=255, null=False)  # A room "number" may contain alphanumerics
+    # Rooms not in any Hotel belong to the single property reserved before Hotels were modelled.
+    # Hotels are kept on the default database while their Rooms may not be, so the key is not constrained.
+    # Deletion of Hotels is not currently supported.
+    hotel = models.ForeignKey(Hotel, null=True, blank=True, on_delete=models.PROTECT, db_constraint=False)
+
+    def save(self, *args, **kwargs):
+        # A Hotel's Rooms live on its database however they are saved, including by create(), which passes the database
+        # its queryset was routed to before the Room's Hotel was known.
+        kwargs['using'] = hotel_database(self.hotel_id) or kwargs.get('using')
+        return super(Room, self).save(*args, **kwargs)
 
 
 class ReservationState(ChoiceEnum):
     pending = 'PENDING'
     checked_in = 'CHECKED_IN'
     checked_out = 'CHECKED_OUT'
+    cancelled = 'CANCELLED'
+
+
+# The statuses each status may transition to.
+RESERVATION_TRANSITIONS = {
+    ReservationState.pending: (ReservationState.checked_in, ReservationState.cancelled),
+    ReservationState.checked_in: (ReservationState.checked_out,),
+}
+
+# Statuses of Reservations which hold their Room's nights. Cancelled and checked out Reservations release them.
+RESERVATION_ACTIVE_STATES = (ReservationState.pending, ReservationState.checked_in)
+
+# Matches only active Reservations, as partial indexes over Reservations and queries meant to use them do.
+RESERVATION_ACTIVE_SQL = "status IN ({})".format(', '.join("'{}'".format(state.name) for state in RESERVATION_ACTIVE_STATES))
+
+# Fields written when a Reservation only transitions status.
+RESERVATION_STATUS_FIELDS = ('status', 'checkin_datetime', 'checkout_datetime', 'updated')
+
+# Advisory lock namespace serializing bookings per Room, see Reservation.lock_rooms.
+RESERVATION_ROOM_LOCK = 2
+
+# Claim the nights of a Reservation ($1) of a Room ($2) from its in_date ($3) up to, but not including, its out_date ($4)
+# in the room-night inventory, at the given time ($5). Nights never reserved are inserted, nights released are taken over
+# and nights the Reservation already holds are kept. Nights held by another Reservation are left alone and not returned.
+ROOM_NIGHT_CLAIM_STATEMENT = PreparedStatement('room_night_claim', ('uuid', 'uuid', 'date', 'date', 'timestamptz'), """
+  INSERT INTO reservations_roomnight AS room_night (room_id, night, reservation_id, updated)
+  SELECT $2, night::date, $1, $5 FROM generate_series($3::date, $4::date - 1, '1 day') AS night
+  ON CONFLICT (room_id, night) DO UPDATE SET reservation_id = EXCLUDED.reservation_id, updated = EXCLUDED.updated
+  WHERE room_night.reservation_id IS NULL OR room_night.reservation_id = EXCLUDED.reservation_id
+  RETURNING night
+""")
+
+# Release the nights a Reservation ($1) holds other than those of the given Room ($2) from $3 up to, but not including, $4,
+# at the given time ($5). Released nights are kept, free to be claimed again.
+ROOM_NIGHT_RELEASE_STATEMENT = PreparedStatement('room_night_release', ('uuid', 'uuid', 'date', 'date', 'timestamptz'), """
+  UPDATE reservations_roomnight SET reservation_id = NULL, updated = $5
+  WHERE reservation_id = $1 AND NOT (room_id = $2 AND night >= $3 AND night < $4)
+""")
+
+# Release every night held by the given Reservations ($1), at the given time ($2), once they are cancelled or checked out.
+ROOM_NIGHT_RELEASE_ALL_STATEMENT = PreparedStatement('room_night_release_all', ('uuid[]', 'timestamptz'), """
+  UPDATE reservations_roomnight SET reservation_id = NULL, updated = $2 WHERE reservation_id = ANY($1)
+""")
+
+# Write the status fields of a Reservation ($1).
+RESERVATION_STATUS_STATEMENT = PreparedStatement(
+    'reservation_status', ('uuid', 'varchar', 'timestamptz', 'timestamptz', 'timestamptz'), """
+  UPDATE reservations_reservation
+  SET status = $2, checkin_datetime = $3, checkout_datetime = $4, updated = $5
+  WHERE id = $1
+""")
 
 
 class Reservation(IndestructableModel):
     class Meta:
         ordering = ('in_date',)
+        indexes = (
+            # Serves a Guest's Reservations in date order and the Guest's stay statistics.
+            models.Index(fields=['guest', 'in_date'], name='reservation_guest_in_date'),
+            # Serves the newest Reservation of each Hotel, which views are compared against to tell how far behind they are.
+            models.Index(fields=['hotel', 'updated'], name='reservation_hotel_updated'),
+        )
+        # reservation_active_hotel_out_date, on (hotel_id, out_date) of active Reservations only, serves the current
+        # and upcoming views. It is partial, WHERE RESERVATION_ACTIVE_SQL, so is created by migration 0018.
 
     ##############
     # Attributes #
     ##############
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     in_date = models.DateField(db_index=True, editable=False)
@@ -63,22 +194,49 @@ class Reservation(IndestructableModel):
     guest = models.ForeignKey(Guest, db_index=True, on_delete=models.PROTECT)
     # Deletion of Rooms is not currently supported.
     room = models.ForeignKey(Room, db_index=True, on_delete=models.PROTECT)
+    # The Hotel of the Room, copied on save, so Reservations are routed and their views refreshed by Hotel without a join.
+    hotel = models.ForeignKey(Hotel, null=True, editable=False, on_delete=models.PROTECT, db_constraint=False)
     # Tracker to keep track of status changes
     tracker = FieldTracker()
 
     def save(self, force_insert=False, force_update=False, *args, **kwargs):
         self._set_check_in_check_out_time()
 
+        # A status transition writes only the status fields, with a prepared statement, see _do_update().
+        if self._is_status_transition():
+            kwargs['update_fields'] = RESERVATION_STATUS_FIELDS
+        self.hotel_id = self.room.hotel_id
+
+        # The conflict check must read from the same database the save writes to, never a read replica.
+        # A Hotel's Reservations live on its database however they are saved, as its Rooms do.
+        using = hotel_database(self.hotel_id) or kwargs.get('using') or router.db_for_write(Reservation, instance=self)
+        kwargs['using'] = using
+
         # Save the resource with transactional atomicity.
-        with transaction.atomic():
-            # Find Reservations for this room between the dates given, not includeing this Reservation.
-            conflicting_reservations = Reservation.objects.exclude(id=self.pk).filter(room=self.room).filter(
-                (Q(in_date__lt=self.out_date) & Q(in_date__gte=self.in_date)) |
-                (Q(in_date__lte=self.in_date) & Q(out_date__gte=self.out_date)) |
-                (Q(out_date__gt=self.in_date) & Q(in_date__lte=self.out_date))
-            )
+        with transaction.atomic(using=using):
+            # Bookings of the same Room wait on each other, so each claims nights after those claimed by the one before.
+            # Bookings of other Rooms go ahead.
+            Reservation.lock_rooms([self.room_id], using=using)
+
+            now = timezone.now()
+
+            # Cancelled and checked out Reservations hold no nights, so can not conflict.
+            if self.status not in RESERVATION_ACTIVE_STATES:
+                ROOM_NIGHT_RELEASE_ALL_STATEMENT.execute([[self.pk], now], using=using).close()
+                return super(Reservation, self).save(force_insert, force_update, *args, **kwargs)
 
-            if len(conflicting_reservations) > 0:
+            # Nights this Reservation no longer holds are released before its nights are claimed,
+            # so a Reservation moved within its Room's nights keeps those it still holds.
+            if not self._state.adding:
+                ROOM_NIGHT_RELEASE_STATEMENT.execute(
+                    [self.pk, self.room_id, self.in_date, self.out_date, now], using=using).close()
+
+            # A night of this Room held by any other Reservation is a conflict.
+            with ROOM_NIGHT_CLAIM_STATEMENT.execute(
+                    [self.pk, self.room_id, self.in_date, self.out_date, now], using=using) as cursor:
+                claimed = len(cursor.fetchall())
+
+            if claimed < RoomNight.nights(self.in_date, self.out_date):
                 raise ValidationError("Room has already been reserved within {} to {}".format(
                     self.in_date, self.out_date
                 ))
@@ -86,58 +244,281 @@ class Reservation(IndestructableModel):
             # Here we would also update Room availability for a given Hotel.
             return super(Reservation, self).save(force_insert, force_update, *args, **kwargs)
 
-    def _set_check_in_check_out_time(self):
-        def transition_error(instance):
-            raise ValidationError("Reservation cannot transition from {} to {}".format(
-                instance.tracker.previous('status'),
-                instance.status
-            ))
+    @staticmethod
+    def lock_rooms(room_ids, using='default'):
+        """
+        Take the booking lock of each of the given Rooms, held until the transaction ends.
+        Locks are taken in one order whatever the order given, so transactions booking several Rooms can not deadlock.
+        Such transactions should lock every Room they book before saving any of their Reservations.
+        :param room_ids: primary keys of the Rooms
+        :param using: database alias, in a transaction on which the locks are taken
+        """
+        with connections[using].cursor() as cursor:
+            for room_id in sorted({str(room_id) for room_id in room_ids}):
+                cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', [RESERVATION_ROOM_LOCK, room_id])
+
+    def _is_status_transition(self):
+        if self._state.adding or not self.tracker.has_changed('status'):
+            return False
+        return set(self.tracker.changed()) <= set(RESERVATION_STATUS_FIELDS)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Status transitions are written with a prepared statement.
+        if update_fields is None or set(update_fields) != set(RESERVATION_STATUS_FIELDS):
+            return super(Reservation, self)._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
 
+        connection = connections[using]
+        prepared = {field.attname: field.get_db_prep_save(value, connection=connection) for field, _, value in values}
+        with RESERVATION_STATUS_STATEMENT.execute(
+                [pk_val] + [prepared[field] for field in RESERVATION_STATUS_FIELDS], using=using) as cursor:
+            return cursor.rowcount > 0
+
+    def _set_check_in_check_out_time(self):
         # If resource is not yet created status will always be PENDING
         if self._state.adding: return
         # If resource status has not changed return
         if not self.tracker.has_changed('status'): return
 
-        # Status is not PENDING
-        # If the status was PENDING
-        if self.tracker.previous('status') == ReservationState.pending:
-            # Then the new status should be CHECKED_IN
-            if self.status == ReservationState.checked_in:
-                self.checkin_datetime = timezone.now()
-            else:
-                transition_error(self)
-        # If the status was CHECKED_IN
-        elif self.tracker.previous('status') == ReservationState.checked_in:
-            # Then the new status should be CHECKED_OUT
-            if self.status == ReservationState.checked_out:
-                self.checkout_datetime = timezone.now()
-            else:
-                transition_error(self)
-        # If the status was CHECKED_OUT
-        elif self.tracker.previous('status') == ReservationState.checked_out:
-            # Then the new status should be CHECKED_OUT
-            if self.status == ReservationState.checked_out:
-                pass
-            else:
-                transition_error(self)
-        else:
-            # Unknown state
-            transition_error(self)
-
-
-# Signal receiver for Reservation save to concurrently refresh CurrentAndUpcomingReseravtionat materialized view.
+        previous = self.tracker.previous('status')
+        if not Reservation.can_transition(previous, self.status):
+            raise ValidationError(Reservation.transition_error(previous, self.status))
+
+        for field, value in Reservation.transition_values(previous, self.status, timezone.now()).items():
+            setattr(self, field, value)
+
+    @staticmethod
+    def can_transition(previous, status):
+        """
+        Whether a Reservation may transition from one status to another.
+        PENDING may only become CHECKED_IN or CANCELLED, CHECKED_IN may only become CHECKED_OUT,
+        and CHECKED_OUT and CANCELLED are final.
+        A status which does not change is not a transition.
+        """
+        if previous == status:
+            return True
+        return status in RESERVATION_TRANSITIONS.get(previous, ())
+
+    @staticmethod
+    def transition_error(previous, status):
+        return "Reservation cannot transition from {} to {}".format(previous, status)
+
+    @staticmethod
+    def transition_values(previous, status, now):
+        """
+        The datetime fields stamped by a transition.
+        :return: dict of field name to value
+        """
+        if previous == ReservationState.pending and status == ReservationState.checked_in:
+            return {'checkin_datetime': now}
+        if previous == ReservationState.checked_in and status == ReservationState.checked_out:
+            return {'checkout_datetime': now}
+        return {}
+
+    @classmethod
+    def transition_many(cls, ids, status, using=None):
+        """
+        Transition many Reservations to one status at once, by the same rules as saving each of them.
+        Either every Reservation transitions or, if any does not exist or may not transition, none do.
+        The transitions are written with one UPDATE and announced with one reservations_transitioned signal.
+        :param ids: primary keys of the Reservations
+        :param status: ReservationState to transition to
+        :param using: database alias
+        :return: list of the Reservations in the order of ids
+        """
+        using = using or router.db_for_write(Reservation)
+        ids = list(dict.fromkeys(ids))
+
+        with transaction.atomic(using=using):
+            # Lock in primary key order so concurrent batches of overlapping Reservations can not deadlock.
+            reservations = {
+                reservation.pk: reservation
+                for reservation in cls.objects.using(using).select_for_update().filter(pk__in=ids).order_by('pk')
+            }
+
+            errors = {str(pk): 'Reservation does not exist' for pk in ids if pk not in reservations}
+            errors.update({
+                str(pk): Reservation.transition_error(reservation.status, status)
+                for pk, reservation in reservations.items() if not Reservation.can_transition(reservation.status, status)
+            })
+            if errors:
+                raise ValidationError(errors)
+
+            transitioned = [reservation for reservation in reservations.values() if reservation.status != status]
+            if transitioned:
+                now = timezone.now()
+                # Every Reservation transitioning to one status comes from the same previous status.
+                values = dict(Reservation.transition_values(transitioned[0].status, status, now), status=status, updated=now)
+                cls.objects.using(using).filter(pk__in=[reservation.pk for reservation in transitioned]).update(**values)
+                if status not in RESERVATION_ACTIVE_STATES:
+                    ROOM_NIGHT_RELEASE_ALL_STATEMENT.execute(
+                        [[reservation.pk for reservation in transitioned], now], using=using).close()
+
+                for reservation in transitioned:
+                    for field, value in values.items():
+                        setattr(reservation, field, value)
+                reservations_transitioned.send(sender=cls, reservations=transitioned, using=using)
+                for reservation in transitioned:
+                    reservation.tracker.set_saved_fields()
+
+        return [reservations[pk] for pk in ids]
+
+
+# Sent once Reservations have been transitioned together by Reservation.transition_many, in place of a post_save for each.
+# Each Reservation's tracker still holds its previous status.
+reservations_transitioned = Signal(providing_args=['reservations', 'using'])
+
+
+# Side effects of writes, by kind, registered with @side_effect: functions of a key, such as the primary key of a
+# Hotel or None, and a database alias. Writes perform them with perform_side_effects.
+SIDE_EFFECTS = {}
+
+
+def side_effect(kind):
+    """
+    Register a function as the side effect of the given kind.
+    """
+    def register(function):
+        SIDE_EFFECTS[kind] = function
+        return function
+    return register
+
+
+# Queue a side effect of one kind ($1) for each of the given keys ($2), at the given time ($3).
+SIDE_EFFECT_ENQUEUE_STATEMENT = PreparedStatement('side_effect_enqueue', ('varchar', 'varchar[]', 'timestamptz'), """
+  INSERT INTO reservations_sideeffect (kind, key, created, run_after, attempts, error)
+  SELECT $1, key, $3, $3, 0, '' FROM unnest($2::varchar[]) AS key
+""")
+
+
+def perform_side_effects(kind, keys, using='default'):
+    """
+    Perform a side effect for each of the given keys, in key order, so concurrent writes can not deadlock on them.
+    Side effects are run in the current transaction, or, when RESERVATIONS_DEFER_SIDE_EFFECTS is set, queued in it
+    with a single insert, to be run by $ python3 manage.py process_side_effects once it commits.
+    :param kind: kind of side effect, as registered with @side_effect
+    :param keys: iterable of keys, each a primary key or None
+    :param using: database alias of the write
+    """
+    keys = sorted({'' if key is None else str(key) for key in keys})
+    if not keys:
+        return
+    if settings.RESERVATIONS_DEFER_SIDE_EFFECTS:
+        SIDE_EFFECT_ENQUEUE_STATEMENT.execute([kind, keys, timezone.now()], using=using).close()
+        return
+    for key in keys:
+        SIDE_EFFECTS[kind](key or None, using)
+
+
+# A side effect of a write queued to run after the write commits. It is queued in the write's transaction, so it is
+# run if and only if the write commits. Workers take side effects with SKIP LOCKED, run every side effect of one kind
+# and key taken together once, and delete them in the transaction which ran them, so a side effect is done only once
+# its work commits. Failures are retried with exponential backoff, and kept along with their error for inspection once
+# RESERVATIONS_SIDE_EFFECT_ATTEMPTS have failed. See reservations.api.utils.side_effects.
+class SideEffect(models.Model):
+    class Meta:
+        ordering = ('id',)
+
+    ##############
+    # Attributes #
+    ##############
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=63)
+    # The primary key the side effect is of, or empty for None.
+    key = models.CharField(max_length=63, blank=True)
+    created = models.DateTimeField()
+    # When the side effect may next be run.
+    run_after = models.DateTimeField()
+    attempts = models.IntegerField(default=0)
+    # The error of the last failed attempt.
+    error = models.TextField(blank=True)
+
+
+# Concurrently refresh the current and upcoming materialized view of a Hotel, or of Rooms not in any Hotel.
+@side_effect('current_and_upcoming_refresh')
+def current_and_upcoming_refresh(hotel_id, using=None):
+    refresh_current_and_upcoming(hotel_id, using)
+
+
+# Signal receiver for Reservation save to concurrently refresh the current and upcoming materialized view of its Hotel,
+# and of any Hotel it was moved from. Reservations of Rooms not in any Hotel are in the CurrentAndUpcomingReservation view.
 @receiver(signals.post_save, sender=Reservation)
-def reservation_saved(sender, action=None, instance=None, **kwargs):
-    CurrentAndUpcomingReservation.refresh(concurrently=True)
+@receiver(reservations_transitioned, sender=Reservation)
+def reservation_saved(sender, action=None, instance=None, reservations=(), created=False, using='default', **kwargs):
+    hotel_ids = {reservation.hotel_id for reservation in reservations}
+    if instance is not None:
+        hotel_ids.add(instance.hotel_id)
+        if not created:
+            hotel_ids.add(instance.tracker.previous('hotel_id'))
+
+    perform_side_effects('current_and_upcoming_refresh', hotel_ids, using)
 
 
-# Select relevant Reservation information including Guest first name and last name as well as Room number.
+# Inventory of room-nights: one row for each night of each Room ever reserved, held by the Reservation occupying it.
+# A Reservation occupies its Room the nights from its in_date up to, but not including, its out_date.
+# Rows are claimed by Reservation saves, under the Room's booking lock, and released rather than deleted when a
+# Reservation moves off them, is cancelled, checks out or is archived. Two Reservations can never hold the same night
+# of a Room, so conflicts are found by the unique key alone and free Rooms are counted by night without reasoning over
+# date ranges.
+class RoomNight(IndestructableModel):
+    class Meta:
+        ordering = ('night', 'room')
+        unique_together = (('room', 'night'),)
+
+    ##############
+    # Attributes #
+    ##############
+    id = models.BigAutoField(primary_key=True)
+    updated = models.DateTimeField(auto_now=True)
+    # Deletion of Rooms is not currently supported.
+    room = models.ForeignKey(Room, db_index=False, on_delete=models.PROTECT)
+    # Indexed only where held, by roomnight_held_night, as availability only counts held nights.
+    night = models.DateField()
+    # The Reservation holding the night, or None once released. Reservations release their nights before being archived.
+    # Indexed only where held, by roomnight_held_reservation, so released nights never grow the index.
+    reservation = models.ForeignKey(Reservation, null=True, db_index=False, on_delete=models.PROTECT)
+
+    @staticmethod
+    def nights(in_date, out_date):
+        """
+        How many nights a Reservation from in_date to out_date holds.
+        """
+        in_date = Reservation._meta.get_field('in_date').to_python(in_date)
+        out_date = Reservation._meta.get_field('out_date').to_python(out_date)
+        return max((out_date - in_date).days, 0)
+
+    @classmethod
+    def availability(cls, start, end, hotel_id=None, using=None):
+        """
+        Rooms of a Hotel free each night from start to end inclusive.
+        :param hotel_id: primary key of the Hotel, or None for Rooms not in any Hotel
+        :param using: database alias, by default the database the Hotel's Rooms live on
+        :return: list of (night, rooms, rooms free)
+        """
+        using = using or hotel_database(hotel_id) or router.db_for_read(cls)
+        rooms = Room.objects.using(using).filter(hotel_id=hotel_id).count()
+        reserved = dict(
+            cls.objects.using(using)
+            .filter(room__hotel_id=hotel_id, night__range=(start, end), reservation__isnull=False)
+            .order_by().values_list('night').annotate(reserved=models.Count('pk'))
+        )
+        nights = (start + timedelta(days=night) for night in range((end - start).days + 1))
+        return [(night, rooms, rooms - reserved.get(night, 0)) for night in nights]
+
+
+# How many days ahead current and upcoming Reservations are listed by default, and at most.
+CURRENT_AND_UPCOMING_DEFAULT_DAYS = 3
+CURRENT_AND_UPCOMING_MAX_DAYS = 14
+
+# Select relevant Reservation information including Guest first name and last name as well as Room number
+# of active Reservations, neither cancelled nor checked out, matching the partial reservation_active_hotel_out_date index.
 # Where today's date is equal to or between the arrival date and departure date
-# or where the arrival date is less than 3 days into the future.
-# If we were modelling Hotels currently we would parameterize this by Hotel ID.
-# This is used for the CurrentAndUpcomingReservation materialized view, which acts as a
-# denormalized cache for current and upcoming Reservations.
-CURRENT_AND_UPCOMING_RESERVATIONS_SQL = """
+# or where the arrival date is less than CURRENT_AND_UPCOMING_MAX_DAYS days into the future.
+# Reads narrow this to the number of days they ask for. The view holds one more day than the most
+# which may be asked for, so reads stay exact after midnight until the view is next refreshed.
+# This is parameterized by the Hotel: the CurrentAndUpcomingReservation materialized view holds the Reservations of
+# Rooms not in any Hotel, and each HotelCurrentAndUpcomingView those of one Hotel. These act as
+# denormalized caches for current and upcoming Reservations.
+CURRENT_AND_UPCOMING_RESERVATIONS_TEMPLATE = """
   SELECT r.id as reservation_id,
           first_name, last_name,
           in_date, out_date, number as room_number,
@@ -146,13 +527,35 @@ CURRENT_AND_UPCOMING_RESERVATIONS_SQL = """
   FROM reservations_reservation as r
   INNER JOIN reservations_guest ON r.guest_id = reservations_guest.id 
   INNER JOIN reservations_room ON r.room_id = reservations_room.id
-  WHERE out_date >= current_date AND (
+  WHERE {hotel} AND r.{active} AND out_date >= current_date AND (
           in_date <= current_date OR
-          age(in_date, current_date) < '3 days'
+          age(in_date, current_date) < '{days} days'
         )
   ORDER BY in_date;
 """
 
+CURRENT_AND_UPCOMING_RESERVATIONS_SQL = CURRENT_AND_UPCOMING_RESERVATIONS_TEMPLATE.format(
+    hotel='r.hotel_id IS NULL', active=RESERVATION_ACTIVE_SQL, days=CURRENT_AND_UPCOMING_MAX_DAYS + 1
+)
+
+
+class CurrentAndUpcomingReservationQuerySet(pg.ReadOnlyViewQuerySet):
+    def within(self, days):
+        """
+        Reservations current today or arriving less than the given number of days from today.
+        The database session is in UTC, so today is the UTC date, as it is when the view is refreshed.
+        :param days: int, at least 1
+        :return: QuerySet
+        """
+        today = timezone.now().date()
+        return self.filter(out_date__gte=today, in_date__lt=today + timedelta(days=days))
+
+
+class CurrentAndUpcomingReservationManager(pg.ReadOnlyViewManager):
+    def get_queryset(self):
+        # By default only the Reservations of the default number of days ahead.
+        return CurrentAndUpcomingReservationQuerySet(self.model, using=self._db).within(CURRENT_AND_UPCOMING_DEFAULT_DAYS)
+
 
 # A materialized view to cache current and upcoming Reservations.
 # This materialized view is not managed by Django. In order to create it run:
@@ -178,3 +581,519 @@ class CurrentAndUpcomingReservation(pg.ReadOnlyMaterializedView):
     status = EnumChoiceField(enum_class=ReservationState, default=ReservationState.pending, null=False)
 
     sql = CURRENT_AND_UPCOMING_RESERVATIONS_SQL
+
+    objects = CurrentAndUpcomingReservationManager()
+    # Every Reservation in the view, to be narrowed with within().
+    lookahead = CurrentAndUpcomingReservationQuerySet.as_manager()
+
+
+# Read current and upcoming Reservations arriving less than $1 days from today.
+# Columns are listed, so the statement's result type stays the same when the view is recreated with more of them.
+CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT = PreparedStatement('current_and_upcoming_reservations', ('integer',), """
+  SELECT {} FROM {} WHERE out_date >= current_date AND in_date < current_date + $1 ORDER BY in_date, status
+""".format(', '.join(field.column for field in CurrentAndUpcomingReservation._meta.concrete_fields),
+           CurrentAndUpcomingReservation._meta.db_table))
+
+
+class HotelCurrentAndUpcomingView(object):
+    """
+    The materialized view of one Hotel's current and upcoming Reservations, read as CurrentAndUpcomingReservations.
+    Views are created along with their Hotel, on the database the Hotel's Reservations live on,
+    and recreated from the current definition with:
+    $ python3 manage.py sync_hotel_views
+    """
+
+    def __init__(self, hotel_id):
+        self.hotel_id = uuid.UUID(str(hotel_id))
+        # Identifiers are limited to 63 characters, too few for the Hotel's id with the name of the shared view.
+        self.db_table = 'reservations_upcoming_{}'.format(self.hotel_id.hex)
+
+    @property
+    def using(self):
+        return hotel_database(self.hotel_id) or router.db_for_write(Reservation)
+
+    def create(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('CREATE MATERIALIZED VIEW {} AS {}'.format(
+                self.db_table,
+                CURRENT_AND_UPCOMING_RESERVATIONS_TEMPLATE.format(
+                    hotel='r.hotel_id = %s', active=RESERVATION_ACTIVE_SQL, days=CURRENT_AND_UPCOMING_MAX_DAYS + 1)
+            ), [self.hotel_id])
+            # Concurrent refreshes need a unique index.
+            cursor.execute('CREATE UNIQUE INDEX {0}_id ON {0} (reservation_id)'.format(self.db_table))
+
+    def drop(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('DROP MATERIALIZED VIEW IF EXISTS {}'.format(self.db_table))
+
+    def refresh(self):
+        refresh_view(self.db_table, self.using)
+
+    def within(self, days):
+        """
+        The Hotel's Reservations current today or arriving less than the given number of days from today.
+        :param days: int, at least 1
+        :return: RawQuerySet of CurrentAndUpcomingReservation
+        """
+        return CurrentAndUpcomingReservation.lookahead.db_manager(self.using).raw(
+            'SELECT * FROM {} WHERE out_date >= current_date AND in_date < current_date + %s ORDER BY in_date, status'.format(self.db_table),
+            [days]
+        )
+
+
+def current_and_upcoming_view(hotel_id=None):
+    """
+    The current and upcoming view of a Hotel, or of the Reservations of Rooms not in any Hotel.
+    :param hotel_id: primary key of the Hotel, or None
+    :return: tuple of the view's database table and the alias of the database it is refreshed on
+    """
+    if hotel_id is None:
+        return CurrentAndUpcomingReservation._meta.db_table, 'default'
+    view = HotelCurrentAndUpcomingView(hotel_id)
+    return view.db_table, view.using
+
+
+def refresh_view(name, using):
+    """
+    Concurrently refresh a materialized view with a unique index, on the given database.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY {}'.format(name))
+
+
+def refresh_current_and_upcoming(hotel_id=None, using=None):
+    """
+    Concurrently refresh the current and upcoming view of a Hotel, or of the Reservations of Rooms not in any Hotel,
+    and record the refresh, counting up the view's version.
+    A failed refresh fails the transaction it is part of, so failures are logged over a connection of their own.
+    :param hotel_id: primary key of the Hotel, or None
+    :param using: database alias to refresh the view on, by default the one it lives on
+    """
+    name, view_using = current_and_upcoming_view(hotel_id)
+    using = using or view_using
+    refreshed = timezone.now()
+    start = time.perf_counter()
+    try:
+        refresh_view(name, using)
+    except DatabaseError as e:
+        ViewRefreshFailure.record(name, refreshed, (time.perf_counter() - start) * 1000, e, using=using)
+        raise
+    ViewVersion.record_refresh(name, refreshed, (time.perf_counter() - start) * 1000, using=using)
+
+
+# Signal receiver for Hotel creation to create its current and upcoming materialized view.
+@receiver(signals.post_save, sender=Hotel)
+def hotel_saved(sender, instance=None, created=False, **kwargs):
+    if created:
+        HotelCurrentAndUpcomingView(instance.pk).create()
+
+
+# Channel on which the new version of a view is announced once the transaction which refreshed it commits.
+VIEW_VERSION_CHANNEL = 'reservations_view_version'
+
+# Record a refresh of a view, counting up its version, and announce the new version, as `<view>:<version>`,
+# to those listening on VIEW_VERSION_CHANNEL.
+VIEW_VERSION_STATEMENT = PreparedStatement('view_version', ('varchar', 'timestamptz', 'double precision'), """
+  WITH bumped AS (
+    INSERT INTO reservations_viewversion (name, version, updated, refreshed, duration_ms)
+    VALUES ($1, 1, now(), $2, $3)
+    ON CONFLICT (name) DO UPDATE SET
+      version = reservations_viewversion.version + 1, updated = EXCLUDED.updated,
+      refreshed = EXCLUDED.refreshed, duration_ms = EXCLUDED.duration_ms
+    RETURNING name, version
+  )
+  SELECT pg_notify('{}', name || ':' || version), version FROM bumped
+""".format(VIEW_VERSION_CHANNEL))
+
+
+# The version of each current and upcoming materialized view, counted up in the transaction which refreshes the view,
+# along with when it was last refreshed and how long that took. Failed refreshes are logged as ViewRefreshFailures.
+# Refreshes of one view wait on each other, so versions count up in the order they commit.
+# Clients compare versions to tell whether what they last read has changed, see api/utils/changes.py.
+class ViewVersion(models.Model):
+    ##############
+    # Attributes #
+    ##############
+    name = models.CharField(primary_key=True, max_length=63)
+    version = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+    # When the last successful refresh started. The view holds what was committed by then.
+    refreshed = models.DateTimeField(null=True)
+    duration_ms = models.FloatField(null=True)
+
+    @classmethod
+    def record_refresh(cls, name, refreshed, duration_ms, using='default'):
+        """
+        Record a refresh of a view, log it and count up its version, announcing it once the transaction commits.
+        :param name: database table of the view
+        :param refreshed: when the refresh started
+        :param duration_ms: how long the refresh took
+        :param using: database alias
+        :return: the new version
+        """
+        with VIEW_VERSION_STATEMENT.execute([name, refreshed, duration_ms], using=using) as cursor:
+            return cursor.fetchone()[1]
+
+    @classmethod
+    def of(cls, name, using=None):
+        """
+        The ViewVersion of a view, unsaved at version 0 if it has never been refreshed since versions were first counted.
+        :param name: database table of the view
+        :param using: database alias, routed as any other read by default
+        """
+        return cls.objects.db_manager(using).filter(name=name).first() or cls(name=name)
+
+    def age(self):
+        """
+        Seconds since the view was last refreshed, or None if it has not been.
+        """
+        return (timezone.now() - self.refreshed).total_seconds() if self.refreshed else None
+
+    @classmethod
+    def current(cls, name, using=None):
+        """
+        The version of a view, 0 if it has never been refreshed since versions were first counted.
+        :param name: database table of the view
+        :param using: database alias, routed as any other read by default
+        :return: int
+        """
+        return cls.objects.db_manager(using).filter(name=name).values_list('version', flat=True).first() or 0
+
+
+# Log a failed refresh of a view.
+VIEW_REFRESH_FAILURE_SQL = """
+  INSERT INTO reservations_viewrefreshfailure (name, started, duration_ms, error) VALUES (%s, %s, %s, %s)
+"""
+
+
+# A failed refresh of a current and upcoming view. Failed refreshes fail the transaction which made them, so are logged
+# over a connection of their own. Successful refreshes are only recorded by the view's ViewVersion, so the log grows
+# with failures rather than with every save.
+class ViewRefreshFailure(models.Model):
+    class Meta:
+        ordering = ('-started',)
+        indexes = (
+            # Serves the failures of a view, newest first.
+            models.Index(fields=['name', '-started'], name='viewrefreshfailure_name_start'),
+        )
+
+    ##############
+    # Attributes #
+    ##############
+    id = models.BigAutoField(primary_key=True)
+    # Database table of the view.
+    name = models.CharField(max_length=63)
+    started = models.DateTimeField()
+    duration_ms = models.FloatField()
+    error = models.TextField(blank=True)
+
+    @classmethod
+    def record(cls, name, started, duration_ms, error, using='default'):
+        """
+        Log a failed refresh of a view, whether or not the transaction which made it commits.
+        Failing to log it is itself only logged, so the refresh's own error is the one raised.
+        :param name: database table of the view
+        :param started: when the refresh started
+        :param duration_ms: how long the refresh took to fail
+        :param error: the exception it failed with
+        :param using: database alias
+        """
+        try:
+            connection = connections[using].copy()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(VIEW_REFRESH_FAILURE_SQL, [name, started, duration_ms, str(error)])
+            finally:
+                connection.close()
+        except Exception:
+            logger.exception('Logging the failed refresh of %s failed', name)
+
+
+# A Reservation which has been moved out of the primary table into a compressed archive file.
+# Reservations are never deleted, so this records where each archived Reservation went along with the
+# attributes the archive can be looked up by. The full snapshot lives in the archive file.
+# See reservations.api.utils.archive and $ python3 manage.py archive_reservations
+class ArchivedReservation(IndestructableModel):
+    class Meta:
+        ordering = ('in_date',)
+
+    ##############
+    # Attributes #
+    ##############
+    reservation_id = models.UUIDField(primary_key=True, editable=False)
+    archived = models.DateTimeField(auto_now_add=True)
+    in_date = models.DateField(db_index=True, editable=False)
+    out_date = models.DateField(db_index=True, editable=False)
+    checkout_datetime = models.DateTimeField(null=True, editable=False)
+    # Deletion of Guests is not currently supported.
+    guest = models.ForeignKey(Guest, db_index=True, on_delete=models.PROTECT, editable=False)
+    # Deletion of Rooms is not currently supported.
+    room = models.ForeignKey(Room, db_index=True, on_delete=models.PROTECT, editable=False)
+    # Name of the archive file within RESERVATIONS_ARCHIVE_DIR and the line of the snapshot within it.
+    archive_file = models.CharField(max_length=255, editable=False)
+    archive_line = models.IntegerField(editable=False)
+
+
+# Compute the stay statistics of a Guest ($1) and write them. A stay is a Reservation which has been checked in,
+# including checked out Reservations which have since been archived.
+GUEST_STAY_STATISTICS_STATEMENT = PreparedStatement('guest_stay_statistics', ('uuid',), """
+  INSERT INTO reservations_gueststaystatistics (guest_id, updated, stay_count, total_nights, last_checkout)
+  SELECT $1, now(), count(*), coalesce(sum(out_date - in_date), 0), max(checkout_datetime)
+  FROM (
+    SELECT in_date, out_date, checkout_datetime FROM reservations_reservation
+    WHERE guest_id = $1 AND status IN ('{checked_in}', '{checked_out}')
+    UNION ALL
+    SELECT in_date, out_date, checkout_datetime FROM reservations_archivedreservation
+    WHERE guest_id = $1
+  ) AS stays
+  ON CONFLICT (guest_id) DO UPDATE SET
+    updated = EXCLUDED.updated,
+    stay_count = EXCLUDED.stay_count,
+    total_nights = EXCLUDED.total_nights,
+    last_checkout = EXCLUDED.last_checkout
+""".format(checked_in=ReservationState.checked_in.name, checked_out=ReservationState.checked_out.name))
+
+# Advisory lock namespace serializing stay statistics refreshes per Guest.
+GUEST_STAY_STATISTICS_LOCK = 1
+
+
+# Stay statistics of a Guest: number of stays, total nights stayed and the last check-out.
+# These are cached here and kept current by Reservation saves rather than computed on every request.
+class GuestStayStatistics(models.Model):
+    ##############
+    # Attributes #
+    ##############
+    guest = models.OneToOneField(Guest, primary_key=True, on_delete=models.PROTECT, related_name='stay_statistics')
+    updated = models.DateTimeField(auto_now=True)
+    stay_count = models.IntegerField(default=0)
+    total_nights = models.IntegerField(default=0)
+    last_checkout = models.DateTimeField(null=True)
+
+    @classmethod
+    def refresh(cls, guest_id, using='default'):
+        """
+        Recompute and store the stay statistics of a Guest.
+        :param guest_id: primary key of the Guest
+        :param using: database alias
+        """
+        with transaction.atomic(using=using):
+            with connections[using].cursor() as cursor:
+                # Refreshes of the same Guest wait on each other, so each is computed from a snapshot
+                # which includes the Reservations committed by the one before.
+                cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', [GUEST_STAY_STATISTICS_LOCK, str(guest_id)])
+            GUEST_STAY_STATISTICS_STATEMENT.execute([guest_id], using=using).close()
+
+    @classmethod
+    def of(cls, guest):
+        """
+        The stay statistics of a Guest over every database Reservations live on, each of which records those of the
+        Reservations on it. Guests who have never stayed have no statistics recorded, and are given zeroes.
+        """
+        recorded = [statistics for queryset in across_hotels(cls.objects.filter(guest=guest)) for statistics in queryset]
+        return cls(
+            guest=guest,
+            stay_count=sum(statistics.stay_count for statistics in recorded),
+            total_nights=sum(statistics.total_nights for statistics in recorded),
+            last_checkout=max((statistics.last_checkout for statistics in recorded if statistics.last_checkout), default=None),
+        )
+
+
+# Recompute and store the stay statistics of a Guest.
+@side_effect('guest_stay_statistics_refresh')
+def guest_stay_statistics_refresh(guest_id, using='default'):
+    GuestStayStatistics.refresh(guest_id, using)
+
+
+# Signal receiver for Reservation save to keep the stay statistics of its Guest, and any Guest it was moved from, current.
+@receiver(signals.post_save, sender=Reservation)
+def reservation_saved_refresh_guest_stay_statistics(sender, instance=None, using=None, **kwargs):
+    perform_side_effects(
+        'guest_stay_statistics_refresh', {instance.guest_id, instance.tracker.previous('guest_id')} - {None}, using
+    )
+
+
+# Signal receiver for Reservations transitioned together to refresh the stay statistics of each of their Guests once.
+@receiver(reservations_transitioned, sender=Reservation)
+def reservations_transitioned_refresh_guest_stay_statistics(sender, reservations=(), using=None, **kwargs):
+    perform_side_effects('guest_stay_statistics_refresh', {reservation.guest_id for reservation in reservations}, using)
+
+
+# Compute the daily occupancy of every date from all Reservations, including archived Reservations.
+# A Reservation occupies its Room the nights from its in_date up to, but not including, its out_date,
+# arrives on its in_date and departs on its out_date. Its check-in is completed once it has been checked in.
+# Cancelled Reservations never occupy their Room, so are left out.
+DAILY_OCCUPANCY_SQL = """
+  WITH stays AS (
+    SELECT in_date, out_date, status <> '{pending}' AS checked_in FROM reservations_reservation
+    WHERE status <> '{cancelled}'
+    UNION ALL
+    SELECT in_date, out_date, true FROM reservations_archivedreservation
+  )
+  SELECT date, sum(rooms_occupied)::int AS rooms_occupied, sum(arrivals)::int AS arrivals,
+         sum(departures)::int AS departures, sum(check_ins)::int AS check_ins
+  FROM (
+    SELECT night::date AS date, 1 AS rooms_occupied, 0 AS arrivals, 0 AS departures, 0 AS check_ins
+    FROM stays, generate_series(in_date, out_date - 1, '1 day') AS night
+    UNION ALL
+    SELECT in_date, 0, 1, 0, checked_in::int FROM stays
+    UNION ALL
+    SELECT out_date, 0, 0, 1, 0 FROM stays
+  ) AS days
+  GROUP BY date
+""".format(pending=ReservationState.pending.name, cancelled=ReservationState.cancelled.name)
+
+# Add the given counts to the daily occupancy of the given dates ($1), creating the days not yet recorded.
+DAILY_OCCUPANCY_STATEMENT = PreparedStatement(
+    'daily_occupancy', ('date[]', 'integer[]', 'integer[]', 'integer[]', 'integer[]'), """
+  INSERT INTO reservations_dailyoccupancy AS occupancy (date, rooms_occupied, arrivals, departures, check_ins)
+  SELECT * FROM unnest($1, $2, $3, $4, $5)
+  ON CONFLICT (date) DO UPDATE SET
+    rooms_occupied = occupancy.rooms_occupied + EXCLUDED.rooms_occupied,
+    arrivals = occupancy.arrivals + EXCLUDED.arrivals,
+    departures = occupancy.departures + EXCLUDED.departures,
+    check_ins = occupancy.check_ins + EXCLUDED.check_ins
+""")
+
+# Counts recorded for each date by DailyOccupancy.
+DAILY_OCCUPANCY_FIELDS = ('rooms_occupied', 'arrivals', 'departures', 'check_ins')
+
+
+# Occupancy of a single date: rooms occupied that night, arrivals, departures and check-ins completed.
+# This rolls up every Reservation, so reports over long date ranges never read the Reservation table.
+# It is kept current incrementally by Reservation saves, and can be verified and rebuilt with
+# $ python3 manage.py rebuild_occupancy
+class DailyOccupancy(models.Model):
+    class Meta:
+        ordering = ('date',)
+
+    ##############
+    # Attributes #
+    ##############
+    date = models.DateField(primary_key=True)
+    rooms_occupied = models.IntegerField(default=0)
+    arrivals = models.IntegerField(default=0)
+    departures = models.IntegerField(default=0)
+    check_ins = models.IntegerField(default=0)
+
+    @staticmethod
+    def counts(in_date, out_date, status):
+        """
+        The counts a single Reservation contributes to the daily occupancy.
+        :param in_date: arrival date of the Reservation
+        :param out_date: departure date of the Reservation
+        :param status: ReservationState of the Reservation
+        :return: dict of date to a list of counts in DAILY_OCCUPANCY_FIELDS order
+        """
+        in_date = Reservation._meta.get_field('in_date').to_python(in_date)
+        out_date = Reservation._meta.get_field('out_date').to_python(out_date)
+        status = Reservation._meta.get_field('status').to_python(status)
+
+        counts = defaultdict(lambda: [0, 0, 0, 0])
+        # Cancelled Reservations never occupy their Room.
+        if status == ReservationState.cancelled:
+            return counts
+        for night in range((out_date - in_date).days):
+            counts[in_date + timedelta(days=night)][0] += 1
+        counts[in_date][1] += 1
+        counts[out_date][2] += 1
+        if status != ReservationState.pending:
+            counts[in_date][3] += 1
+        return counts
+
+    def add(self, other):
+        """
+        Add the counts of another DailyOccupancy of the same date, such as one recorded on another database.
+        """
+        for field in DAILY_OCCUPANCY_FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    @classmethod
+    def counts_of(cls, reservation, previous=False):
+        """
+        The counts a Reservation contributes to the daily occupancy, by its current or its previously saved values.
+        """
+        if previous:
+            return cls.counts(*(reservation.tracker.previous(field) for field in ('in_date', 'out_date', 'status')))
+        return cls.counts(reservation.in_date, reservation.out_date, reservation.status)
+
+    @classmethod
+    def apply(cls, added, removed=(), using='default'):
+        """
+        Add sets of counts to the daily occupancy and subtract others, each as built by counts().
+        :param added: iterable of dicts of date to counts to add
+        :param removed: iterable of dicts of date to counts to subtract
+        :param using: database alias
+        """
+        deltas = defaultdict(lambda: [0, 0, 0, 0])
+        for counts_list, sign in ((added, 1), (removed, -1)):
+            for counts in counts_list:
+                for date, values in counts.items():
+                    deltas[date] = [delta + sign * value for delta, value in zip(deltas[date], values)]
+
+        # Dates are written in order, so concurrent saves touching the same dates can not deadlock.
+        dates = sorted(date for date, values in deltas.items() if any(values))
+        if not dates:
+            return
+
+        columns = [dates] + [[deltas[date][index] for date in dates] for index in range(len(DAILY_OCCUPANCY_FIELDS))]
+        DAILY_OCCUPANCY_STATEMENT.execute(columns, using=using).close()
+
+    @classmethod
+    def differences(cls, using='default'):
+        """
+        Compare the daily occupancy recorded with a full recompute from all Reservations.
+        :param using: database alias
+        :return: list of (date, recorded counts, recomputed counts) for each date which differs
+        """
+        fields = ', '.join(DAILY_OCCUPANCY_FIELDS)
+        with connections[using].cursor() as cursor:
+            cursor.execute("""
+              SELECT coalesce(recorded.date, recomputed.date) AS date,
+                     ARRAY[{recorded}], ARRAY[{recomputed}]
+              FROM (SELECT date, {fields} FROM {table}) AS recorded
+              FULL OUTER JOIN ({sql}) AS recomputed ON recorded.date = recomputed.date
+              WHERE ARRAY[{recorded}] IS DISTINCT FROM ARRAY[{recomputed}]
+              ORDER BY date
+            """.format(
+                fields=fields,
+                table=cls._meta.db_table,
+                sql=DAILY_OCCUPANCY_SQL,
+                # Dates recorded with all zero counts are equivalent to dates not recorded at all.
+                recorded=', '.join('coalesce(recorded.{}, 0)'.format(field) for field in DAILY_OCCUPANCY_FIELDS),
+                recomputed=', '.join('coalesce(recomputed.{}, 0)'.format(field) for field in DAILY_OCCUPANCY_FIELDS),
+            ))
+            return cursor.fetchall()
+
+    @classmethod
+    def rebuild(cls, using='default'):
+        """
+        Replace the daily occupancy recorded with a full recompute from all Reservations.
+        :param using: database alias
+        :return: number of dates recorded
+        """
+        fields = ', '.join(DAILY_OCCUPANCY_FIELDS)
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            # Reservation saves wait for the rebuild rather than adding to counts about to be replaced.
+            cursor.execute('LOCK TABLE {} IN EXCLUSIVE MODE'.format(cls._meta.db_table))
+            cursor.execute('DELETE FROM {}'.format(cls._meta.db_table))
+            cursor.execute('INSERT INTO {table} (date, {fields}) SELECT date, {fields} FROM ({sql}) AS recomputed'.format(
+                table=cls._meta.db_table, fields=fields, sql=DAILY_OCCUPANCY_SQL
+            ))
+            return cursor.rowcount
+
+
+# Signal receiver for Reservation save to move its counts in the daily occupancy from its previous dates and status.
+@receiver(signals.post_save, sender=Reservation)
+def reservation_saved_update_daily_occupancy(sender, instance=None, created=False, using=None, **kwargs):
+    removed = [] if created else [DailyOccupancy.counts_of(instance, previous=True)]
+    DailyOccupancy.apply([DailyOccupancy.counts_of(instance)], removed, using)
+
+
+# Signal receiver for Reservations transitioned together to move all their counts in one statement.
+@receiver(reservations_transitioned, sender=Reservation)
+def reservations_transitioned_update_daily_occupancy(sender, reservations=(), using=None, **kwargs):
+    DailyOccupancy.apply(
+        [DailyOccupancy.counts_of(reservation) for reservation in reservations],
+        [DailyOccupancy.counts_of(reservation, previous=True) for reservation in reservations],
+        using
+    )
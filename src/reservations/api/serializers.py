@@ -1,7 +1,25 @@
 from django.core.exceptions import ValidationError
 from enumchoicefield import EnumChoiceField
 from rest_framework import serializers
-from reservations.api.models import CurrentAndUpcomingReservation, Guest, Reservation, ReservationState, Room
+from rest_framework.fields import UUIDField
+from reservations.api.models import CurrentAndUpcomingReservation, DailyOccupancy, Guest, GuestStayStatistics, Hotel, Reservation, ReservationState, Room
+from reservations.api.utils.hotels import of_hotel
+from reservations.api.utils.lookup_cache import LOOKUP_CACHES
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key related field which looks up the related instance through its two-tier lookup cache.
+    """
+
+    def to_internal_value(self, data):
+        lookup_cache = LOOKUP_CACHES[self.get_queryset().model]
+        try:
+            return lookup_cache.get(UUIDField().to_internal_value(data))
+        except lookup_cache.model.DoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+        except serializers.ValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
 
 class GuestSerializer(serializers.HyperlinkedModelSerializer):
@@ -10,10 +28,42 @@ class GuestSerializer(serializers.HyperlinkedModelSerializer):
         fields = ('id', 'url', 'first_name', 'last_name',)
 
 
+class GuestStayStatisticsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GuestStayStatistics
+        fields = ('stay_count', 'total_nights', 'last_checkout',)
+
+
+class HotelSerializer(serializers.HyperlinkedModelSerializer):
+    class Meta:
+        model = Hotel
+        fields = ('id', 'url', 'name',)
+
+
 class RoomSerializer(serializers.HyperlinkedModelSerializer):
+    hotel = serializers.PrimaryKeyRelatedField(queryset=Hotel.objects.all(), required=False, allow_null=True)
+
     class Meta:
         model = Room
-        fields = ('id', 'url', 'number',)
+        fields = ('id', 'url', 'number', 'hotel',)
+        # Numbers are unique within a Hotel, which is optional, so uniqueness is validated below instead.
+        validators = []
+
+    def validate(self, data):
+        hotel = data.get('hotel', getattr(self.instance, 'hotel', None))
+        number = data.get('number', getattr(self.instance, 'number', None))
+
+        # A Room's Reservations are kept with the Room's Hotel, so Rooms stay in the Hotel they were created in.
+        if self.instance is not None and hotel != self.instance.hotel:
+            raise serializers.ValidationError({'hotel': 'A Room may not move to another Hotel'})
+
+        rooms = of_hotel(Room.objects.filter(number=number), hotel.pk if hotel else None)
+        if self.instance is not None:
+            rooms = rooms.exclude(pk=self.instance.pk)
+        if rooms.exists():
+            raise serializers.ValidationError({'number': 'Room number is already taken'})
+
+        return data
 
 
 class ReservationSerializer(serializers.HyperlinkedModelSerializer):
@@ -22,8 +72,8 @@ class ReservationSerializer(serializers.HyperlinkedModelSerializer):
     status = EnumChoiceField(enum_class=ReservationState)
     checkin_datetime = serializers.DateTimeField(required=False)
     checkout_datetime = serializers.DateTimeField(required=False)
-    guest = serializers.PrimaryKeyRelatedField(queryset=Guest.objects.all(), required=True)
-    room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.all(), required=True)
+    guest = CachedPrimaryKeyRelatedField(queryset=Guest.objects.all(), required=True)
+    room = CachedPrimaryKeyRelatedField(queryset=Room.objects.all(), required=True)
 
     class Meta:
         model = Reservation
@@ -50,14 +100,81 @@ class ReservationSerializer(serializers.HyperlinkedModelSerializer):
         return instance
 
     def validate(self, data):
-        # Check that the arrival date is on or before the departure date
-        if 'in_date' in data and 'out_date' in data:
-            if data['in_date'] > data['out_date']:
+        # Check that the arrival date is before the departure date, so the Reservation holds at least one night.
+        # Partial updates are checked against the dates they leave unchanged.
+        in_date = data.get('in_date', getattr(self.instance, 'in_date', None))
+        out_date = data.get('out_date', getattr(self.instance, 'out_date', None))
+        if in_date is not None and out_date is not None:
+            if in_date >= out_date:
                 raise serializers.ValidationError("Arrival date must be before departure date")
 
         return data
 
 
+class JoinedReservationSerializer(ReservationSerializer):
+    """
+    Serializes a Reservation along with the name of its Guest and the number of its Room, read joined with it.
+    """
+    guest_first_name = serializers.CharField(source='guest.first_name', read_only=True)
+    guest_last_name = serializers.CharField(source='guest.last_name', read_only=True)
+    room_number = serializers.CharField(source='room.number', read_only=True)
+
+    class Meta(ReservationSerializer.Meta):
+        fields = ReservationSerializer.Meta.fields + ('guest_first_name', 'guest_last_name', 'room_number')
+
+
+class FrontDeskReservationSerializer(serializers.ModelSerializer):
+    status = EnumChoiceField(enum_class=ReservationState)
+    first_name = serializers.CharField(source='guest.first_name')
+    last_name = serializers.CharField(source='guest.last_name')
+    room_number = serializers.CharField(source='room.number')
+
+    class Meta:
+        model = Reservation
+        fields = (
+            'id', 'in_date', 'out_date', 'status', 'checkin_datetime',
+            'guest', 'first_name', 'last_name', 'room', 'room_number'
+        )
+
+
+class ReservationStatusBatchSerializer(serializers.Serializer):
+    """
+    Many Reservations to transition to one status.
+    """
+    # Most Reservations transitioned by one request.
+    max_batch_size = 500
+
+    ids = serializers.ListField(child=serializers.UUIDField(), min_length=1, max_length=max_batch_size)
+    status = serializers.ChoiceField(choices=[state.name for state in ReservationState])
+
+    def validate_status(self, value):
+        return ReservationState[value]
+
+
+class ReservationBatchGetSerializer(serializers.Serializer):
+    """
+    Many Reservations to read at once.
+    """
+    # Most Reservations read by one request.
+    max_batch_size = 500
+
+    ids = serializers.ListField(child=serializers.UUIDField(), min_length=1, max_length=max_batch_size)
+
+
+class HotelCurrentAndUpcomingReservationSerializer(serializers.ModelSerializer):
+    """
+    Serializes a Hotel's current and upcoming Reservations, which are read from the Hotel's own view.
+    """
+    class Meta:
+        model = CurrentAndUpcomingReservation
+        fields = (
+            'reservation_id',
+            'first_name', 'last_name',
+            'in_date', 'out_date', 'room_number',
+            'checkin_datetime', 'checkout_datetime', 'status'
+        )
+
+
 class CurrentAndUpcomingReservationSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = CurrentAndUpcomingReservation
@@ -67,3 +184,28 @@ class CurrentAndUpcomingReservationSerializer(serializers.HyperlinkedModelSerial
             'in_date', 'out_date', 'room_number',
             'checkin_datetime', 'checkout_datetime', 'status'
         )
+
+
+class ArchivedReservationSerializer(serializers.Serializer):
+    """
+    Serializes the snapshot of an archived Reservation as read back from its archive file.
+    """
+    id = serializers.UUIDField(read_only=True)
+    created = serializers.DateTimeField(read_only=True)
+    updated = serializers.DateTimeField(read_only=True)
+    in_date = serializers.DateField(read_only=True)
+    out_date = serializers.DateField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    checkin_datetime = serializers.DateTimeField(read_only=True)
+    checkout_datetime = serializers.DateTimeField(read_only=True)
+    guest = serializers.UUIDField(read_only=True)
+    guest_first_name = serializers.CharField(read_only=True)
+    guest_last_name = serializers.CharField(read_only=True)
+    room = serializers.UUIDField(read_only=True)
+    room_number = serializers.CharField(read_only=True)
+
+
+class DailyOccupancySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyOccupancy
+        fields = ('date', 'rooms_occupied', 'arrivals', 'departures', 'check_ins',)
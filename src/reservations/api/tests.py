@@ -1,14 +1,51 @@
+import asyncio
+import base64
+import io
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-
+from unittest import mock
+
+import psycopg2
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import HttpCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from reservations.api.models import CurrentAndUpcomingReservation, Guest, Room, Reservation, ReservationState
+from reservations.api.models import ArchivedReservation, CurrentAndUpcomingReservation, DailyOccupancy, GuestStayStatistics, Guest, Hotel, HotelCurrentAndUpcomingView, Room, RoomNight, Reservation, ReservationState, ViewRefreshFailure, ViewVersion
+from reservations.api.models import CURRENT_AND_UPCOMING_MAX_DAYS, RESERVATION_STATUS_STATEMENT, ROOM_NIGHT_CLAIM_STATEMENT, SIDE_EFFECTS, SideEffect, perform_side_effects
+from reservations.api.utils import bulk_import, changes, freshness, front_desk, lookup_cache, metrics, side_effects
+from reservations.api.utils.archive import archive_reservations
+from reservations.api.utils.hotels import HotelRouter, hotel_database, hotel_databases, of_hotel
+from reservations.api.utils.prepared import PreparedStatement
+from reservations.api.utils.replicas import (
+    ReplicaRouter, is_sticky, mark_written, replica_reads, replica_reads_allowed
+)
 from reservations.api.utils.throttles import ReservationStatusRateThrottle
-from reservations.api.views import GuestViewSet, ReservationViewSet, RoomViewSet
+from reservations.api.utils.uuids import uuid7
+from reservations.db.backends.postgresql_pool.pool import ConnectionPool, PoolExhausted
+from reservations import asgi, warmup
+from reservations.api.consumers import CurrentAndUpcomingReservationConsumer, HotelCurrentAndUpcomingReservationConsumer, LongPollConsumer
+import manage
+from reservations.api.serializers import ReservationBatchGetSerializer
+from reservations.api.views import ArchivedReservationViewSet, CurrentAndUpcomingReservationViewSet, GuestViewSet, HotelViewSet, ImportViewSet, OccupancyReportViewSet, ProfileViewSet, ReservationViewSet, RoomViewSet
 
 ###############
 # Model tests #
@@ -44,6 +81,41 @@ class GuestTestCase(TestCase):
         self.assertIsNotNone(guest)
 
 
+# Guest search tests
+class GuestSearchTestCase(TestCase):
+    def setUp(self):
+        Guest.objects.create(first_name='Jonathan', last_name='Swift')
+        Guest.objects.create(first_name='Jon', last_name='Snow')
+        Guest.objects.create(first_name='Mary', last_name='Shelley')
+        Guest.objects.create(first_name='Jonas')
+
+    def test_search_tolerates_typos(self):
+        guests = Guest.objects.search('Jonathn Swiftt')
+        self.assertEqual([guest.first_name for guest in guests], ['Jonathan'])
+
+    def test_search_ranks_best_match_first(self):
+        guests = Guest.objects.search('jon')
+        self.assertEqual(guests[0].first_name, 'Jon')
+
+    def test_search_by_prefix(self):
+        guests = Guest.objects.search('JO', prefix=True)
+        self.assertEqual({guest.first_name for guest in guests}, {'Jonathan', 'Jon', 'Jonas'})
+
+        guests = Guest.objects.search('jo sh', prefix=True)
+        self.assertEqual(list(guests), [])
+
+        guests = Guest.objects.search('ma sh', prefix=True)
+        self.assertEqual([guest.first_name for guest in guests], ['Mary'])
+
+    def test_search_mononymous_guest(self):
+        guests = Guest.objects.search('Jonas')
+        self.assertEqual(guests[0].first_name, 'Jonas')
+        self.assertIsNone(guests[0].last_name)
+
+    def test_prefix_search_escapes_wildcards(self):
+        self.assertEqual(list(Guest.objects.search('%', prefix=True)), [])
+
+
 # Room model tests
 class RoomTestCase(TestCase):
     def test_create(self):
@@ -147,12 +219,449 @@ class ReservationTestCase(TestCase):
         with self.assertRaises(ValidationError):
             Reservation.objects.create(in_date='2018-02-19',  out_date='2018-02-20', guest=Guest.objects.first(), room=Room.objects.first())
 
+    def test_room_nights(self):
+        room, other_room = Room.objects.first(), Room.objects.create(number='ABC102')
+        reservation = Reservation.objects.create(in_date='2018-04-10', out_date='2018-04-13', guest=Guest.objects.first(), room=room)
+
+        def held():
+            return [(night.room_id, str(night.night), night.reservation_id) for night in RoomNight.objects.all()]
+
+        self.assertEqual(held(), [(room.pk, '2018-04-1{}'.format(day), reservation.pk) for day in range(3)])
+        with self.assertRaises(NotImplementedError):
+            RoomNight.objects.first().delete()
+
+        # Moving a Reservation releases the nights it no longer holds, without deleting them.
+        reservation.in_date, reservation.out_date = '2018-04-11', '2018-04-14'
+        reservation.save()
+        self.assertEqual(held(), [
+            (room.pk, '2018-04-10', None), (room.pk, '2018-04-11', reservation.pk),
+            (room.pk, '2018-04-12', reservation.pk), (room.pk, '2018-04-13', reservation.pk),
+        ])
+
+        # Released nights and nights up to another Reservation's in_date may be reserved.
+        before = Reservation.objects.create(in_date='2018-04-09', out_date='2018-04-11', guest=Guest.objects.first(), room=room)
+        self.assertEqual(RoomNight.objects.get(room=room, night='2018-04-10').reservation_id, before.pk)
+
+        # A conflict claims nothing.
+        with self.assertRaises(ValidationError):
+            Reservation.objects.create(in_date='2018-04-13', out_date='2018-04-16', guest=Guest.objects.first(), room=room)
+        self.assertFalse(RoomNight.objects.filter(night__gt='2018-04-13').exists())
+
+        reservation.room = other_room
+        reservation.save()
+        self.assertEqual(RoomNight.objects.filter(room=room, reservation__isnull=False).count(), 2)
+        self.assertEqual(RoomNight.objects.filter(room=other_room, reservation=reservation).count(), 3)
+        self.assertEqual(RoomNight.objects.count(), 8)
+
+    def test_cancel(self):
+        room = Room.objects.first()
+        reservation = Reservation.objects.create(in_date='2018-04-20', out_date='2018-04-22', guest=Guest.objects.first(), room=room)
+        self.assertEqual(DailyOccupancy.objects.get(date='2018-04-20').rooms_occupied, 1)
+
+        # Cancelling frees the Room's nights and takes the Reservation out of the daily occupancy.
+        reservation.status = ReservationState.cancelled
+        reservation.save()
+        self.assertFalse(RoomNight.objects.filter(reservation__isnull=False).exists())
+        self.assertEqual(DailyOccupancy.objects.get(date='2018-04-20').rooms_occupied, 0)
+        self.assertEqual(DailyOccupancy.differences(), [])
+        rebooked = Reservation.objects.create(in_date='2018-04-20', out_date='2018-04-22', guest=Guest.objects.first(), room=room)
+        self.assertEqual(set(RoomNight.objects.values_list('reservation_id', flat=True)), {rebooked.pk})
+
+        # Cancelled is final, and a cancelled Reservation saved again claims nothing.
+        reservation.status = ReservationState.checked_in
+        with self.assertRaises(ValidationError):
+            reservation.save()
+        reservation = Reservation.objects.get(pk=reservation.pk)
+        reservation.guest = Guest.objects.create(first_name='Other')
+        reservation.save()
+        self.assertEqual(set(RoomNight.objects.values_list('reservation_id', flat=True)), {rebooked.pk})
+
+        # Only pending Reservations may be cancelled.
+        rebooked.status = ReservationState.checked_in
+        rebooked.save()
+        rebooked.status = ReservationState.cancelled
+        with self.assertRaises(ValidationError):
+            rebooked.save()
+
+    def test_check_out_releases_room_nights(self):
+        room = Room.objects.first()
+        reservations = [
+            Reservation.objects.create(in_date='2018-04-{}'.format(day), out_date='2018-04-{}'.format(day + 1), guest=Guest.objects.first(), room=room)
+            for day in (23, 24, 25)
+        ]
+        reservations[0].status = ReservationState.checked_in
+        reservations[0].save()
+        reservations[0].status = ReservationState.checked_out
+        reservations[0].save()
+        self.assertEqual(RoomNight.objects.get(night='2018-04-23').reservation_id, None)
+
+        # Transitions of many Reservations release their nights with one statement.
+        Reservation.transition_many([reservation.pk for reservation in reservations[1:]], ReservationState.cancelled)
+        self.assertFalse(RoomNight.objects.filter(reservation__isnull=False).exists())
+        self.assertEqual(DailyOccupancy.differences(), [])
+
+    def test_active_reservation_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE indexname IN %s ORDER BY indexname", [(
+                'reservation_active_hotel_out_date', 'roomnight_held_night', 'roomnight_held_reservation'
+            )])
+            indexes = cursor.fetchall()
+        self.assertEqual([name for name, _ in indexes], ['reservation_active_hotel_out_date', 'roomnight_held_night', 'roomnight_held_reservation'])
+        self.assertIn("WHERE ((status)::text = ANY ((ARRAY['pending'::character varying, 'checked_in'::character varying])::text[]))", indexes[0][1])
+        self.assertIn('WHERE (reservation_id IS NOT NULL)', indexes[1][1])
+
+    def test_room_night_availability(self):
+        rooms = [Room.objects.first(), Room.objects.create(number='ABC102')]
+        Reservation.objects.create(in_date='2018-05-01', out_date='2018-05-03', guest=Guest.objects.first(), room=rooms[0])
+        Reservation.objects.create(in_date='2018-05-02', out_date='2018-05-03', guest=Guest.objects.first(), room=rooms[1])
+        # Rooms of Hotels are counted separately.
+        hotel_room = Room.objects.create(number='ABC101', hotel=Hotel.objects.create(name='Grand'))
+        Reservation.objects.create(in_date='2018-05-01', out_date='2018-05-04', guest=Guest.objects.first(), room=hotel_room)
+
+        self.assertEqual([(str(night), rooms, free) for night, rooms, free in RoomNight.availability(
+            datetime(2018, 5, 1).date(), datetime(2018, 5, 3).date()
+        )], [('2018-05-01', 2, 1), ('2018-05-02', 2, 0), ('2018-05-03', 2, 2)])
+        self.assertEqual([free for _, _, free in RoomNight.availability(
+            datetime(2018, 5, 1).date(), datetime(2018, 5, 4).date(), hotel_room.hotel_id
+        )], [0, 0, 0, 1])
+
+    def test_transition_many(self):
+        rooms = [Room.objects.first(), Room.objects.create(number='ABC102')]
+        reservations = [
+            Reservation.objects.create(in_date='2018-03-01', out_date='2018-03-03', guest=Guest.objects.first(), room=room)
+            for room in rooms
+        ]
+        ids = [reservation.pk for reservation in reservations]
+
+        transitioned = Reservation.transition_many(ids, ReservationState.checked_in)
+
+        self.assertEqual([reservation.pk for reservation in transitioned], ids)
+        for reservation in Reservation.objects.filter(pk__in=ids):
+            self.assertEqual(reservation.status, ReservationState.checked_in)
+            self.assertIsNotNone(reservation.checkin_datetime)
+        self.assertEqual(GuestStayStatistics.objects.get(guest=Guest.objects.first()).stay_count, 2)
+        self.assertEqual(DailyOccupancy.objects.get(date='2018-03-01').check_ins, 2)
+        self.assertEqual(DailyOccupancy.differences(), [])
+
+        # Transitioning to the same status again changes nothing.
+        Reservation.transition_many(ids, ReservationState.checked_in)
+
+        # Either every Reservation transitions or none do.
+        Reservation.transition_many(ids[:1], ReservationState.checked_out)
+        with self.assertRaises(ValidationError) as context:
+            Reservation.transition_many(ids, ReservationState.checked_in)
+        self.assertEqual(list(context.exception.message_dict), [str(ids[0])])
+        with self.assertRaises(ValidationError) as context:
+            Reservation.transition_many(ids[1:] + [Room.objects.first().pk], ReservationState.checked_out)
+        self.assertEqual(list(context.exception.message_dict), [str(Room.objects.first().pk)])
+        self.assertEqual(Reservation.objects.get(pk=ids[1]).status, ReservationState.checked_in)
+
+# Reservation booking concurrency tests
+class ReservationConcurrencyTestCase(TransactionTestCase):
+    """
+    Bookings are made at once on connections of their own, so these tests commit.
+    """
+
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='Leibniz')
+        self.rooms = [Room.objects.create(number='ABC10{}'.format(number)) for number in range(2)]
+
+    def book(self, room, barrier=None):
+        """
+        Book a Room on this thread's own connection.
+        :return: whether the Room was booked
+        """
+        try:
+            if barrier is not None:
+                barrier.wait(timeout=10)
+            Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-03', guest=self.guest, room=room)
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def test_room_booked_once(self):
+        barrier = threading.Barrier(8)
+        with ThreadPoolExecutor(8) as executor:
+            booked = list(executor.map(lambda room: self.book(room, barrier), [self.rooms[0]] * 8))
+
+        self.assertEqual(booked.count(True), 1)
+        self.assertEqual(Reservation.objects.filter(room=self.rooms[0]).count(), 1)
+
+    def test_other_rooms_booked_while_room_locked(self):
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            with transaction.atomic():
+                Reservation.lock_rooms([self.rooms[0].pk])
+                locked.set()
+                release.wait(timeout=10)
+            connection.close()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        locked.wait(timeout=10)
+        executor = ThreadPoolExecutor(2)
+        try:
+            same_room = executor.submit(self.book, self.rooms[0])
+            other_room = executor.submit(self.book, self.rooms[1])
+            self.assertTrue(other_room.result(timeout=10))
+            self.assertFalse(same_room.done())
+        finally:
+            release.set()
+            holder.join()
+            executor.shutdown()
+        self.assertTrue(same_room.result())
+
+    def test_rooms_locked_in_order(self):
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            Reservation.lock_rooms([self.rooms[1].pk, self.rooms[0].pk, self.rooms[1].pk])
+        locked = [room.pk for query in queries.captured_queries for room in self.rooms if str(room.pk) in query['sql']]
+        self.assertEqual(locked, sorted([room.pk for room in self.rooms], key=str))
+
+
+# Room and Guest lookup cache tests
+class LookupCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        lookup_cache.rooms.local.clear()
+        self.room = Room.objects.create(number='ABC101')
+
+    def test_lookup_tiers(self):
+        misses, local_hits, shared_hits = (lookup_cache.lookups.value(result) for result in ('miss', 'local_hit', 'shared_hit'))
+
+        self.assertEqual(lookup_cache.rooms.get(self.room.pk).number, 'ABC101')
+        with self.assertNumQueries(0):
+            room = lookup_cache.rooms.get(self.room.pk)
+        # Callers get their own copy.
+        room.number = 'ABC999'
+        self.assertEqual(lookup_cache.rooms.get(self.room.pk).number, 'ABC101')
+
+        lookup_cache.rooms.local.clear()
+        with self.assertNumQueries(0):
+            lookup_cache.rooms.get(self.room.pk)
+
+        self.assertEqual(lookup_cache.lookups.value('miss'), misses + 1)
+        self.assertEqual(lookup_cache.lookups.value('local_hit'), local_hits + 2)
+        self.assertEqual(lookup_cache.lookups.value('shared_hit'), shared_hits + 1)
+
+        with self.assertRaises(Room.DoesNotExist):
+            lookup_cache.rooms.get(uuid.uuid4())
+
+    def test_saves_replace_cached_instances(self):
+        lookup_cache.rooms.get(self.room.pk)
+        stale = Room.objects.get(pk=self.room.pk)
+
+        self.room.number = 'ABC102'
+        self.room.save()
+        lookup_cache.rooms.saved(self.room)
+        self.assertEqual(lookup_cache.rooms.get(self.room.pk).number, 'ABC102')
+
+        # An instance older than the cached one, by Room.updated, never replaces it.
+        lookup_cache.rooms.saved(stale)
+        lookup_cache.rooms.local.clear()
+        self.assertEqual(lookup_cache.rooms.get(self.room.pk).number, 'ABC102')
+
+
+# Time ordered primary key tests
+class TimeOrderedKeyTestCase(TestCase):
+    def test_uuid7_ascends(self):
+        keys = [uuid7() for _ in range(10000)]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertEqual({key.version for key in keys}, {7})
+
+    def test_new_rows_sort_after_existing_random_keys(self):
+        # Rows created before keys were time ordered keep their random keys. This one reads as a timestamp in 2016,
+        # so it sorts before every key generated now.
+        guest = Guest.objects.create(id=uuid.UUID('0156a5b2-3f1e-4c8d-9a7b-2e6f5d4c3b2a'), first_name='Ptolemy')
+        guests = [Guest.objects.create(first_name='Ptolemy') for _ in range(3)]
+
+        self.assertEqual(guest.id.version, 4)
+        self.assertEqual([guest.id.version for guest in guests], [7, 7, 7])
+        self.assertEqual(list(Guest.objects.filter(first_name='Ptolemy').order_by('pk')), [guest] + guests)
+
+
+# Guest stay statistics tests
+class GuestStayStatisticsTestCase(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='Seneca')
+        self.room = Room.objects.create(number='ABC101')
+
+    def statistics(self, guest=None):
+        return GuestStayStatistics.objects.get(guest=guest or self.guest)
+
+    def test_statistics_kept_current_by_reservation_saves(self):
+        reservation = Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-04', guest=self.guest, room=self.room)
+        # A Reservation which has not been checked in is not a stay.
+        self.assertEqual(self.statistics().stay_count, 0)
+
+        reservation.status = ReservationState.checked_in
+        reservation.save()
+        self.assertEqual(self.statistics().stay_count, 1)
+        self.assertEqual(self.statistics().total_nights, 3)
+        self.assertIsNone(self.statistics().last_checkout)
+
+        reservation.status = ReservationState.checked_out
+        reservation.save()
+        self.assertEqual(self.statistics().last_checkout, Reservation.objects.get(pk=reservation.pk).checkout_datetime)
+
+        reservation = Reservation.objects.create(in_date='2018-02-01', out_date='2018-02-03', guest=self.guest, room=self.room)
+        reservation.status = ReservationState.checked_in
+        reservation.save()
+        self.assertEqual(self.statistics().stay_count, 2)
+        self.assertEqual(self.statistics().total_nights, 5)
+
+    def test_statistics_follow_reservation_to_another_guest(self):
+        other_guest = Guest.objects.create(first_name='Cicero')
+        reservation = Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-04', guest=self.guest, room=self.room)
+        reservation.status = ReservationState.checked_in
+        reservation.save()
+
+        reservation = Reservation.objects.get(pk=reservation.pk)
+        reservation.guest = other_guest
+        reservation.save()
+
+        self.assertEqual(self.statistics().stay_count, 0)
+        self.assertEqual(self.statistics(other_guest).stay_count, 1)
+
+    def test_statistics_include_archived_stays(self):
+        reservation = Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-04', guest=self.guest, room=self.room)
+        Reservation.objects.filter(pk=reservation.pk).update(
+            status=ReservationState.checked_out, checkout_datetime=timezone.now() - timedelta(days=400)
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('archive_reservations', directory=directory, stdout=open(os.devnull, 'w'))
+
+        GuestStayStatistics.refresh(self.guest.pk)
+        self.assertEqual(self.statistics().stay_count, 1)
+        self.assertEqual(self.statistics().total_nights, 3)
+
+
+# Daily occupancy tests
+class DailyOccupancyTestCase(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='Hypatia')
+        self.rooms = [Room.objects.create(number='ABC101'), Room.objects.create(number='ABC102')]
+
+    def occupancy(self, date):
+        occupancy = DailyOccupancy.objects.filter(date=date).first() or DailyOccupancy(date=date)
+        return [occupancy.rooms_occupied, occupancy.arrivals, occupancy.departures, occupancy.check_ins]
+
+    def test_occupancy_kept_current_by_reservation_saves(self):
+        reservation = Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-03', guest=self.guest, room=self.rooms[0])
+        Reservation.objects.create(in_date='2018-01-02', out_date='2018-01-03', guest=self.guest, room=self.rooms[1])
+
+        self.assertEqual(self.occupancy('2018-01-01'), [1, 1, 0, 0])
+        self.assertEqual(self.occupancy('2018-01-02'), [2, 1, 0, 0])
+        self.assertEqual(self.occupancy('2018-01-03'), [0, 0, 2, 0])
+
+        reservation.status = ReservationState.checked_in
+        reservation.save()
+        self.assertEqual(self.occupancy('2018-01-01'), [1, 1, 0, 1])
+
+        # Moving the Reservation moves its counts.
+        reservation = Reservation.objects.get(pk=reservation.pk)
+        reservation.in_date = datetime(2018, 1, 3).date()
+        reservation.out_date = datetime(2018, 1, 4).date()
+        reservation.save()
+        self.assertEqual(self.occupancy('2018-01-01'), [0, 0, 0, 0])
+        self.assertEqual(self.occupancy('2018-01-02'), [1, 1, 0, 0])
+        self.assertEqual(self.occupancy('2018-01-03'), [1, 1, 1, 1])
+        self.assertEqual(self.occupancy('2018-01-04'), [0, 0, 1, 0])
+
+        self.assertEqual(DailyOccupancy.differences(), [])
+
+    def test_rebuild_corrects_differences(self):
+        Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-03', guest=self.guest, room=self.rooms[0])
+        DailyOccupancy.objects.filter(date='2018-01-02').update(rooms_occupied=5)
+        DailyOccupancy.objects.create(date='2017-12-31', arrivals=1)
+
+        self.assertEqual([date for date, _, _ in DailyOccupancy.differences()],
+                         [datetime(2017, 12, 31).date(), datetime(2018, 1, 2).date()])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_occupancy', verify_only=True, stdout=open(os.devnull, 'w'))
+
+        call_command('rebuild_occupancy', stdout=open(os.devnull, 'w'))
+        self.assertEqual(DailyOccupancy.differences(), [])
+        self.assertEqual(self.occupancy('2018-01-02'), [1, 0, 0, 0])
+        call_command('rebuild_occupancy', verify_only=True, stdout=open(os.devnull, 'w'))
+
+
+# Bulk import tests
+class BulkImportTestCase(TestCase):
+    def test_import_rooms(self):
+        existing = Room.objects.create(number='ABC101')
+
+        result = bulk_import.import_rooms([
+            {'key': 'a', 'number': 'ABC101'},
+            {'key': 'b', 'number': 'ABC102'},
+            {'key': 'c', 'number': 'ABC102'},
+            {'key': 'd', 'number': ''},
+            {'key': 'b', 'number': 'ABC103'},
+            {'number': 'ABC104'},
+        ])
+
+        self.assertEqual(list(result['imported']), ['b', '6'])
+        self.assertEqual(Room.objects.get(number='ABC102').pk, result['imported']['b'])
+        self.assertEqual(Room.objects.get(number='ABC104').pk, result['imported']['6'])
+        self.assertEqual([(conflict['key'], conflict['room']) for conflict in result['conflicts']],
+                         [('a', existing.pk), ('c', result['imported']['b'])])
+        self.assertEqual([(error['line'], error['error']) for error in result['errors']],
+                         [(4, 'Missing number'), (5, 'Duplicate key')])
+        self.assertEqual(Room.objects.count(), 3)
+
+    def test_import_guests(self):
+        rows = bulk_import.read_rows(io.StringIO('key,first_name,last_name\ng1,Ada,Lovelace\ng2,Plato,\n'), 'csv')
+
+        result = bulk_import.import_guests(rows)
+
+        self.assertEqual(list(result['imported']), ['g1', 'g2'])
+        self.assertEqual(Guest.objects.get(pk=result['imported']['g1']).last_name, 'Lovelace')
+        self.assertIsNone(Guest.objects.get(pk=result['imported']['g2']).last_name)
+
+        # A second import in the same transaction stages afresh.
+        rows = bulk_import.read_rows(io.StringIO('{"first_name": "Zeno"}\n'), 'ndjson')
+        self.assertEqual(list(bulk_import.import_guests(rows)['imported']), ['1'])
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as rooms:
+            rooms.write('{"key": "r1", "number": "ABC101"}\n{"key": "r2", "number": "ABC102"}\n')
+            rooms.flush()
+            stdout = io.StringIO()
+            call_command('bulk_import', 'rooms', rooms.name, stdout=stdout, stderr=io.StringIO())
+
+        self.assertEqual(json.loads(stdout.getvalue()), {
+            'r1': str(Room.objects.get(number='ABC101').pk), 'r2': str(Room.objects.get(number='ABC102').pk)
+        })
+
+
 # Current and Upcoming Reservation model tests
 class CurrentAndUpcomingReservationTestCase(TestCase):
     def setUp(self):
         Guest.objects.create(first_name='Michelangelo')
         Room.objects.create(number='ABC101')
 
+    def test_inactive_reservations_are_not_current(self):
+        today = datetime.utcnow().date()
+        room = Room.objects.first()
+        hotel_room = Room.objects.create(number='101', hotel=Hotel.objects.create(name='Grand'))
+        reservations = [
+            Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=Guest.objects.first(), room=reserved_room)
+            for reserved_room in (room, hotel_room)
+        ]
+        self.assertIs(CurrentAndUpcomingReservation.objects.count(), 1)
+        self.assertEqual(len(list(HotelCurrentAndUpcomingView(hotel_room.hotel_id).within(3))), 1)
+
+        reservations[0].status = ReservationState.cancelled
+        reservations[0].save()
+        self.assertIs(CurrentAndUpcomingReservation.objects.count(), 0)
+
+        Reservation.transition_many([reservations[1].pk], ReservationState.checked_in)
+        Reservation.transition_many([reservations[1].pk], ReservationState.checked_out)
+        self.assertFalse(list(HotelCurrentAndUpcomingView(hotel_room.hotel_id).within(3)))
+
     def test_creation_of_reservation(self):
         today = datetime.utcnow().date()
         guest = Guest.objects.first()
@@ -230,6 +739,477 @@ class CurrentAndUpcomingReservationTestCase(TestCase):
         self.assertIs(CurrentAndUpcomingReservation.objects.count(), 3)
         self.assertIsNone(upcoming_reservation)
 
+    def test_lookahead(self):
+        today = datetime.utcnow().date()
+        guest = Guest.objects.first()
+        room = Room.objects.first()
+        for days in (0, 3, CURRENT_AND_UPCOMING_MAX_DAYS - 1, CURRENT_AND_UPCOMING_MAX_DAYS):
+            Reservation.objects.create(in_date=today + timedelta(days=days), out_date=today + timedelta(days=days + 1), guest=guest, room=room)
+
+        # The view holds Reservations up to the most days which may be asked for, reads narrow them.
+        in_dates = lambda reservations: sorted((reservation.in_date - today).days for reservation in reservations)
+        self.assertEqual(in_dates(CurrentAndUpcomingReservation.lookahead.all()), [0, 3, CURRENT_AND_UPCOMING_MAX_DAYS - 1, CURRENT_AND_UPCOMING_MAX_DAYS])
+        self.assertEqual(in_dates(CurrentAndUpcomingReservation.lookahead.within(CURRENT_AND_UPCOMING_MAX_DAYS)), [0, 3, CURRENT_AND_UPCOMING_MAX_DAYS - 1])
+        self.assertEqual(in_dates(CurrentAndUpcomingReservation.lookahead.within(4)), [0, 3])
+        self.assertEqual(in_dates(CurrentAndUpcomingReservation.lookahead.within(1)), [0])
+        self.assertEqual(in_dates(CurrentAndUpcomingReservation.objects.all()), [0])
+
+
+# Hotel tests
+class HotelTestCase(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='Marco')
+        self.hotels = [Hotel.objects.create(name='Lido'), Hotel.objects.create(name='Rialto')]
+        self.rooms = [Room.objects.create(number='101', hotel=hotel) for hotel in self.hotels]
+        self.room = Room.objects.create(number='101')
+
+    def test_room_numbers_unique_within_hotel(self):
+        with transaction.atomic():
+            with self.assertRaises(IntegrityError):
+                Room.objects.create(number='101', hotel=self.hotels[0])
+        with self.assertRaises(IntegrityError):
+            Room.objects.create(number='101')
+
+    def test_reservation_hotel_of_room(self):
+        today = datetime.utcnow().date()
+        reservation = Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=self.guest, room=self.rooms[0])
+        self.assertEqual(reservation.hotel_id, self.hotels[0].pk)
+
+        reservation.room = self.room
+        reservation.save()
+        self.assertIsNone(Reservation.objects.get(pk=reservation.pk).hotel_id)
+
+    def test_current_and_upcoming_views_by_hotel(self):
+        today = datetime.utcnow().date()
+        reservations = [
+            Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=self.guest, room=room)
+            for room in self.rooms + [self.room]
+        ]
+
+        for hotel, reservation in zip(self.hotels, reservations):
+            self.assertEqual([upcoming.reservation_id for upcoming in HotelCurrentAndUpcomingView(hotel.pk).within(3)], [reservation.pk])
+            self.assertEqual(HotelCurrentAndUpcomingView(hotel.pk).within(3)[0].room_number, '101')
+        # Reservations of Rooms not in any Hotel.
+        self.assertEqual([upcoming.reservation_id for upcoming in CurrentAndUpcomingReservation.objects.all()], [reservations[2].pk])
+
+    def test_saves_refresh_only_their_hotel_view(self):
+        today = datetime.utcnow().date()
+        hotel_refreshes = lambda queries: [
+            query['sql'] for query in queries.captured_queries if query['sql'].startswith('REFRESH MATERIALIZED VIEW')
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            reservation = Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=self.guest, room=self.rooms[0])
+        self.assertEqual(hotel_refreshes(queries), ['REFRESH MATERIALIZED VIEW CONCURRENTLY {}'.format(HotelCurrentAndUpcomingView(self.hotels[0].pk).db_table)])
+
+        # Moving a Reservation out of a Hotel refreshes the view it left as well as the one it joined.
+        reservation.room = self.room
+        with CaptureQueriesContext(connection) as queries:
+            reservation.save()
+        self.assertEqual(sorted(hotel_refreshes(queries)), sorted(
+            'REFRESH MATERIALIZED VIEW CONCURRENTLY {}'.format(name)
+            for name in (HotelCurrentAndUpcomingView(self.hotels[0].pk).db_table, CurrentAndUpcomingReservation._meta.db_table)
+        ))
+        self.assertFalse(list(HotelCurrentAndUpcomingView(self.hotels[0].pk).within(3)))
+
+    def test_sync_hotel_views(self):
+        today = datetime.utcnow().date()
+        Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=self.guest, room=self.rooms[1])
+
+        call_command('sync_hotel_views', stdout=open(os.devnull, 'w'))
+        self.assertEqual(len(list(HotelCurrentAndUpcomingView(self.hotels[1].pk).within(3))), 1)
+
+    def test_import_rooms_into_hotel(self):
+        result = bulk_import.import_rooms([{'number': '101'}, {'number': '102'}], hotel=self.hotels[0].pk)
+
+        self.assertEqual(result['conflicts'][0]['room'], self.rooms[0].pk)
+        self.assertEqual(Room.objects.get(pk=result['imported']['2']).hotel, self.hotels[0])
+        # Numbers are only taken within the Hotel.
+        self.assertEqual(len(bulk_import.import_rooms([{'number': '102'}])['imported']), 1)
+
+
+# Archived Reservation tests
+class ArchivedReservationTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.guest = Guest.objects.create(first_name='Hypatia')
+        self.room = Room.objects.create(number='ABC101')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def checked_out_reservation(self, in_date, out_date, checked_out_days_ago):
+        reservation = Reservation.objects.create(in_date=in_date, out_date=out_date, guest=self.guest, room=self.room)
+        Reservation.objects.filter(pk=reservation.pk).update(
+            status=ReservationState.checked_out,
+            checkout_datetime=timezone.now() - timedelta(days=checked_out_days_ago)
+        )
+        return reservation
+
+    def test_archive_moves_old_checked_out_reservations(self):
+        old = self.checked_out_reservation('2018-01-01', '2018-01-02', checked_out_days_ago=100)
+        recent = self.checked_out_reservation('2018-01-03', '2018-01-04', checked_out_days_ago=1)
+        pending = Reservation.objects.create(in_date='2018-01-05', out_date='2018-01-06', guest=self.guest, room=self.room)
+
+        call_command('archive_reservations', days=30, directory=self.directory.name, stdout=open(os.devnull, 'w'))
+
+        self.assertFalse(Reservation.objects.filter(pk=old.pk).exists())
+        self.assertTrue(Reservation.objects.filter(pk=recent.pk).exists())
+        self.assertTrue(Reservation.objects.filter(pk=pending.pk).exists())
+
+        # Every archived Reservation records where it went.
+        archived = ArchivedReservation.objects.get(reservation_id=old.pk)
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, archived.archive_file)))
+        self.assertEqual(archived.guest, self.guest)
+        self.assertEqual(archived.room, self.room)
+        self.assertIs(ArchivedReservation.objects.count(), 1)
+
+    def test_archive_releases_room_nights(self):
+        old = self.checked_out_reservation('2018-01-01', '2018-01-03', checked_out_days_ago=100)
+
+        call_command('archive_reservations', days=30, directory=self.directory.name, stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(list(RoomNight.objects.values_list('reservation_id', flat=True)), [None, None])
+        Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-03', guest=self.guest, room=self.room)
+        self.assertNotIn(old.pk, RoomNight.objects.values_list('reservation_id', flat=True))
+
+    def test_archive_refuses_reservations_not_checked_out(self):
+        pending = Reservation.objects.create(in_date='2018-01-05', out_date='2018-01-06', guest=self.guest, room=self.room)
+
+        with self.assertRaises(ValueError):
+            archive_reservations([Reservation.objects.select_related('guest', 'room').get(pk=pending.pk)],
+                                 self.directory.name)
+
+        self.assertTrue(Reservation.objects.filter(pk=pending.pk).exists())
+        self.assertIs(ArchivedReservation.objects.count(), 0)
+
+
+# Deferred side effect tests
+@override_settings(RESERVATIONS_DEFER_SIDE_EFFECTS=True)
+class SideEffectTestCase(TestCase):
+    def setUp(self):
+        self.guest = Guest.objects.create(first_name='Michelangelo')
+        self.room = Room.objects.create(number='ABC101')
+
+    def test_deferred_side_effects(self):
+        today = datetime.utcnow().date()
+        reservation = Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=self.guest, room=self.room)
+        Reservation.transition_many([reservation.pk], ReservationState.checked_in)
+
+        # Saves queue their side effects rather than running them.
+        self.assertIs(CurrentAndUpcomingReservation.objects.count(), 0)
+        self.assertFalse(GuestStayStatistics.objects.filter(guest=self.guest).exists())
+        self.assertEqual(list(SideEffect.objects.values_list('kind', 'key')), [
+            ('current_and_upcoming_refresh', ''), ('guest_stay_statistics_refresh', str(self.guest.pk)),
+        ] * 2)
+        self.assertEqual(side_effects.queue()[0], 4)
+
+        # Side effects queued more than once run once.
+        self.assertEqual(side_effects.process(), (4, 0))
+        self.assertEqual(ViewVersion.current(CurrentAndUpcomingReservation._meta.db_table), 1)
+        self.assertIs(CurrentAndUpcomingReservation.objects.count(), 1)
+        self.assertEqual(GuestStayStatistics.objects.get(guest=self.guest).stay_count, 1)
+        self.assertFalse(SideEffect.objects.exists())
+        self.assertEqual(side_effects.process(), (0, 0))
+
+    def test_failed_side_effects_are_retried(self):
+        def fail(key, using):
+            raise ValueError('Unavailable')
+
+        with mock.patch.dict(SIDE_EFFECTS, {'fail': fail}):
+            perform_side_effects('fail', [None])
+            perform_side_effects('guest_stay_statistics_refresh', [self.guest.pk])
+
+            # A failure does not undo the other side effects of its batch, and is retried later.
+            self.assertEqual(side_effects.process(), (2, 1))
+            failed = SideEffect.objects.get()
+            self.assertEqual((failed.kind, failed.attempts, failed.error), ('fail', 1, 'ValueError: Unavailable'))
+            self.assertGreater(failed.run_after, timezone.now())
+            self.assertEqual(side_effects.process(), (0, 0))
+
+            # Side effects which failed every attempt are kept, and no longer run.
+            SideEffect.objects.update(run_after=timezone.now(), attempts=settings.RESERVATIONS_SIDE_EFFECT_ATTEMPTS - 1)
+            self.assertEqual(side_effects.process(), (1, 1))
+            self.assertEqual(side_effects.process(), (0, 0))
+            self.assertEqual(side_effects.queue(), (0, 0.0, 1))
+
+    def test_queue_metrics(self):
+        perform_side_effects('guest_stay_statistics_refresh', [self.guest.pk])
+        SideEffect.objects.update(created=timezone.now() - timedelta(seconds=60))
+
+        exposition = metrics.exposition()
+        self.assertIn('reservations_side_effect_queue_depth{database="default"} 1', exposition)
+        lag = float(exposition.split('reservations_side_effect_queue_lag_seconds{database="default"} ')[1].split()[0])
+        # Measured from the start of the test's transaction.
+        self.assertGreater(lag, 30)
+
+    def test_process_side_effects(self):
+        perform_side_effects('guest_stay_statistics_refresh', [self.guest.pk])
+
+        stdout = io.StringIO()
+        call_command('process_side_effects', once=True, stdout=stdout)
+        self.assertIn('Ran 1 side effects, 0 failed', stdout.getvalue())
+        self.assertFalse(SideEffect.objects.exists())
+
+
+@override_settings(RESERVATIONS_DEFER_SIDE_EFFECTS=True)
+class SideEffectCommitTestCase(TransactionTestCase):
+    """
+    Side effects are committed one at a time, so this test commits.
+    """
+
+    def test_each_side_effect_committed_on_its_own(self):
+        guest = Guest.objects.create(first_name='Leonardo')
+        queued = []
+
+        def check(key, using):
+            # Read over a connection of its own, which sees only what has committed.
+            other = psycopg2.connect(**connection.get_connection_params())
+            try:
+                with other.cursor() as cursor:
+                    cursor.execute('SELECT kind FROM reservations_sideeffect ORDER BY id')
+                    queued.extend(kind for kind, in cursor.fetchall())
+            finally:
+                other.close()
+
+        with mock.patch.dict(SIDE_EFFECTS, {'check': check}):
+            perform_side_effects('guest_stay_statistics_refresh', [guest.pk])
+            perform_side_effects('check', [None])
+
+            self.assertEqual(side_effects.process(), (2, 0))
+        # The side effect run first was done, and committed, before the next ran.
+        self.assertEqual(queued, ['check'])
+        self.assertFalse(SideEffect.objects.exists())
+
+
+# Connection pool and prepared statement tests
+class ConnectionPoolTestCase(TestCase):
+    def setUp(self):
+        params = connection.get_connection_params()
+        self.pool = ConnectionPool(lambda: psycopg2.connect(**params), max_size=1, timeout=0)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_connections_reused(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        self.assertIs(self.pool.acquire(), pooled)
+
+    def test_pool_bounded(self):
+        self.pool.acquire()
+        with self.assertRaises(PoolExhausted):
+            self.pool.acquire()
+
+    def test_transactions_rolled_back_on_release(self):
+        pooled = self.pool.acquire()
+        pooled.cursor().execute('SELECT 1')
+        self.pool.release(pooled)
+        self.assertEqual(pooled.get_transaction_status(), psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+    def test_unusable_connections_replaced(self):
+        self.pool.health_check_interval = 0
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        pooled.close()
+
+        replacement = self.pool.acquire()
+        self.assertIsNot(replacement, pooled)
+        self.assertFalse(replacement.closed)
+
+
+class PreparedStatementTestCase(TestCase):
+    def setUp(self):
+        Guest.objects.create(first_name='Euclid')
+        Room.objects.create(number='ABC101')
+
+    def prepared_statements(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT name FROM pg_prepared_statements')
+            return {name for name, in cursor.fetchall()}
+
+    def test_reservation_save_uses_prepared_statements(self):
+        reservation = Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-02', guest=Guest.objects.first(), room=Room.objects.first())
+        self.assertIn(ROOM_NIGHT_CLAIM_STATEMENT.name, self.prepared_statements())
+
+        reservation.status = ReservationState.checked_in
+        reservation.save()
+        self.assertIn(RESERVATION_STATUS_STATEMENT.name, self.prepared_statements())
+
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, ReservationState.checked_in)
+        self.assertIsNotNone(reservation.checkin_datetime)
+
+    def test_status_transition_checks_conflicts(self):
+        Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-03', guest=Guest.objects.first(), room=Room.objects.first())
+        # An overlapping Reservation can only be made behind the conflict check's back.
+        Reservation.objects.bulk_create([
+            Reservation(in_date='2018-01-02', out_date='2018-01-03', guest=Guest.objects.first(), room=Room.objects.first())
+        ])
+        reservation = Reservation.objects.get(in_date='2018-01-02')
+
+        reservation.status = ReservationState.checked_in
+        with self.assertRaises(ValidationError):
+            reservation.save()
+
+        # Cancelling holds no nights, so can not conflict.
+        reservation.status = ReservationState.cancelled
+        reservation.save()
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).status, ReservationState.cancelled)
+
+
+class PreparedStatementResultTypeTestCase(TransactionTestCase):
+    """
+    Test that prepared statements are prepared again once the columns they return change.
+    They are only run once more outside transactions, so these tests commit.
+    """
+
+    statement = PreparedStatement('rooms_on_floors', (), 'SELECT * FROM reservations_floorroom')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE reservations_floorroom (number varchar)')
+            cursor.execute("INSERT INTO reservations_floorroom VALUES ('ABC101')")
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE reservations_floorroom')
+
+    def test_prepared_again_once_result_type_changes(self):
+        with self.statement.execute() as cursor:
+            self.assertEqual(cursor.fetchall(), [('ABC101',)])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ALTER TABLE reservations_floorroom ADD COLUMN floor integer DEFAULT 1')
+        with self.statement.execute() as cursor:
+            self.assertEqual(cursor.fetchall(), [('ABC101', 1)])
+
+        # The transaction fails along with the statement, which is prepared again once next executed.
+        with connection.cursor() as cursor:
+            cursor.execute('ALTER TABLE reservations_floorroom DROP COLUMN floor')
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            self.statement.execute().close()
+        with self.statement.execute() as cursor:
+            self.assertEqual(cursor.fetchall(), [('ABC101',)])
+
+
+# Start up tests
+class StartupTestCase(TestCase):
+    def test_lean_commands_start_with_worker_settings(self):
+        self.assertEqual(manage.settings_module(['manage.py', 'archive_reservations']), 'reservations.worker_settings')
+        self.assertEqual(manage.settings_module(['manage.py', 'migrate']), 'reservations.settings')
+        self.assertEqual(manage.settings_module(['manage.py']), 'reservations.settings')
+
+    def test_worker_settings_import_nothing_serving_needs(self):
+        # Set up in a fresh interpreter, as this one has imported everything already.
+        result = subprocess.run([sys.executable, '-c', """
+import io, sys, django
+django.setup()
+from django.core.management import call_command
+call_command('check', stdout=io.StringIO())
+from reservations.api.utils import archive, front_desk
+print(' '.join(sorted(module for module in sys.modules if module.startswith(('rest_framework', 'django.contrib.admin')))))
+"""], env=dict(os.environ, DJANGO_SETTINGS_MODULE='reservations.worker_settings'), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), universal_newlines=True)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
+
+
+# Warm up tests
+class WarmupTestCase(TransactionTestCase):
+    """
+    Warming up opens and closes connections, so these tests run outside of a transaction.
+    """
+
+    def prepared_statements(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT name FROM pg_prepared_statements')
+            return {name for name, in cursor.fetchall()}
+
+    def test_warm_application(self):
+        with mock.patch.object(front_desk, 'warm') as warm:
+            warmup.warm_application()
+        warm.assert_called_once_with(timezone.localdate())
+        # Connections must not be inherited by forked workers.
+        self.assertIsNone(connection.connection)
+
+    def test_warm_application_failure_logged(self):
+        with mock.patch.object(front_desk, 'warm', side_effect=RuntimeError), self.assertLogs('reservations.warmup', 'ERROR'):
+            warmup.warm_application()
+        self.assertIsNone(connection.connection)
+
+    def test_warm_worker(self):
+        warmup.warm_worker(connections_per_database=2)
+        # The connection is taken from the pool the warmed connections were returned to.
+        self.assertTrue({statement.name for statement in warmup.READ_STATEMENTS + warmup.WRITE_STATEMENTS} <= self.prepared_statements())
+
+    def test_cache_is_shared(self):
+        self.assertFalse(warmup.cache_is_shared())
+        with override_settings(CACHES={'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://localhost:6379/2'}}):
+            self.assertTrue(warmup.cache_is_shared())
+
+
+# Read replica routing tests
+@override_settings(RESERVATIONS_READ_REPLICAS=['replica_0'])
+class ReplicaRouterTestCase(TestCase):
+    def test_reads_routed_to_replica_only_when_allowed(self):
+        router = ReplicaRouter()
+
+        self.assertEqual(router.db_for_read(Reservation), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Reservation), 'replica_0')
+            # Writes always go to the primary.
+            self.assertEqual(router.db_for_write(Reservation), 'default')
+        self.assertEqual(router.db_for_read(Reservation), 'default')
+
+    @override_settings(RESERVATIONS_READ_REPLICAS=['replica_{}'.format(replica) for replica in range(8)])
+    def test_reads_pinned_to_one_replica(self):
+        router = ReplicaRouter()
+
+        with replica_reads():
+            # Every read allowed together goes to the same replica.
+            self.assertEqual(len({router.db_for_read(Reservation) for _ in range(50)}), 1)
+
+    def test_replicas_not_migrated(self):
+        router = ReplicaRouter()
+
+        self.assertTrue(router.allow_migrate('default', 'reservations'))
+        self.assertFalse(router.allow_migrate('replica_0', 'reservations'))
+
+    def test_stickiness(self):
+        cache.clear()
+
+        self.assertFalse(is_sticky('anon_127.0.0.1'))
+        mark_written('anon_127.0.0.1')
+        self.assertTrue(is_sticky('anon_127.0.0.1'))
+        self.assertFalse(is_sticky('anon_127.0.0.2'))
+
+
+# Hotel database routing tests
+class HotelRouterTestCase(TestCase):
+    def test_hotel_rooms_and_reservations_routed_to_hotel_database(self):
+        hotel = Hotel.objects.create(name='Lido')
+        router = HotelRouter()
+
+        with override_settings(RESERVATIONS_HOTEL_DATABASES={str(hotel.pk): 'hotel_0'}):
+            self.assertEqual(hotel_database(hotel.pk), 'hotel_0')
+            self.assertEqual(router.db_for_write(Room, instance=Room(hotel=hotel)), 'hotel_0')
+            self.assertEqual(router.db_for_read(Reservation, instance=Reservation(hotel=hotel)), 'hotel_0')
+            self.assertEqual(of_hotel(Room.objects.all(), hotel.pk).db, 'hotel_0')
+            self.assertEqual(HotelCurrentAndUpcomingView(hotel.pk).using, 'hotel_0')
+            self.assertEqual(hotel_databases(), ['default', 'hotel_0'])
+
+            # Instances are routed while being constructed, before their Hotel is known.
+            self.assertEqual(Reservation(guest=Guest(first_name='Marco'), room=Room(hotel=hotel)).hotel_id, None)
+
+            # Everything else is routed as before.
+            self.assertEqual(router.db_for_write(Room, instance=Room()), 'default')
+            self.assertEqual(router.db_for_write(Hotel, instance=hotel), 'default')
+            self.assertEqual(of_hotel(Room.objects.all(), None).db, 'default')
+            with override_settings(RESERVATIONS_READ_REPLICAS=['replica_0']), replica_reads():
+                self.assertEqual(router.db_for_read(Room, instance=Room()), 'replica_0')
+
 
 #####################
 # Integration tests #
@@ -262,6 +1242,41 @@ class GuestIntegrationTest(TestCase):
 
         self.assertEquals(str(Guest.objects.first().pk), response.data['id'])
 
+    def test_search_guests(self):
+        client = APIClient()
+        Guest.objects.create(first_name='Prince')
+        Guest.objects.create(first_name='Priscilla', last_name='Presley')
+        Guest.objects.create(first_name='Elvis', last_name='Presley')
+
+        response = client.get(reverse('guest-list'), {'search': 'prezley'})
+        self.assertEqual({guest['first_name'] for guest in response.data}, {'Priscilla', 'Elvis'})
+
+        response = client.get(reverse('guest-list'), {'search': 'pri', 'mode': 'prefix', 'limit': 1})
+        self.assertEqual(len(response.data), 1)
+
+        response = client.get(reverse('guest-list'), {'search': 'pri', 'mode': 'fuzzy'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_guest_reservations_and_stats(self):
+        client = APIClient()
+        guest = Guest.objects.create(first_name='Sappho')
+        other_guest = Guest.objects.create(first_name='Homer')
+        room = Room.objects.create(number='ABC101')
+        Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-03', guest=guest, room=room)
+        reservation = Reservation.objects.create(in_date='2018-02-01', out_date='2018-02-02', guest=guest, room=room)
+        Reservation.objects.create(in_date='2018-03-01', out_date='2018-03-02', guest=other_guest, room=room)
+        reservation.status = ReservationState.checked_in
+        reservation.save()
+
+        response = client.get(reverse('guest-reservations', args=[guest.pk]))
+        self.assertEqual([reservation['in_date'] for reservation in response.data], ['2018-02-01', '2018-01-01'])
+
+        response = client.get(reverse('guest-stats', args=[guest.pk]))
+        self.assertEqual(response.data, {'stay_count': 1, 'total_nights': 1, 'last_checkout': None})
+
+        response = client.get(reverse('guest-stats', args=[Guest.objects.create(first_name='Pindar').pk]))
+        self.assertEqual(response.data, {'stay_count': 0, 'total_nights': 0, 'last_checkout': None})
+
     def test_update_guest(self):
         client = APIClient()
 
@@ -276,6 +1291,209 @@ class GuestIntegrationTest(TestCase):
         self.assertEquals(guest.last_name, 'Ciccone')
 
 
+class HotelIntegrationTest(TestCase):
+    """
+    Test Hotel resource actions
+    """
+
+    HotelViewSet.throttle_classes = ()
+    RoomViewSet.throttle_classes = ()
+
+    def test_hotel_rooms_and_reservations(self):
+        client = APIClient()
+        today = datetime.utcnow().date()
+
+        response = client.post(reverse('hotel-list'), {'name': 'Lido'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        hotel = response.data['id']
+
+        response = client.post(reverse('room-list'), {'number': '101', 'hotel': hotel})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        room = response.data['id']
+        # The same number may be taken in another Hotel, or by a Room not in any Hotel, but not twice in one Hotel.
+        self.assertEqual(client.post(reverse('room-list'), {'number': '101'}).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(client.post(reverse('room-list'), {'number': '101', 'hotel': hotel}).status_code, status.HTTP_400_BAD_REQUEST)
+        # Rooms stay in their Hotel.
+        response = client.patch(reverse('room-detail', args=[room]), {'hotel': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        guest = Guest.objects.create(first_name='Marco')
+        response = client.post(reverse('reservation-list'), {
+            'in_date': today, 'out_date': today + timedelta(days=5), 'guest': guest.pk, 'room': room, 'status': 'pending'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        reservation = response.data['id']
+
+        response = client.get(reverse('hotel-rooms', args=[hotel]))
+        self.assertEqual([room['number'] for room in response.data['results']], ['101'])
+        response = client.get(reverse('hotel-reservations', args=[hotel]))
+        self.assertEqual([reservation['id'] for reservation in response.data['results']], [reservation])
+
+        response = client.get(reverse('hotel-current-and-upcoming', args=[hotel]), {'days': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([str(upcoming['reservation_id']) for upcoming in response.data], [reservation])
+        self.assertEqual(response.data[0]['first_name'], 'Marco')
+        # The Reservations of Hotels are not in the view of Rooms not in any Hotel.
+        self.assertEqual(client.get(reverse('currentandupcomingreservation-list')).data, [])
+
+        response = client.get(reverse('hotel-current-and-upcoming', args=[hotel]), {'days': 1}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = client.get(reverse('hotel-current-and-upcoming', args=[hotel]), {'days': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_hotel_rooms_paginated(self):
+        client = APIClient()
+        hotel = Hotel.objects.create(name='Lido')
+        for number in ('103', '101', '102'):
+            Room.objects.create(number=number, hotel=hotel)
+
+        response = client.get(reverse('hotel-rooms', args=[hotel.pk]), {'limit': 2})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([room['number'] for room in response.data['results']], ['101', '102'])
+
+        response = client.get(response.data['next'])
+        self.assertEqual([room['number'] for room in response.data['results']], ['103'])
+        self.assertIsNone(response.data['next'])
+
+        # Pages are bounded however many are asked for.
+        response = client.get(reverse('hotel-reservations', args=[hotel.pk]), {'limit': 10 ** 6})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+
+class HotelDatabaseIntegrationTest(TransactionTestCase):
+    """
+    Test that the Rooms and Reservations of a Hotel with a database of its own are served along with the rest.
+    The Hotel's database is a test database of its own, created for these tests.
+    """
+
+    databases = {'default', 'hotel_test'}
+
+    HotelViewSet.throttle_classes = ()
+    RoomViewSet.throttle_classes = ()
+    ReservationViewSet.throttle_classes = ()
+    GuestViewSet.throttle_classes = ()
+    ArchivedReservationViewSet.throttle_classes = ()
+    OccupancyReportViewSet.throttle_classes = ()
+
+    @classmethod
+    def setUpClass(cls):
+        # The alias must exist before the test case wraps its databases' connections.
+        connections.databases['hotel_test'] = dict(connections.databases['default'], NAME=cls.hotel_database_name(), TEST={})
+        connections['hotel_test'].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        super(HotelDatabaseIntegrationTest, cls).setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(HotelDatabaseIntegrationTest, cls).tearDownClass()
+        connections['hotel_test'].creation.destroy_test_db(cls.hotel_database_name(), verbosity=0)
+        del connections.databases['hotel_test']
+
+    @classmethod
+    def hotel_database_name(cls):
+        return connections.databases['default']['NAME'] + '_hotel'
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        hotel_id = uuid7()
+        self.settings = override_settings(RESERVATIONS_HOTEL_DATABASES={str(hotel_id): 'hotel_test'})
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+        hotel = Hotel.objects.create(pk=hotel_id, name='Lido')
+        self.guest = Guest.objects.create(first_name='Marco')
+        # Guests are replicated to each Hotel's database.
+        Guest.objects.using('hotel_test').create(pk=self.guest.pk, first_name='Marco')
+
+        self.room = Room.objects.create(number='100')
+        self.hotel_room = Room.objects.create(number='101', hotel=hotel)
+        self.reservation = Reservation.objects.create(
+            in_date=self.today, out_date=self.today + timedelta(days=2), guest=self.guest, room=self.room
+        )
+        self.hotel_reservation = Reservation.objects.create(
+            in_date=self.today, out_date=self.today + timedelta(days=3), guest=self.guest, room=self.hotel_room
+        )
+
+    def test_hotel_reservations_live_on_hotel_database(self):
+        self.assertFalse(Reservation.objects.filter(pk=self.hotel_reservation.pk).exists())
+        self.assertTrue(Reservation.objects.using('hotel_test').filter(pk=self.hotel_reservation.pk).exists())
+
+    def test_list_and_retrieve(self):
+        client = APIClient()
+
+        response = client.get(reverse('reservation-list'))
+        self.assertEqual({reservation['id'] for reservation in response.data}, {str(self.reservation.pk), str(self.hotel_reservation.pk)})
+        response = client.get(reverse('reservation-detail', args=[self.hotel_reservation.pk]))
+        self.assertEqual(response.data['id'], str(self.hotel_reservation.pk))
+        response = client.patch(reverse('reservation-detail', args=[self.hotel_reservation.pk]), {'status': 'checked_in'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Reservation.objects.using('hotel_test').get(pk=self.hotel_reservation.pk).status, ReservationState.checked_in)
+        self.assertEqual(client.get(reverse('reservation-detail', args=[uuid7()])).status_code, status.HTTP_404_NOT_FOUND)
+
+        response = client.get(reverse('room-list'))
+        self.assertEqual([room['number'] for room in response.data], ['101', '100'])
+        response = client.get(reverse('room-detail', args=[self.hotel_room.pk]))
+        self.assertEqual(response.data['number'], '101')
+
+    def test_batch_get(self):
+        client = APIClient()
+
+        response = client.post(reverse('reservation-batch-get'), {'ids': [self.hotel_reservation.pk, self.reservation.pk]}, format='json')
+        self.assertEqual([reservation['id'] for reservation in response.data['reservations']], [str(self.hotel_reservation.pk), str(self.reservation.pk)])
+        self.assertEqual(response.data['missing'], [])
+
+    def test_front_desk(self):
+        client = APIClient()
+
+        response = client.get(reverse('reservation-arrivals'))
+        self.assertEqual([reservation['room_number'] for reservation in response.data], ['100', '101'])
+
+    def test_guest_reservations_and_stats(self):
+        client = APIClient()
+        for reservation in (self.reservation, self.hotel_reservation):
+            reservation.status = ReservationState.checked_in
+            reservation.save()
+
+        response = client.get(reverse('guest-reservations', args=[self.guest.pk]))
+        self.assertEqual({reservation['id'] for reservation in response.data}, {str(self.reservation.pk), str(self.hotel_reservation.pk)})
+
+        response = client.get(reverse('guest-stats', args=[self.guest.pk]))
+        self.assertEqual(response.data['stay_count'], 2)
+        self.assertEqual(response.data['total_nights'], 5)
+
+    def test_occupancy_report(self):
+        client = APIClient()
+
+        response = client.get(reverse('dailyoccupancy-list'), {'from': self.today, 'to': self.today})
+        self.assertEqual(response.data[0]['rooms_occupied'], 2)
+        self.assertEqual(response.data[0]['arrivals'], 2)
+
+    def test_archive(self):
+        client = APIClient()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for reservation in (self.reservation, self.hotel_reservation):
+            Reservation.objects.using(reservation._state.db).filter(pk=reservation.pk).update(
+                status=ReservationState.checked_out,
+                checkout_datetime=timezone.now() - timedelta(days=400)
+            )
+
+        with override_settings(RESERVATIONS_ARCHIVE_DIR=directory.name):
+            call_command('archive_reservations', stdout=open(os.devnull, 'w'))
+
+            self.assertFalse(Reservation.objects.using('hotel_test').exists())
+            archived = ArchivedReservation.objects.using('hotel_test').get()
+            self.assertEqual(archived.reservation_id, self.hotel_reservation.pk)
+
+            response = client.get(reverse('archivedreservation-list'), {'guest': self.guest.pk})
+            self.assertEqual([snapshot['room_number'] for snapshot in response.data], ['100', '101'])
+            response = client.get(reverse('archivedreservation-detail', args=[archived.pk]))
+            self.assertEqual(response.data['room_number'], '101')
+
+
 class RoomIntegrationTest(TestCase):
     """
     Test Room resource actions
@@ -325,6 +1543,24 @@ class RoomIntegrationTest(TestCase):
         response = client.post(reverse('room-list'), {'number': 'ABC101'})
         self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_availability(self):
+        client = APIClient()
+        guest = Guest.objects.create(first_name='Noether')
+        rooms = [Room.objects.create(number='ABC10{}'.format(number)) for number in range(2)]
+        Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-03', guest=guest, room=rooms[0])
+
+        response = client.get(reverse('room-availability'), {'from': '2018-01-01', 'to': '2018-01-03'})
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals([(night['night'], night['rooms'], night['rooms_free']) for night in response.data], [
+            (datetime(2018, 1, 1).date(), 2, 1), (datetime(2018, 1, 2).date(), 2, 1), (datetime(2018, 1, 3).date(), 2, 2),
+        ])
+
+        response = client.get(reverse('room-availability'), {'from': '2018-01-01', 'to': '2018-01-01', 'hotel': uuid.uuid4()})
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = client.get(reverse('room-availability'), {'from': '2018-01-03', 'to': '2018-01-01'})
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class ReservationIntegrationTest(TestCase):
     """
@@ -337,6 +1573,168 @@ class ReservationIntegrationTest(TestCase):
         Guest.objects.create(first_name='Cleopatra')
         Room.objects.create(number='ABC101')
 
+    def test_sparse_fieldsets(self):
+        client = APIClient()
+        for day in range(1, 10, 2):
+            Reservation.objects.create(
+                in_date='2018-01-{:02}'.format(day), out_date='2018-01-{:02}'.format(day + 1),
+                guest=Guest.objects.first(), room=Room.objects.first()
+            )
+        full = client.get(reverse('reservation-list'))
+
+        with CaptureQueriesContext(connection) as queries:
+            sparse = client.get(reverse('reservation-list'), {'fields': 'id,in_date,out_date,status'})
+
+        self.assertEqual(sparse.status_code, status.HTTP_200_OK)
+        self.assertEqual([list(reservation) for reservation in sparse.data], [['id', 'in_date', 'out_date', 'status']] * 5)
+        self.assertLess(len(sparse.content), len(full.content) / 2)
+        # Reservations keep a FieldTracker, which can not track deferred fields, so every column is still loaded.
+        select = [query['sql'] for query in queries.captured_queries if 'FROM "reservations_reservation"' in query['sql']]
+        self.assertEqual(len(select), 1)
+        self.assertIn('checkin_datetime', select[0])
+
+        # Rooms are not tracked, so only the columns of the fields chosen are loaded.
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('room-list'), {'fields': 'id,number'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        select = [query['sql'] for query in queries.captured_queries if 'FROM "reservations_room"' in query['sql']]
+        self.assertEqual(len(select), 1)
+        self.assertNotIn('"updated"', select[0])
+        self.assertNotIn('hotel_id', select[0])
+
+        response = client.get(reverse('reservation-detail', args=[Reservation.objects.first().pk]), {'fields': 'url,room'})
+        self.assertEqual(list(response.data), ['url', 'room'])
+
+        response = client.get(reverse('reservation-list'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+        response = client.get(reverse('currentandupcomingreservation-list'), {'fields': 'room_number'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_sparse_fieldsets_of_extra_actions(self):
+        client = APIClient()
+        cache.clear()
+        today = timezone.localdate()
+        guest = Guest.objects.first()
+        hotel = Hotel.objects.create(name='Lido')
+        Room.objects.create(number='101', hotel=hotel)
+        reservation = Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=guest, room=Room.objects.get(number='ABC101'))
+
+        # Each action's fields are those of the serializer it responds with.
+        response = client.get(reverse('guest-reservations', args=[guest.pk]), {'fields': 'id,in_date'})
+        self.assertEqual([list(item) for item in response.data], [['id', 'in_date']])
+        response = client.get(reverse('guest-stats', args=[guest.pk]), {'fields': 'stay_count'})
+        self.assertEqual(response.data, {'stay_count': 0})
+        response = client.get(reverse('reservation-arrivals'), {'fields': 'id,room_number'})
+        self.assertEqual(response.data, [{'id': str(reservation.pk), 'room_number': 'ABC101'}])
+        response = client.get(reverse('reservation-departures'), {'fields': 'id,room_number'})
+        self.assertEqual(response.data, [])
+        response = client.post(reverse('reservation-batch-get') + '?fields=id,room_number', {'ids': [reservation.pk]}, format='json')
+        self.assertEqual(response.data['reservations'], [{'id': str(reservation.pk), 'room_number': 'ABC101'}])
+        response = client.get(reverse('hotel-rooms', args=[hotel.pk]), {'fields': 'number'})
+        self.assertEqual(response.data['results'], [{'number': '101'}])
+        response = client.get(reverse('hotel-reservations', args=[hotel.pk]), {'fields': 'in_date'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Fields of the view set's own serializer are not accepted by actions responding with another.
+        response = client.get(reverse('guest-reservations', args=[guest.pk]), {'fields': 'first_name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.get(reverse('reservation-arrivals'), {'fields': 'url'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Actions which do not serialize a model may not choose fields at all.
+        response = client.get(reverse('reservation-changes'), {'fields': 'version'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+    def test_create_reservation_looks_up_guest_and_room_through_cache(self):
+        client = APIClient()
+        local_hits = lookup_cache.lookups.value('local_hit')
+        reservation = {'guest': Guest.objects.first().pk, 'room': Room.objects.first().pk}
+
+        client.post(reverse('reservation-list'), dict(reservation, in_date='2018-01-01', out_date='2018-01-02'))
+        response = client.post(reverse('reservation-list'), dict(reservation, in_date='2018-01-03', out_date='2018-01-04'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(lookup_cache.lookups.value('local_hit'), local_hits + 2)
+
+        response = client.post(reverse('reservation-list'), dict(reservation, room=uuid.uuid4(), in_date='2018-01-05', out_date='2018-01-06'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('room', response.data)
+
+    def test_batch_status(self):
+        client = APIClient()
+        # Batches are throttled by the global rates only.
+        cache.clear()
+        rooms = [Room.objects.first(), Room.objects.create(number='ABC102')]
+        reservations = [
+            Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-02', guest=Guest.objects.first(), room=room)
+            for room in rooms
+        ]
+
+        response = client.post(reverse('reservation-batch-status'), {
+            'ids': [str(reservation.pk) for reservation in reservations], 'status': 'checked_in'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([reservation['status'] for reservation in response.data], ['checked_in', 'checked_in'])
+        self.assertEqual(Reservation.objects.filter(status=ReservationState.checked_in).count(), 2)
+
+    def test_batch_status_rejects_invalid_transitions(self):
+        client = APIClient()
+        cache.clear()
+        reservation = Reservation.objects.create(
+            in_date='2018-01-01', out_date='2018-01-02', guest=Guest.objects.first(), room=Room.objects.first()
+        )
+
+        response = client.post(reverse('reservation-batch-status'), {
+            'ids': [str(reservation.pk)], 'status': 'checked_out'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(reservation.pk), response.data)
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).status, ReservationState.pending)
+
+    def test_batch_get(self):
+        client = APIClient()
+        cache.clear()
+        rooms = [Room.objects.first(), Room.objects.create(number='ABC102')]
+        reservations = [
+            Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-02', guest=Guest.objects.first(), room=room)
+            for room in rooms
+        ]
+        missing = uuid.uuid4()
+        ids = [str(reservations[1].pk), str(missing), str(reservations[0].pk), str(reservations[1].pk)]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('reservation-batch-get'), {'ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([reservation['id'] for reservation in response.data['reservations']],
+                         [str(reservations[1].pk), str(reservations[0].pk)])
+        self.assertEqual([reservation['room_number'] for reservation in response.data['reservations']], ['ABC102', 'ABC101'])
+        self.assertEqual(response.data['reservations'][0]['guest_first_name'], Guest.objects.first().first_name)
+        self.assertEqual(response.data['missing'], [missing])
+        # Reservations are read with their Guests and Rooms by one query.
+        reads = [query['sql'] for query in queries.captured_queries if 'reservations_reservation' in query['sql']]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('= ANY(', reads[0])
+
+    def test_batch_get_capped(self):
+        client = APIClient()
+        cache.clear()
+
+        response = client.post(reverse('reservation-batch-get'), {
+            'ids': [str(uuid.uuid4()) for _ in range(ReservationBatchGetSerializer.max_batch_size + 1)]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', response.data)
+
+        cache.clear()
+        response = client.post(reverse('reservation-batch-get'), {'ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_reservation(self):
         client = APIClient()
 
@@ -390,6 +1788,768 @@ class ReservationIntegrationTest(TestCase):
         self.assertEqual(reservation.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIs(Reservation.objects.count(), 0)
 
+    def test_reservation_holds_a_night(self):
+        client = APIClient()
+
+        # A Reservation departing the day it arrives would hold no night of its Room.
+        response = client.post(reverse('reservation-list'), {
+            'in_date': '2018-01-01', 'out_date': '2018-01-01',
+            'guest': Guest.objects.first().pk, 'room': Room.objects.first().pk
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIs(Reservation.objects.count(), 0)
+
+        reservation = Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-02', guest=Guest.objects.first(), room=Room.objects.first())
+        response = client.patch(reverse('reservation-detail', args=[reservation.pk]), {'out_date': '2018-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.get().out_date, datetime(year=2018, month=1, day=2).date())
+
+
+class CurrentAndUpcomingReservationIntegrationTest(TestCase):
+    """
+    Test CurrentAndUpcomingReservation resource actions
+    """
+
+    CurrentAndUpcomingReservationViewSet.throttle_classes = ()
+
+    def setUp(self):
+        today = datetime.utcnow().date()
+        guest = Guest.objects.create(first_name='Archimedes')
+        room = Room.objects.create(number='ABC101')
+        Reservation.objects.create(in_date=today - timedelta(days=3), out_date=today - timedelta(days=1), guest=guest, room=room)
+        Reservation.objects.create(in_date=today, out_date=today + timedelta(days=1), guest=guest, room=room)
+        Reservation.objects.create(in_date=today + timedelta(days=1), out_date=today + timedelta(days=2), guest=guest,
+                                   room=Room.objects.create(number='ABC102'))
+
+    def test_list_current_and_upcoming_reservations(self):
+        client = APIClient()
+        today = datetime.utcnow().date()
+
+        response = client.get(reverse('currentandupcomingreservation-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([reservation['in_date'] for reservation in response.data],
+                         [str(today), str(today + timedelta(days=1))])
+        self.assertEqual(response.data[0]['first_name'], 'Archimedes')
+        self.assertEqual(response.data[0]['status'], 'pending')
+
+    def test_list_current_and_upcoming_reservations_days_ahead(self):
+        client = APIClient()
+        today = datetime.utcnow().date()
+        reservation = Reservation.objects.create(in_date=today + timedelta(days=7), out_date=today + timedelta(days=9),
+                                                 guest=Guest.objects.first(), room=Room.objects.get(number='ABC101'))
+
+        response = client.get(reverse('currentandupcomingreservation-list'), {'days': 1})
+        self.assertEqual([reservation['in_date'] for reservation in response.data], [str(today)])
+
+        # The default number of days ahead lists the same Reservations as not asking.
+        response = client.get(reverse('currentandupcomingreservation-list'), {'days': 3})
+        self.assertEqual(response.data, client.get(reverse('currentandupcomingreservation-list')).data)
+
+        response = client.get(reverse('currentandupcomingreservation-list'), {'days': 8})
+        self.assertEqual([reservation['in_date'] for reservation in response.data],
+                         [str(today), str(today + timedelta(days=1)), str(today + timedelta(days=7))])
+
+        response = client.get(reverse('currentandupcomingreservation-detail', args=[reservation.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = client.get(reverse('currentandupcomingreservation-detail', args=[reservation.pk]), {'days': 8})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for days in (0, CURRENT_AND_UPCOMING_MAX_DAYS + 1, 'week'):
+            response = client.get(reverse('currentandupcomingreservation-list'), {'days': days})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_current_and_upcoming_reservations_not_modified(self):
+        client = APIClient()
+
+        response = client.get(reverse('currentandupcomingreservation-list'))
+        etag = response['ETag']
+        response = client.get(reverse('currentandupcomingreservation-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        Reservation.objects.create(in_date=datetime.utcnow().date(), out_date=datetime.utcnow().date() + timedelta(days=1),
+                                   guest=Guest.objects.first(), room=Room.objects.create(number='ABC103'))
+        response = client.get(reverse('currentandupcomingreservation-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Tags of another day are stale, whatever their version.
+        stale = etag.replace(str(datetime.utcnow().date()), str(datetime.utcnow().date() - timedelta(days=1)))
+        response = client.get(reverse('currentandupcomingreservation-list'), HTTP_IF_NONE_MATCH=stale)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_snapshot_age(self):
+        client = APIClient()
+
+        response = client.get(reverse('currentandupcomingreservation-list'))
+        self.assertGreaterEqual(float(response['X-Snapshot-Age']), 0)
+        response = client.get(reverse('currentandupcomingreservation-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertIn('X-Snapshot-Age', response)
+
+    def test_refreshes(self):
+        client = APIClient()
+        name = CurrentAndUpcomingReservation._meta.db_table
+
+        response = client.get(reverse('currentandupcomingreservation-refreshes'))
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        response = client.get(reverse('currentandupcomingreservation-refreshes'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        refresh = response.data[0]
+        self.assertEqual((refresh['view'], refresh['hotel'], refresh['version']), (name, None, 3))
+        # The view holds every Reservation of the days which may be asked for, past ones excluded.
+        self.assertEqual(refresh['row_count'], 2)
+        self.assertEqual(refresh['lag_seconds'], 0)
+        self.assertTrue(refresh['unique_index'])
+        self.assertGreater(refresh['duration_ms'], 0)
+        self.assertEqual(refresh['failed_refreshes'], 0)
+        self.assertFalse(ViewRefreshFailure.objects.exists())
+
+        # Writes which bypass saving leave the view behind.
+        Reservation.objects.filter(room__number='ABC101').update(updated=timezone.now() + timedelta(minutes=1))
+        refresh = client.get(reverse('currentandupcomingreservation-refreshes')).data[0]
+        self.assertGreater(refresh['lag_seconds'], 50)
+
+        # Every view is reported on once a scrape, however many gauges report it.
+        with mock.patch.object(freshness.collector, 'collect', wraps=freshness.reports) as collect:
+            metrics = client.get(reverse('metrics')).content.decode()
+        self.assertEqual(collect.call_count, 1)
+        self.assertIn('reservations_view_lag_seconds{{view="{}"}}'.format(name), metrics)
+        self.assertIn('reservations_view_rows{{view="{}"}} 2'.format(name), metrics)
+        self.assertIn('reservations_view_unique_index{{view="{}"}} 1'.format(name), metrics)
+        self.assertIn('reservations_view_refresh_failures{{view="{}"}} 0'.format(name), metrics)
+
+
+class ViewRefreshFailureTest(TransactionTestCase):
+    """
+    Test that failed refreshes of current and upcoming views are logged although they fail their transaction.
+    Failures are logged over a connection of their own, so these tests commit.
+    """
+
+    def test_refresh_failures_logged(self):
+        name = CurrentAndUpcomingReservation._meta.db_table
+
+        with mock.patch('reservations.api.models.refresh_view', side_effect=DatabaseError('refresh failed')), \
+                self.assertRaises(DatabaseError), transaction.atomic():
+            Reservation.objects.create(in_date=datetime.utcnow().date(), out_date=datetime.utcnow().date() + timedelta(days=1),
+                                       guest=Guest.objects.create(first_name='Napoleon'), room=Room.objects.create(number='ABC101'))
+        self.assertFalse(Reservation.objects.exists())
+
+        self.assertEqual(ViewRefreshFailure.objects.get(name=name).error, 'refresh failed')
+        self.assertEqual(freshness.reports()[0]['failed_refreshes'], 1)
+
+    def test_refresh_error_raised_when_logging_it_fails(self):
+        guest, room = Guest.objects.create(first_name='Napoleon'), Room.objects.create(number='ABC101')
+
+        with mock.patch('reservations.api.models.refresh_view', side_effect=DatabaseError('refresh failed')), \
+                mock.patch('reservations.api.models.VIEW_REFRESH_FAILURE_SQL', 'SELECT * FROM missing'), \
+                self.assertLogs('reservations.api.models', 'ERROR'), self.assertRaisesMessage(DatabaseError, 'refresh failed'), \
+                transaction.atomic():
+            Reservation.objects.create(in_date=datetime.utcnow().date(), out_date=datetime.utcnow().date() + timedelta(days=1),
+                                       guest=guest, room=room)
+        self.assertFalse(ViewRefreshFailure.objects.exists())
+
+
+class ArchivedReservationIntegrationTest(TestCase):
+    """
+    Test ArchivedReservation resource actions
+    """
+
+    ArchivedReservationViewSet.throttle_classes = ()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = override_settings(RESERVATIONS_ARCHIVE_DIR=self.directory.name)
+        self.settings.enable()
+
+        guest = Guest.objects.create(first_name='Aristotle')
+        rooms = [Room.objects.create(number='ABC101'), Room.objects.create(number='ABC102')]
+        for room, in_date, out_date in ((rooms[0], '2018-01-01', '2018-01-03'), (rooms[1], '2018-02-01', '2018-02-03')):
+            reservation = Reservation.objects.create(in_date=in_date, out_date=out_date, guest=guest, room=room)
+            Reservation.objects.filter(pk=reservation.pk).update(
+                status=ReservationState.checked_out,
+                checkout_datetime=timezone.now() - timedelta(days=400)
+            )
+        call_command('archive_reservations', stdout=open(os.devnull, 'w'))
+
+    def tearDown(self):
+        self.settings.disable()
+        self.directory.cleanup()
+
+    def test_list_requires_filter(self):
+        client = APIClient()
+
+        response = client.get(reverse('archivedreservation-list'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_by_guest_room_and_date_range(self):
+        client = APIClient()
+
+        response = client.get(reverse('archivedreservation-list'), {'guest': Guest.objects.first().pk})
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]['guest_first_name'], 'Aristotle')
+        self.assertEqual(response.data[0]['room_number'], 'ABC101')
+        self.assertEqual(response.data[0]['status'], 'checked_out')
+
+        response = client.get(reverse('archivedreservation-list'), {'room': Room.objects.get(number='ABC102').pk})
+        self.assertEqual([archived['in_date'] for archived in response.data], ['2018-02-01'])
+
+        response = client.get(reverse('archivedreservation-list'), {'from': '2018-01-02', 'to': '2018-01-31'})
+        self.assertEqual([archived['in_date'] for archived in response.data], ['2018-01-01'])
+
+    def test_get_archived_reservation(self):
+        client = APIClient()
+        archived = ArchivedReservation.objects.first()
+
+        response = client.get(reverse('archivedreservation-detail', args=[archived.pk]))
+
+        self.assertEqual(response.data['id'], str(archived.pk))
+        self.assertEqual(response.data['guest_last_name'], None)
+
+
+class OccupancyReportIntegrationTest(TestCase):
+    """
+    Test occupancy report actions
+    """
+
+    OccupancyReportViewSet.throttle_classes = ()
+
+    def test_report_requires_date_range(self):
+        client = APIClient()
+
+        response = client.get(reverse('dailyoccupancy-list'), {'from': '2018-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = client.get(reverse('dailyoccupancy-list'), {'from': '2018-01-02', 'to': '2018-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_report_occupancy(self):
+        client = APIClient()
+        Reservation.objects.create(
+            in_date='2018-01-02', out_date='2018-01-03',
+            guest=Guest.objects.create(first_name='Euclid'), room=Room.objects.create(number='ABC101')
+        )
+
+        response = client.get(reverse('dailyoccupancy-list'), {'from': '2018-01-01', 'to': '2018-01-03'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'date': '2018-01-01', 'rooms_occupied': 0, 'arrivals': 0, 'departures': 0, 'check_ins': 0},
+            {'date': '2018-01-02', 'rooms_occupied': 1, 'arrivals': 1, 'departures': 0, 'check_ins': 0},
+            {'date': '2018-01-03', 'rooms_occupied': 0, 'arrivals': 0, 'departures': 1, 'check_ins': 0},
+        ])
+
+
+class FrontDeskIntegrationTest(TransactionTestCase):
+    """
+    Test front desk arrivals and departures actions
+    Front desk lists are invalidated once transactions commit, so these tests commit.
+    """
+
+    ReservationViewSet.throttle_classes = ()
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.guest = Guest.objects.create(first_name='Galen')
+        self.room = Room.objects.create(number='ABC101')
+        self.reservation = Reservation.objects.create(
+            in_date=self.today, out_date=self.today + timedelta(days=2), guest=self.guest, room=self.room
+        )
+        Reservation.objects.create(
+            in_date=self.today + timedelta(days=3), out_date=self.today + timedelta(days=4), guest=self.guest, room=self.room
+        )
+
+    def test_arrivals_and_departures(self):
+        client = APIClient()
+
+        response = client.get(reverse('reservation-arrivals'))
+        self.assertEqual([arrival['id'] for arrival in response.data], [str(self.reservation.pk)])
+        self.assertEqual(response.data[0]['first_name'], 'Galen')
+        self.assertEqual(response.data[0]['room_number'], 'ABC101')
+
+        departure_date = str(self.today + timedelta(days=2))
+        response = client.get(reverse('reservation-departures'), {'date': departure_date})
+        self.assertEqual(response.data, [])
+
+        # Checking in moves the Reservation from today's arrivals to its departure date's departures.
+        self.reservation.status = ReservationState.checked_in
+        self.reservation.save()
+        self.assertEqual(client.get(reverse('reservation-arrivals')).data, [])
+        response = client.get(reverse('reservation-departures'), {'date': departure_date})
+        self.assertEqual([departure['id'] for departure in response.data], [str(self.reservation.pk)])
+
+        self.reservation.status = ReservationState.checked_out
+        self.reservation.save()
+        self.assertEqual(client.get(reverse('reservation-departures'), {'date': departure_date}).data, [])
+
+    def test_served_from_cache_until_invalidated(self):
+        client = APIClient()
+        call_command('warm_front_desk', stdout=open(os.devnull, 'w'))
+
+        with self.assertNumQueries(0):
+            response = client.get(reverse('reservation-arrivals'))
+        self.assertEqual(len(response.data), 1)
+
+        # Saving a Reservation of another date leaves today's arrivals cached.
+        other = Reservation.objects.exclude(pk=self.reservation.pk).get()
+        other.status = ReservationState.checked_in
+        other.save()
+        self.assertIsNotNone(cache.get(front_desk.cache_key(front_desk.ARRIVALS, self.today)))
+
+        # Renaming the Guest invalidates the lists showing their name.
+        self.guest.first_name = 'Aelius'
+        self.guest.save()
+        self.assertEqual(client.get(reverse('reservation-arrivals')).data[0]['first_name'], 'Aelius')
+
+    def test_read_before_a_write_not_served_after_it(self):
+        query = front_desk.query
+
+        def read_then_check_in(kind, date):
+            reservations = list(query(kind, date))
+            # The check-in commits after the arrivals were read, but before they are cached.
+            self.reservation.status = ReservationState.checked_in
+            self.reservation.save()
+            return reservations
+
+        with mock.patch.object(front_desk, 'query', side_effect=read_then_check_in):
+            self.assertEqual(len(front_desk.get(front_desk.ARRIVALS, self.today)), 1)
+        self.assertEqual(front_desk.get(front_desk.ARRIVALS, self.today), [])
+
+
+class ImportIntegrationTest(TestCase):
+    """
+    Test bulk import actions
+    """
+
+    ImportViewSet.throttle_classes = ()
+
+    def test_import_requires_admin(self):
+        client = APIClient()
+
+        response = client.post(reverse('import-rooms'), [{'number': 'ABC101'}], format='json')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+        client.force_authenticate(User.objects.create_user('clerk'))
+        response = client.post(reverse('import-rooms'), [{'number': 'ABC101'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIs(Room.objects.count(), 0)
+
+    def test_import_rooms_and_guests(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        Room.objects.create(number='ABC101')
+
+        response = client.post(reverse('import-rooms'), [{'key': 'a', 'number': 'ABC101'}, {'key': 'b', 'number': 'ABC102'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['imported']), ['b'])
+        self.assertEqual(response.data['conflicts'][0]['key'], 'a')
+
+        upload = io.BytesIO(b'key,first_name,last_name\ng1,Ada,Lovelace\n')
+        upload.name = 'guests.csv'
+        response = client.post(reverse('import-guests'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Guest.objects.get(pk=response.data['imported']['g1']).first_name, 'Ada')
+
+
+class MetricsIntegrationTest(TestCase):
+    """
+    Test metrics action
+    """
+
+    def test_metrics(self):
+        client = APIClient()
+
+        response = client.get(reverse('metrics'))
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        lookup_cache.lookups.inc('miss')
+        response = client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('# TYPE reservations_lookup_cache_total counter', response.content.decode())
+        self.assertIn('reservations_lookup_cache_total{result="miss"}', response.content.decode())
+
+
+class ProfilingIntegrationTest(TestCase):
+    """
+    Test request profiling and profile actions
+    """
+
+    ProfileViewSet.throttle_classes = ()
+    ReservationViewSet.throttle_classes = ()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = override_settings(RESERVATIONS_PROFILE_DIR=self.directory.name)
+        self.settings.enable()
+
+        cache.clear()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.create_user('clerk', 'clerk@example.com', 'password')
+        self.guest = Guest.objects.create(first_name='Ada')
+        self.room = Room.objects.create(number='ABC101')
+
+    def tearDown(self):
+        self.settings.disable()
+        self.directory.cleanup()
+
+    def client_of(self, username):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode('{}:password'.format(username).encode()).decode())
+        return client
+
+    def test_only_staff_profiled(self):
+        for username, params in (('clerk', {'profile': 1}), ('admin', {}), ('admin', {'profile': 0})):
+            response = self.client_of(username).get(reverse('reservation-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('X-Profile', response)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_profile(self):
+        client = self.client_of('admin')
+        today = datetime.utcnow().date()
+        response = client.post(reverse('reservation-list'), {
+            'in_date': today, 'out_date': today + timedelta(days=1), 'guest': self.guest.pk, 'room': self.room.pk, 'status': 'pending'
+        }, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        profile_id = response['X-Profile']
+
+        self.assertEqual(client.get(reverse('profile-list')).data, [profile_id])
+
+        profile = client.get(reverse('profile-detail', args=[profile_id])).data
+        self.assertEqual(profile['status'], status.HTTP_201_CREATED)
+        self.assertEqual(profile['functions']['Reservation.save']['calls'], 1)
+        self.assertEqual(profile['functions']['refresh_current_and_upcoming']['calls'], 1)
+        self.assertGreater(profile['queries']['count'], 0)
+        self.assertTrue(any(query['sql'].startswith('INSERT INTO "reservations_reservation"') for query in profile['queries']['log']))
+        self.assertTrue(all(query['explain'] for query in profile['queries']['slowest'] if query['sql'].startswith('SELECT')))
+        self.assertIn('cumulative', profile['profile'])
+
+        response = client.get(reverse('profile-pstats', args=[profile_id]))
+        with tempfile.NamedTemporaryFile() as stats:
+            stats.write(b''.join(response.streaming_content))
+            stats.flush()
+            self.assertGreater(pstats.Stats(stats.name).total_calls, 0)
+
+        self.assertEqual(client.get(reverse('profile-detail', args=[uuid7()])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(client.get(reverse('profile-detail', args=['not-a-profile'])).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.client_of('clerk').get(reverse('profile-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_profile_leaves_out_query_string(self):
+        client = self.client_of('admin')
+        response = client.get(reverse('guest-list'), {'search': 'Ada', 'profile': 1})
+        profile = client.get(reverse('profile-detail', args=[response['X-Profile']])).data
+        self.assertEqual(profile['path'], reverse('guest-list'))
+
+
+@override_settings(RESERVATIONS_LONG_POLL_SECONDS=1)
+class LongPollIntegrationTest(TransactionTestCase):
+    """
+    Test changes action and long polling served asynchronously
+    Long polls are answered once changes commit, so these tests commit.
+    """
+
+    def setUp(self):
+        self.today = datetime.utcnow().date()
+        self.guest = Guest.objects.create(first_name='Hypatia')
+        self.room = Room.objects.create(number='ABC101')
+
+    def reserve(self, days=0):
+        return Reservation.objects.create(in_date=self.today + timedelta(days=days), out_date=self.today + timedelta(days=days + 1),
+                                          guest=self.guest, room=self.room)
+
+    def poll(self, path, headers=(), change=False):
+        """
+        GET a path from the ASGI application, reserving the Room while the request waits if asked to.
+        :return: tuple of whether the response was waited for, and the response
+        """
+        async def poll():
+            communicator = HttpCommunicator(asgi.application, 'GET', path, headers=[(b'host', b'localhost')] + list(headers))
+            response = asyncio.ensure_future(communicator.get_response(timeout=5))
+            try:
+                await asyncio.sleep(0.3)
+                waited = not response.done()
+                if change:
+                    await database_sync_to_async(self.reserve)(days=2)
+                return waited, await response
+            finally:
+                changes.close_listeners()
+
+        return async_to_sync(poll)()
+
+    def test_changes(self):
+        client = APIClient()
+        version = client.get(reverse('reservation-changes')).data['version']
+        self.reserve()
+        self.assertEqual(client.get(reverse('reservation-changes')).data, {'hotel': None, 'version': version + 1})
+
+        hotel = Hotel.objects.create(name='Alexandria')
+        Reservation.objects.create(in_date=self.today, out_date=self.today + timedelta(days=1), guest=self.guest,
+                                   room=Room.objects.create(number='101', hotel=hotel))
+        self.assertEqual(client.get(reverse('reservation-changes'), {'hotel': hotel.pk}).data['version'], 1)
+        self.assertEqual(client.get(reverse('reservation-changes')).data['version'], version + 1)
+        self.assertEqual(client.get(reverse('reservation-changes'), {'hotel': uuid7()}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_changes_long_poll(self):
+        version = ViewVersion.current(CurrentAndUpcomingReservation._meta.db_table)
+
+        waited, response = self.poll('/reservations/changes?since={}'.format(version), change=True)
+        self.assertTrue(waited)
+        self.assertEqual(json.loads(response['body'].decode())['version'], version + 1)
+
+        # Clients behind are answered at once.
+        waited, response = self.poll('/reservations/changes?since={}'.format(version))
+        self.assertFalse(waited)
+        self.assertEqual(json.loads(response['body'].decode())['version'], version + 1)
+
+        # Without a change, after the timeout.
+        waited, response = self.poll('/reservations/changes?since={}'.format(version + 1))
+        self.assertTrue(waited)
+        self.assertEqual(json.loads(response['body'].decode())['version'], version + 1)
+
+    def test_current_and_upcoming_long_poll(self):
+        self.reserve()
+        waited, response = self.poll('/reservations/current_and_upcoming')
+        self.assertFalse(waited)
+        self.assertEqual(response['status'], status.HTTP_200_OK)
+        etag = dict(response['headers'])[b'ETag']
+
+        waited, response = self.poll('/reservations/current_and_upcoming', headers=[(b'if-none-match', etag)])
+        self.assertTrue(waited)
+        self.assertEqual(response['status'], status.HTTP_304_NOT_MODIFIED)
+
+        # Not waiting longer than asked to.
+        waited, response = self.poll('/reservations/current_and_upcoming', headers=[(b'if-none-match', etag), (b'prefer', b'wait=0')])
+        self.assertFalse(waited)
+        self.assertEqual(response['status'], status.HTTP_304_NOT_MODIFIED)
+
+        waited, response = self.poll('/reservations/current_and_upcoming', headers=[(b'if-none-match', etag)], change=True)
+        self.assertTrue(waited)
+        self.assertEqual(response['status'], status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(response['body'].decode())), 2)
+        self.assertNotEqual(dict(response['headers'])[b'ETag'], etag)
+
+    def test_woken_polls_wait_for_replicas(self):
+        name = CurrentAndUpcomingReservation._meta.db_table
+
+        # Replicas are read until they hold the version the poll was woken by.
+        versions = iter([4, 4, 5])
+        with mock.patch.object(ViewVersion, 'current', side_effect=lambda *args, **kwargs: next(versions)) as current:
+            self.assertTrue(async_to_sync(changes.replicated)(name, 5, ['replica_0'], 1))
+        self.assertEqual(current.call_count, 3)
+
+        # Or until the poll's wait is over.
+        with mock.patch.object(ViewVersion, 'current', return_value=4):
+            self.assertFalse(async_to_sync(changes.replicated)(name, 5, ['replica_0'], 0.1))
+
+        # Polls of Hotels are answered from the Hotel's own database, never a replica.
+        with override_settings(RESERVATIONS_READ_REPLICAS=['replica_0']):
+            self.assertEqual(CurrentAndUpcomingReservationConsumer({'type': 'http'}).replicas(), ['replica_0'])
+            hotel = HotelCurrentAndUpcomingReservationConsumer({'type': 'http', 'url_route': {'kwargs': {'pk': str(uuid7())}}})
+            self.assertEqual(hotel.replicas(), [])
+
+    def test_long_poll_consumers_know_their_version(self):
+        with self.assertRaises(TypeError):
+            LongPollConsumer({'type': 'http'})
+
+    def test_writes_served(self):
+        body = json.dumps({'in_date': str(self.today), 'out_date': str(self.today + timedelta(days=1)),
+                           'guest': str(self.guest.pk), 'room': str(self.room.pk), 'status': 'pending'}).encode()
+
+        async def post():
+            communicator = HttpCommunicator(asgi.application, 'POST', '/reservations', body=body, headers=[
+                (b'host', b'localhost'), (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())
+            ])
+            return await communicator.get_response(timeout=5)
+
+        cache.clear()
+        self.assertEqual(async_to_sync(post)()['status'], status.HTTP_201_CREATED)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+@override_settings(RESERVATIONS_READ_REPLICAS=['default'])
+class ReplicaReadIntegrationTest(TestCase):
+    """
+    Test that safe requests are read from replicas unless the client has just written.
+    The default database stands in for the replica so that routed reads can be served.
+    """
+
+    GuestViewSet.throttle_classes = ()
+
+    def setUp(self):
+        cache.clear()
+
+    def routed_reads(self, request):
+        # Record, for every read the request makes, whether it was allowed to go to a replica.
+        routed = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def recording_db_for_read(router, model, **hints):
+            routed.append(replica_reads_allowed())
+            return db_for_read(router, model, **hints)
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', recording_db_for_read):
+            request()
+        return routed
+
+    def test_reads_use_replica(self):
+        client = APIClient()
+        guest = Guest.objects.create(first_name='Plato')
+
+        routed = self.routed_reads(lambda: client.get(reverse('guest-reservations', args=[guest.pk])))
+        self.assertTrue(routed)
+        self.assertTrue(all(routed))
+
+    def test_reads_after_write_use_primary(self):
+        client = APIClient()
+
+        response = client.post(reverse('guest-list'), {'first_name': 'Plato'})
+        self.assertTrue(is_sticky('anon_127.0.0.1'))
+
+        routed = self.routed_reads(lambda: client.get(reverse('guest-reservations', args=[response.data['id']])))
+        self.assertTrue(routed)
+        self.assertFalse(any(routed))
+
+    def test_reads_after_write_use_primary_from_any_process(self):
+        client = APIClient()
+
+        response = client.post(reverse('guest-list'), {'first_name': 'Plato'})
+        self.assertIn('replica_sticky', response.cookies)
+        # Another process, whose cache does not hold the mark, still reads the client's writes from the primary.
+        cache.clear()
+
+        routed = self.routed_reads(lambda: client.get(reverse('guest-reservations', args=[response.data['id']])))
+        self.assertTrue(routed)
+        self.assertFalse(any(routed))
+
+        # The cookie is only good for the client it was given to.
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other'))
+        other.cookies = client.cookies
+        routed = self.routed_reads(lambda: other.get(reverse('guest-reservations', args=[response.data['id']])))
+        self.assertTrue(all(routed))
+
+    def test_batch_reads_use_replica(self):
+        client = APIClient()
+        reservation = Reservation.objects.create(in_date='2018-01-01', out_date='2018-01-02', guest=Guest.objects.create(first_name='Plato'),
+                                                 room=Room.objects.create(number='ABC101'))
+
+        responses = []
+        routed = self.routed_reads(lambda: responses.append(
+            client.post(reverse('reservation-batch-get'), {'ids': [str(reservation.pk)]}, format='json')
+        ))
+        self.assertEqual(responses[0].status_code, status.HTTP_200_OK)
+        self.assertTrue(routed)
+        self.assertTrue(all(routed))
+        # Reading in a POST does not make the client read from the primary as if it had written.
+        self.assertNotIn('replica_sticky', responses[0].cookies)
+        self.assertFalse(is_sticky('anon_127.0.0.1'))
+
+    def test_cached_reads_use_primary(self):
+        client = APIClient()
+        Guest.objects.create(first_name='Plato')
+
+        # Cached responses are kept until the next save, so must never be read from a lagging replica.
+        routed = self.routed_reads(lambda: client.get(reverse('guest-list')))
+        self.assertTrue(routed)
+        self.assertFalse(any(routed))
+
+
+class ResponseCacheIntegrationTest(TransactionTestCase):
+    """
+    Test that Room and Guest reads are served from the response cache until a save.
+    Cached responses are dropped once saves commit, so these tests commit.
+    """
+
+    GuestViewSet.throttle_classes = ()
+    RoomViewSet.throttle_classes = ()
+
+    def setUp(self):
+        cache.clear()
+        self.room = Room.objects.create(number='ABC101')
+
+    def test_cached_until_saved(self):
+        client = APIClient()
+
+        response = client.get(reverse('room-detail', args=[self.room.pk]))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(response['Vary'], 'Accept, Authorization, Cookie')
+
+        with self.assertNumQueries(0):
+            cached = client.get(reverse('room-detail', args=[self.room.pk]))
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(cached.content, response.content)
+        self.assertGreater(float(cached['X-Cache-Hit-Rate']), 0)
+
+        client.get(reverse('room-list'))
+        self.assertEqual(client.get(reverse('room-list'))['X-Cache'], 'HIT')
+        client.patch(reverse('room-detail', args=[self.room.pk]), {'number': 'DEF101'})
+
+        response = client.get(reverse('room-list'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(json.loads(response.content.decode())[0]['number'], 'DEF101')
+        self.assertEqual(client.get(reverse('room-detail', args=[self.room.pk]))['X-Cache'], 'MISS')
+
+    def test_keyed_by_principal_and_accept(self):
+        User.objects.create_user('auditor', password='auditor')
+        client = APIClient()
+        client.get(reverse('room-list'))
+
+        client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'auditor:auditor').decode())
+        self.assertEqual(client.get(reverse('room-list'))['X-Cache'], 'MISS')
+        self.assertEqual(client.get(reverse('room-list'))['X-Cache'], 'HIT')
+
+        # Credentials which fail to authenticate are never answered from the cache.
+        client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'auditor:wrong').decode())
+        for _ in range(2):
+            response = client.get(reverse('room-list'))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+            self.assertNotIn('X-Cache', response)
+
+        # The browsable API is never cached.
+        client.credentials()
+        for _ in range(2):
+            self.assertEqual(client.get(reverse('room-list'), HTTP_ACCEPT='text/html')['X-Cache'], 'MISS')
+
+    def test_authenticated_before_lookup(self):
+        user = User.objects.create_user('auditor', password='auditor')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'auditor:auditor').decode())
+        client.get(reverse('room-list'))
+        self.assertEqual(client.get(reverse('room-list'))['X-Cache'], 'HIT')
+
+        # Credentials revoked since a response was cached for them are refused rather than served it.
+        user.is_active = False
+        user.save()
+        response = client.get(reverse('room-list'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn('X-Cache', response)
+
+    def test_guests(self):
+        client = APIClient()
+        guest = Guest.objects.create(first_name='Seneca')
+
+        client.get(reverse('guest-detail', args=[guest.pk]))
+        response = client.get(reverse('guest-detail', args=[guest.pk]))
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+
+        # Stay statistics change with Reservations, so are not cached.
+        self.assertNotIn('X-Cache', client.get(reverse('guest-stats', args=[guest.pk])))
+
+        client.get(reverse('guest-list'))
+        bulk_import.import_guests([{'first_name': 'Cato'}])
+        response = client.get(reverse('guest-list'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(json.loads(response.content.decode())), 2)
+
 
 class ReservationStatusThrottlingTestCase(TestCase):
     """
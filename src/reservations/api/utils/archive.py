@@ -0,0 +1,152 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.utils import timezone
+
+from reservations.api.models import ArchivedReservation, Reservation, ReservationState, RoomNight
+
+# Archive files are gzip compressed newline delimited JSON, one Reservation snapshot per line.
+ARCHIVE_FILE_SUFFIX = '.ndjson.gz'
+
+
+def archive_directory():
+    return settings.RESERVATIONS_ARCHIVE_DIR
+
+
+def snapshot(reservation):
+    """
+    Build the archived representation of a Reservation, including Guest and Room snapshot fields.
+    :param reservation: Reservation with its guest and room loaded
+    :return: dict
+    """
+    return {
+        'id': reservation.pk,
+        'created': reservation.created,
+        'updated': reservation.updated,
+        'in_date': reservation.in_date,
+        'out_date': reservation.out_date,
+        'status': reservation.status.name,
+        'checkin_datetime': reservation.checkin_datetime,
+        'checkout_datetime': reservation.checkout_datetime,
+        'guest': reservation.guest_id,
+        'guest_first_name': reservation.guest.first_name,
+        'guest_last_name': reservation.guest.last_name,
+        'room': reservation.room_id,
+        'room_number': reservation.room.number,
+    }
+
+
+def write_archive(reservations, directory=None):
+    """
+    Write Reservation snapshots to a new compressed archive file.
+    The file is written under a temporary name and renamed once it is fully on disk,
+    so a partially written archive is never visible to readers.
+    :param reservations: iterable of Reservations with their guest and room loaded
+    :param directory: directory to write the archive to, defaults to RESERVATIONS_ARCHIVE_DIR
+    :return: tuple of the archive file name and a list of (reservation, line number) pairs
+    """
+    directory = directory or archive_directory()
+    os.makedirs(directory, exist_ok=True)
+
+    name = 'reservations-{}{}'.format(timezone.now().strftime('%Y%m%dT%H%M%S%f'), ARCHIVE_FILE_SUFFIX)
+    path = os.path.join(directory, name)
+    tmp_path = path + '.tmp'
+
+    written = []
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+            for line, reservation in enumerate(reservations):
+                archive.write(json.dumps(snapshot(reservation), cls=DjangoJSONEncoder).encode('utf-8'))
+                archive.write(b'\n')
+                written.append((reservation, line))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.rename(tmp_path, path)
+
+    return name, written
+
+
+def archive_reservations(reservations, directory=None, using='default'):
+    """
+    Move Reservations out of the primary table into a compressed archive file.
+    Every Reservation removed is recorded by an ArchivedReservation row naming the file and line it went to,
+    within the same transaction as the removal, so no Reservation is ever lost.
+    If the process dies after the file is written but before the transaction commits the Reservations remain
+    in place and the orphaned file is simply never referenced.
+    :param reservations: list of Reservations with their guest and room loaded
+    :param directory: directory to write the archive to, defaults to RESERVATIONS_ARCHIVE_DIR
+    :param using: alias of the database the Reservations live on, where they are recorded as archived
+    :return: list of ArchivedReservation
+    """
+    if not reservations:
+        return []
+
+    name, written = write_archive(reservations, directory)
+
+    archived_reservations = [
+        ArchivedReservation(
+            reservation_id=reservation.pk,
+            guest_id=reservation.guest_id,
+            room_id=reservation.room_id,
+            in_date=reservation.in_date,
+            out_date=reservation.out_date,
+            checkout_datetime=reservation.checkout_datetime,
+            archive_file=name,
+            archive_line=line,
+        )
+        for reservation, line in written
+    ]
+
+    with transaction.atomic(using=using):
+        ArchivedReservation.objects.using(using).bulk_create(archived_reservations)
+        # Reservations are indestructable through the ORM, the archive is the only path which removes them,
+        # and only once they have been recorded above.
+        with connections[using].cursor() as cursor:
+            ids = [str(reservation.pk) for reservation, _ in written]
+            # Nights held in the room-night inventory are released, never deleted, along with the Reservations.
+            cursor.execute(
+                'UPDATE {} SET reservation_id = NULL, updated = %s WHERE reservation_id = ANY(%s::uuid[])'.format(
+                    RoomNight._meta.db_table),
+                [timezone.now(), ids]
+            )
+            cursor.execute(
+                'DELETE FROM {} WHERE id = ANY(%s::uuid[]) AND status = %s'.format(Reservation._meta.db_table),
+                [ids, ReservationState.checked_out.name]
+            )
+            if cursor.rowcount != len(written):
+                raise ValueError('Only checked out Reservations may be archived')
+
+    return archived_reservations
+
+
+def read_archived(archived_reservations, directory=None):
+    """
+    Read the snapshots recorded by ArchivedReservation rows back from their archive files.
+    Each archive file is opened once and scanned sequentially.
+    :param archived_reservations: iterable of ArchivedReservation
+    :param directory: directory holding the archives, defaults to RESERVATIONS_ARCHIVE_DIR
+    :return: list of snapshot dicts in the order given
+    """
+    directory = directory or archive_directory()
+
+    lines_by_file = defaultdict(set)
+    archived_reservations = list(archived_reservations)
+    for archived in archived_reservations:
+        lines_by_file[archived.archive_file].add(archived.archive_line)
+
+    snapshots = {}
+    for name, lines in lines_by_file.items():
+        last_line = max(lines)
+        with gzip.open(os.path.join(directory, name), 'rb') as archive:
+            for line, content in enumerate(archive):
+                if line in lines:
+                    snapshots[(name, line)] = json.loads(content.decode('utf-8'))
+                if line >= last_line:
+                    break
+
+    return [snapshots[(archived.archive_file, archived.archive_line)] for archived in archived_reservations]
@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+
+from django.db import connections, router, transaction
+
+from reservations.api.models import Guest, Room
+from reservations.api.utils import response_cache
+from reservations.api.utils.hotels import hotel_database
+
+# Input formats rows may be given in: CSV with a header row, or newline delimited JSON objects.
+FORMATS = ('csv', 'ndjson')
+
+# Longest value accepted for any imported name or number, the length of the columns imported into.
+MAX_LENGTH = 255
+
+
+def read_rows(stream, format):
+    """
+    Read import rows from a text stream.
+    :param stream: text file like object
+    :param format: one of FORMATS
+    :return: iterator of dicts
+    """
+    if format == 'csv':
+        return csv.DictReader(stream)
+    if format == 'ndjson':
+        return (json.loads(line) for line in stream if line.strip())
+    raise ValueError('Unknown import format {}, must be one of {}'.format(format, ', '.join(FORMATS)))
+
+
+def format_of(name):
+    """
+    The import format of a file, by its extension.
+    """
+    return 'ndjson' if name.endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def staged_rows(rows, columns, required):
+    """
+    Validate import rows and key each of them.
+    Rows are keyed by their `key` column, or by their line number when they have none.
+    :param rows: iterable of dicts
+    :param columns: columns imported from each row
+    :param required: columns which may not be empty
+    :return: tuple of the list of valid (line, key, values) and the list of errors
+    """
+    staged, errors, keys = [], [], set()
+    for line, row in enumerate(rows, 1):
+        key = clean(row.get('key')) or str(line)
+        values = [clean(row.get(column)) for column in columns]
+
+        missing = [column for column, value in zip(columns, values) if column in required and value is None]
+        too_long = [column for column, value in zip(columns, values) if value is not None and len(value) > MAX_LENGTH]
+        if missing:
+            errors.append({'line': line, 'key': key, 'error': 'Missing {}'.format(', '.join(missing))})
+        elif too_long:
+            errors.append({'line': line, 'key': key, 'error': 'Longer than {}: {}'.format(MAX_LENGTH, ', '.join(too_long))})
+        elif key in keys:
+            errors.append({'line': line, 'key': key, 'error': 'Duplicate key'})
+        else:
+            keys.add(key)
+            staged.append((line, key, values))
+
+    return staged, errors
+
+
+def copy_to_staging(cursor, table, columns, staged, model):
+    """
+    Create a temporary staging table and COPY the staged rows into it with new primary keys.
+    The table is dropped by drop_staging(), or at the latest when the transaction ends.
+    """
+    cursor.execute('CREATE TEMPORARY TABLE {} (line integer, key text, id uuid, {}) ON COMMIT DROP'.format(
+        table, ', '.join('{} varchar({})'.format(column, MAX_LENGTH) for column in columns)
+    ))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for line, key, values in staged:
+        writer.writerow([line, key, model._meta.pk.get_default()] + values)
+    buffer.seek(0)
+
+    # Unquoted empty values are NULL.
+    cursor.cursor.copy_expert('COPY {} (line, key, id, {}) FROM STDIN WITH (FORMAT csv)'.format(table, ', '.join(columns)), buffer)
+
+
+def drop_staging(cursor, table):
+    # Imports within an outer transaction must not find the staging table of the one before.
+    cursor.execute('DROP TABLE {}'.format(table))
+
+
+def import_rooms(rows, hotel=None, using=None):
+    """
+    Bulk import Rooms, given by `number` and optionally `key`, with one COPY and one INSERT.
+    Rows whose number is already taken within the Hotel, by an existing Room or an earlier row, are reported as
+    conflicts along with the Room holding the number, and are not imported.
+    :param rows: iterable of dicts
+    :param hotel: primary key of the Hotel the Rooms are in, or None
+    :param using: database alias, by default the database of the Hotel's Rooms
+    :return: dict of `imported`, a mapping of row key to new Room id, `conflicts` and `errors`
+    """
+    using = using or hotel_database(hotel) or router.db_for_write(Room)
+    staged, errors = staged_rows(rows, ('number',), required=('number',))
+
+    # Room numbers are unique within a Hotel, or among Rooms not in any Hotel.
+    conflict_target = '(hotel_id, number)' if hotel is not None else '(number) WHERE hotel_id IS NULL'
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        copy_to_staging(cursor, 'room_import', ('number',), staged, Room)
+        cursor.execute("""
+          INSERT INTO {table} (id, created, updated, number, hotel_id)
+          SELECT DISTINCT ON (number) id, now(), now(), number, %s FROM room_import ORDER BY number, line
+          ON CONFLICT {conflict_target} DO NOTHING
+        """.format(table=Room._meta.db_table, conflict_target=conflict_target), [hotel])
+        cursor.execute("""
+          SELECT room_import.line, room_import.key, room_import.number, room_import.id, room.id
+          FROM room_import INNER JOIN {table} AS room
+            ON room.number = room_import.number AND room.hotel_id IS NOT DISTINCT FROM %s
+          ORDER BY room_import.line
+        """.format(table=Room._meta.db_table), [hotel])
+        results = cursor.fetchall()
+        drop_staging(cursor, 'room_import')
+        # Rows are inserted without saving, so the responses listing Rooms are dropped here.
+        response_cache.invalidate(Room, using)
+
+    imported, conflicts = {}, []
+    for line, key, number, staged_id, room_id in results:
+        if staged_id == room_id:
+            imported[key] = room_id
+        else:
+            conflicts.append({'line': line, 'key': key, 'number': number, 'room': room_id})
+
+    return {'imported': imported, 'conflicts': conflicts, 'errors': errors}
+
+
+def import_guests(rows, using=None):
+    """
+    Bulk import Guests, given by `first_name`, optionally `last_name` and optionally `key`,
+    with one COPY and one INSERT.
+    :param rows: iterable of dicts
+    :param using: database alias
+    :return: dict of `imported`, a mapping of row key to new Guest id, `conflicts` and `errors`
+    """
+    using = using or router.db_for_write(Guest)
+    staged, errors = staged_rows(rows, ('first_name', 'last_name'), required=('first_name',))
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        copy_to_staging(cursor, 'guest_import', ('first_name', 'last_name'), staged, Guest)
+        cursor.execute("""
+          INSERT INTO {table} (id, created, first_name, last_name)
+          SELECT id, now(), first_name, last_name FROM guest_import ORDER BY line
+        """.format(table=Guest._meta.db_table))
+        cursor.execute('SELECT key, id FROM guest_import ORDER BY line')
+        imported = dict(cursor.fetchall())
+        drop_staging(cursor, 'guest_import')
+        response_cache.invalidate(Guest, using)
+
+    return {'imported': imported, 'conflicts': [], 'errors': errors}
+
+
+# Import functions by the model imported.
+IMPORTS = {
+    'rooms': import_rooms,
+    'guests': import_guests,
+}
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import re
+import weakref
+from collections import defaultdict
+
+import psycopg2
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from reservations.api.models import VIEW_VERSION_CHANNEL, ViewVersion
+
+logger = logging.getLogger(__name__)
+
+# `Prefer: wait=<seconds>` asks for a long poll to be answered sooner than RESERVATIONS_LONG_POLL_SECONDS.
+PREFER_WAIT = re.compile(r'\bwait=(\d+)')
+
+# Seconds between reads of a view's version on a read replica, while a woken long poll waits for it to catch up.
+REPLICA_POLL_SECONDS = 0.05
+
+
+def etag(version):
+    """
+    The entity tag of current and upcoming Reservations read at a version of their view.
+    Reads narrow the view by today's date, so the same version reads differently from one day to the next.
+    """
+    return '"{}-{}"'.format(version, timezone.now().date().isoformat())
+
+
+def version_of(tag):
+    """
+    The version an entity tag was read at, if it was read today.
+    :return: int, or None
+    """
+    match = re.fullmatch(r'(?:W/)?"(\d+)-(.+)"', (tag or '').strip())
+    if match is None or match.group(2) != timezone.now().date().isoformat():
+        return None
+    return int(match.group(1))
+
+
+def wait_seconds(prefer):
+    """
+    Seconds a long poll may wait for a change, as asked for by a Prefer header, at most RESERVATIONS_LONG_POLL_SECONDS.
+    """
+    match = PREFER_WAIT.search(prefer or '')
+    if match is None:
+        return settings.RESERVATIONS_LONG_POLL_SECONDS
+    return min(int(match.group(1)), settings.RESERVATIONS_LONG_POLL_SECONDS)
+
+
+class ChangeListener(object):
+    """
+    Listens for new versions of views on one database, on behalf of every long poll in this process waiting on it.
+    One connection serves any number of waiting clients: each waits on a future of the event loop, and the
+    connection is read from the event loop whenever a notification arrives. Versions read or announced are kept,
+    so only the first poll of each view reads its version from the database.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.connection = None
+        self.lock = asyncio.Lock()
+        self.versions = {}
+        self.waiters = defaultdict(set)
+
+    def connect(self):
+        connection = psycopg2.connect(**connections[self.using].get_connection_params())
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute('LISTEN {}'.format(VIEW_VERSION_CHANNEL))
+        return connection
+
+    async def listen(self):
+        async with self.lock:
+            if self.connection is None:
+                loop = asyncio.get_event_loop()
+                self.connection = await loop.run_in_executor(None, self.connect)
+                loop.add_reader(self.connection.fileno(), self.receive)
+
+    def close(self):
+        if self.connection is not None:
+            asyncio.get_event_loop().remove_reader(self.connection.fileno())
+            self.connection.close()
+            self.connection = None
+        # Notifications may have been missed, so versions must be read again, and every waiting poll answered.
+        self.versions.clear()
+        for waiters in self.waiters.values():
+            for _, future in waiters:
+                if not future.done():
+                    future.set_result(None)
+
+    def receive(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error:
+            logger.warning('Listening for view versions on %s failed, reconnecting', self.using, exc_info=True)
+            self.close()
+            return
+        while self.connection.notifies:
+            name, _, version = self.connection.notifies.pop(0).payload.rpartition(':')
+            self.seen(name, int(version))
+
+    def seen(self, name, version):
+        self.versions[name] = max(version, self.versions.get(name, 0))
+        for known, future in self.waiters[name]:
+            if version > known and not future.done():
+                future.set_result(version)
+
+    async def wait_past(self, name, known, timeout):
+        """
+        Wait until a view's version is past the given one, or the timeout passes.
+        :param name: database table of the view
+        :param known: version the client last read
+        :param timeout: seconds
+        :return: the version past the given one, or None if there is none yet
+        """
+        await self.listen()
+        if name not in self.versions:
+            # Listening started before the version is read, so no version committed after it can be missed.
+            self.seen(name, await database_sync_to_async(ViewVersion.current)(name, self.using))
+        if self.versions[name] > known:
+            return self.versions[name]
+
+        waiter = (known, asyncio.get_event_loop().create_future())
+        self.waiters[name].add(waiter)
+        try:
+            return await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.waiters[name].discard(waiter)
+
+
+async def replicated(name, version, databases, timeout):
+    """
+    Wait until each of the given databases, such as read replicas, holds at least a version of a view.
+    Versions are announced by the database a view is refreshed on, before its replicas hold them.
+    :param name: database table of the view
+    :param version: version to wait for
+    :param databases: list of database aliases
+    :param timeout: seconds
+    :return: whether every database holds the version before the timeout passes
+    """
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    for using in databases:
+        while await database_sync_to_async(ViewVersion.current)(name, using) < version:
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(REPLICA_POLL_SECONDS)
+    return True
+
+
+# Listeners of each event loop, by database alias.
+_listeners = weakref.WeakKeyDictionary()
+
+
+def listener(using):
+    """
+    The ChangeListener of the running event loop for a database.
+    """
+    listeners = _listeners.setdefault(asyncio.get_event_loop(), {})
+    if using not in listeners:
+        listeners[using] = ChangeListener(using)
+    return listeners[using]
+
+
+def close_listeners():
+    """
+    Close the listeners of the running event loop.
+    """
+    for change_listener in _listeners.pop(asyncio.get_event_loop(), {}).values():
+        change_listener.close()
@@ -0,0 +1,95 @@
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Max
+
+from reservations.api.models import Hotel, Reservation, ViewRefreshFailure, ViewVersion, current_and_upcoming_view
+from reservations.api.utils.metrics import Collector, Gauge
+
+# Whether a view has the unique index without a condition which refreshing it concurrently needs.
+UNIQUE_INDEX_SQL = """
+  SELECT EXISTS (
+    SELECT 1 FROM pg_index INNER JOIN pg_class ON pg_class.oid = pg_index.indrelid
+    WHERE pg_class.relname = %s AND pg_index.indisunique AND pg_index.indpred IS NULL
+  )
+"""
+
+
+def views():
+    """
+    Every current and upcoming view: that of Rooms not in any Hotel, then those of Hotels by name.
+    :return: list of tuples of the Hotel's primary key or None, the view's database table and its database alias
+    """
+    hotel_ids = [None] + list(Hotel.objects.order_by('name').values_list('pk', flat=True))
+    return [(hotel_id,) + current_and_upcoming_view(hotel_id) for hotel_id in hotel_ids]
+
+
+def has_unique_index(name, using):
+    with connections[using].cursor() as cursor:
+        cursor.execute(UNIQUE_INDEX_SQL, [name])
+        return cursor.fetchone()[0]
+
+
+def row_count(name, using):
+    # Refreshes do not tell how many rows they leave, so views are counted when reported on rather than when refreshed.
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM {}'.format(name))
+        return cursor.fetchone()[0]
+
+
+def report(hotel_id, name, using):
+    """
+    How fresh a view is.
+    Lag is how many seconds the newest Reservation the view should hold was updated after the view was last refreshed,
+    such as by a write which bypassed saving. It is 0 while the view is current.
+    :return: OrderedDict
+    """
+    view_version = ViewVersion.of(name, using=using)
+    newest = Reservation.objects.using(using).filter(hotel_id=hotel_id).aggregate(newest=Max('updated'))['newest']
+
+    lag = None
+    if newest is None:
+        lag = 0.0
+    elif view_version.refreshed is not None:
+        lag = max((newest - view_version.refreshed).total_seconds(), 0.0)
+
+    return OrderedDict([
+        ('view', name),
+        ('hotel', hotel_id),
+        ('version', view_version.version),
+        ('refreshed', view_version.refreshed),
+        ('age_seconds', view_version.age()),
+        ('duration_ms', view_version.duration_ms),
+        ('row_count', row_count(name, using)),
+        ('newest_reservation_updated', newest),
+        ('lag_seconds', lag),
+        ('failed_refreshes', ViewRefreshFailure.objects.using(using).filter(name=name).count()),
+        # Without it refreshes fail, failing the saves which refresh the view.
+        ('unique_index', has_unique_index(name, using)),
+    ])
+
+
+def reports():
+    return [report(*view) for view in views()]
+
+
+def samples(reports, key, scale=1):
+    # Views which have never been refreshed have no value to report.
+    return [(report['view'], report[key] * scale) for report in reports if report[key] is not None]
+
+
+# Every view is reported on once a scrape, for all of the gauges.
+collector = Collector(reports)
+
+Gauge('reservations_view_age_seconds', 'Seconds since each current and upcoming view was last refreshed.',
+      lambda reports: samples(reports, 'age_seconds'), 'view', collector)
+Gauge('reservations_view_lag_seconds', 'Seconds each current and upcoming view lags behind its newest Reservation.',
+      lambda reports: samples(reports, 'lag_seconds'), 'view', collector)
+Gauge('reservations_view_refresh_duration_seconds', 'Seconds the last refresh of each current and upcoming view took.',
+      lambda reports: samples(reports, 'duration_ms', 0.001), 'view', collector)
+Gauge('reservations_view_rows', 'Rows in each current and upcoming view.',
+      lambda reports: samples(reports, 'row_count'), 'view', collector)
+Gauge('reservations_view_unique_index', 'Whether each current and upcoming view has the unique index refreshing it needs.',
+      lambda reports: samples(reports, 'unique_index', 1), 'view', collector)
+Gauge('reservations_view_refresh_failures', 'Failed refreshes of each current and upcoming view in the refresh log.',
+      lambda reports: samples(reports, 'failed_refreshes'), 'view', collector)
@@ -0,0 +1,177 @@
+import time
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db import router, transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from reservations.api.models import Guest, Reservation, ReservationState, Room, reservations_transitioned
+from reservations.api.utils.hotels import across_hotels, ordered
+
+cache = default_cache
+
+# The front desk lists, each of one date: Reservations arriving that date which have not been checked in,
+# and Reservations departing that date which have been checked in but not checked out.
+ARRIVALS = 'arrivals'
+DEPARTURES = 'departures'
+
+
+def cache_key(kind, date):
+    return 'front_desk_{}_{}'.format(kind, date.isoformat())
+
+
+def generation_key(kind, date):
+    return 'front_desk_generation_{}_{}'.format(kind, date.isoformat())
+
+
+def generation(kind, date):
+    """
+    The generation of a front desk list, moved on by every write to the list.
+    Generations start from the time they are first read, so one lost from the cache never revives an older list.
+    """
+    key = generation_key(kind, date)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, int(time.time() * 1000), settings.RESERVATIONS_FRONT_DESK_CACHE_SECONDS)
+        value = cache.get(key)
+    return value
+
+
+def query(kind, date):
+    if kind == ARRIVALS:
+        reservations = Reservation.objects.filter(status=ReservationState.pending, in_date=date)
+    else:
+        reservations = Reservation.objects.filter(status=ReservationState.checked_in, out_date=date)
+    # Lists are cached until invalidated by a write, so they must never be computed from a lagging read replica.
+    reservations = reservations.using(router.db_for_write(Reservation)).select_related('guest', 'room').order_by('room__number')
+    # Reservations of Hotels with a database of their own are read from it, along with the rest.
+    return ordered(chain.from_iterable(across_hotels(reservations)), ('room__number',))
+
+
+def compute(kind, date, current=None):
+    """
+    Read a front desk list from the database and cache it at the generation it was read at, so a list read before a
+    write which committed before it was cached is not served once the write has moved the generation on.
+    :param kind: ARRIVALS or DEPARTURES
+    :param date: date of the list
+    :param current: generation of the list, read before the list is
+    :return: list of serialized Reservations
+    """
+    # Imported here, as receivers below are connected in every process, including those which never serialize.
+    from reservations.api.serializers import FrontDeskReservationSerializer
+
+    if current is None:
+        current = generation(kind, date)
+    reservations = [dict(reservation) for reservation in FrontDeskReservationSerializer(query(kind, date), many=True).data]
+    cache.set(cache_key(kind, date), (current, reservations), settings.RESERVATIONS_FRONT_DESK_CACHE_SECONDS)
+    return reservations
+
+
+def get(kind, date):
+    """
+    Read a front desk list, from the cache unless it has been invalidated since it was last read.
+    :param kind: ARRIVALS or DEPARTURES
+    :param date: date of the list
+    :return: list of serialized Reservations
+    """
+    current = generation(kind, date)
+    cached = cache.get(cache_key(kind, date))
+    if cached is not None and cached[0] == current:
+        return cached[1]
+    return compute(kind, date, current)
+
+
+def warm(date):
+    """
+    Cache both front desk lists of a date, so the first terminal to read them does not wait on the database.
+    """
+    for kind in (ARRIVALS, DEPARTURES):
+        compute(kind, date)
+
+
+def invalidate(lists, using='default'):
+    """
+    Move front desk lists on to their next generation and drop them from the cache once the current transaction
+    commits, so they are never recomputed from data about to change, nor served if read before it commits.
+    :param lists: iterable of (kind, date) pairs
+    :param using: database alias
+    """
+    lists = {(kind, date) for kind, date in lists if date is not None}
+
+    def next_generation():
+        for kind, date in lists:
+            try:
+                cache.incr(generation_key(kind, date))
+            except ValueError:
+                # The generation is no longer cached, and will start again from now.
+                pass
+        cache.delete_many([cache_key(kind, date) for kind, date in lists])
+
+    if lists:
+        transaction.on_commit(next_generation, using=using)
+
+
+def lists_of(status, in_date, out_date):
+    """
+    The front desk lists a Reservation with the given status and dates appears in.
+    """
+    if status == ReservationState.pending:
+        return [(ARRIVALS, in_date)]
+    if status == ReservationState.checked_in:
+        return [(DEPARTURES, out_date)]
+    return []
+
+
+def lists_of_reservation(reservation, previous=False):
+    """
+    The front desk lists a Reservation appears in, by its current or its previously saved values.
+    """
+    field = Reservation._meta.get_field
+    if previous:
+        values = [reservation.tracker.previous(name) for name in ('status', 'in_date', 'out_date')]
+    else:
+        values = [reservation.status, reservation.in_date, reservation.out_date]
+    return lists_of(values[0], field('in_date').to_python(values[1]), field('out_date').to_python(values[2]))
+
+
+# Signal receiver for Reservation save to invalidate the front desk lists the Reservation left or joined.
+# A check-in moves a Reservation from the arrivals of its in_date to the departures of its out_date,
+# and a check-out removes it from the departures of its out_date. Changing dates, Guest or Room does the same
+# within the lists of its status.
+@receiver(signals.post_save, sender=Reservation)
+def reservation_saved_invalidate_front_desk(sender, instance=None, created=False, using=None, **kwargs):
+    lists = lists_of_reservation(instance)
+    if not created:
+        lists += lists_of_reservation(instance, previous=True)
+    invalidate(lists, using)
+
+
+# Signal receiver for Reservations transitioned together to invalidate all the lists they left or joined at once.
+@receiver(reservations_transitioned, sender=Reservation)
+def reservations_transitioned_invalidate_front_desk(sender, reservations=(), using=None, **kwargs):
+    invalidate([
+        front_desk_list
+        for reservation in reservations
+        for front_desk_list in lists_of_reservation(reservation) + lists_of_reservation(reservation, previous=True)
+    ], using)
+
+
+# Signal receiver for Guest and Room saves to invalidate the front desk lists showing their names and numbers.
+@receiver(signals.post_save, sender=Guest)
+@receiver(signals.post_save, sender=Room)
+def guest_or_room_saved_invalidate_front_desk(sender, instance=None, created=False, using=None, **kwargs):
+    if created:
+        return
+
+    reservations = Reservation.objects.using(using).filter(
+        **{'guest' if sender is Guest else 'room': instance},
+        status__in=[ReservationState.pending, ReservationState.checked_in]
+    ).values_list('status', 'in_date', 'out_date')
+    # Guests are kept on the default database, and have Reservations on every database.
+    invalidate([
+        front_desk_list
+        for status, in_date, out_date in chain.from_iterable(across_hotels(reservations) if sender is Guest else [reservations])
+        for front_desk_list in lists_of(status, in_date, out_date)
+    ], using)
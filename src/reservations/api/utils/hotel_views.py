@@ -0,0 +1,41 @@
+from itertools import chain
+
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+from reservations.api.utils.hotels import across_hotels, ordered
+
+
+class HotelDatabasesMixin(object):
+    """
+    View set mixin listing and retrieving Rooms or Reservations, or what is kept alongside them, from every database
+    they may live on, so those of Hotels with a database of their own are served along with the rest.
+    Lists are read from each database in turn and ordered as the view set's queryset orders them.
+    """
+
+    def across_databases(self, queryset):
+        """
+        Read a queryset from every database, ordered as it would order them.
+        :return: list of instances
+        """
+        return ordered(chain.from_iterable(across_hotels(queryset)), queryset.query.order_by)
+
+    def list(self, request, *args, **kwargs):
+        instances = self.across_databases(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(instances)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(instances, many=True).data)
+
+    def get_object(self):
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        for queryset in across_hotels(self.filter_queryset(self.get_queryset())):
+            try:
+                instance = queryset.filter(**lookup).first()
+            except (TypeError, ValueError, ValidationError):
+                raise Http404
+            if instance is not None:
+                self.check_object_permissions(self.request, instance)
+                return instance
+        raise Http404
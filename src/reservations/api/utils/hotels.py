@@ -0,0 +1,84 @@
+from functools import reduce
+
+from django.conf import settings
+
+from reservations.api.utils.replicas import ReplicaRouter
+
+
+def hotel_database(hotel_id):
+    """
+    The database a Hotel's Rooms and Reservations live on, when it is not the default database.
+    :param hotel_id: primary key of the Hotel, or None
+    :return: database alias, or None
+    """
+    if hotel_id is None:
+        return None
+    return settings.RESERVATIONS_HOTEL_DATABASES.get(str(hotel_id))
+
+
+def hotel_database_of(instance):
+    """
+    The database an instance belonging to a Hotel lives on, when it is not the default database.
+    """
+    # Instances are routed while being constructed, before their hotel_id is set. Reading it from the instance's
+    # dict rather than the attribute does not load it from the database.
+    return hotel_database(vars(instance).get('hotel_id')) if instance is not None else None
+
+
+def hotel_databases():
+    """
+    Every database Rooms and Reservations may live on, the default database first.
+    """
+    return ['default'] + sorted(set(settings.RESERVATIONS_HOTEL_DATABASES.values()) - {'default'})
+
+
+def across_hotels(queryset):
+    """
+    A queryset of Rooms or Reservations, or of what is kept alongside them, on every database they may live on:
+    as given on the default database, then on each Hotel's own database.
+    :return: list of querysets, one per database
+    """
+    return [queryset] + [queryset.using(database) for database in hotel_databases()[1:]]
+
+
+def ordered(instances, ordering):
+    """
+    Order instances read from several databases as each database ordered them.
+    :param instances: iterable of model instances
+    :param ordering: field names as given to order_by(), descending when prefixed with '-'
+    :return: list of instances
+    """
+    instances = list(instances)
+    # Sorts are stable, so sorting by the last field first leaves the instances sorted by every field.
+    for field in reversed(ordering):
+        path = field.lstrip('-').split('__')
+        # Nulls sort last ascending and first descending, as they do in PostgreSQL.
+        instances.sort(key=lambda instance: null_last(reduce(getattr, path, instance)), reverse=field.startswith('-'))
+    return instances
+
+
+def null_last(value):
+    return value is None, value
+
+
+def of_hotel(queryset, hotel_id):
+    """
+    Narrow a queryset of Rooms or Reservations to those of a Hotel, read from the database they live on.
+    """
+    queryset = queryset.filter(hotel_id=hotel_id)
+    database = hotel_database(hotel_id)
+    return queryset.using(database) if database else queryset
+
+
+class HotelRouter(ReplicaRouter):
+    """
+    Route reads and writes of instances belonging to a Hotel listed in RESERVATIONS_HOTEL_DATABASES,
+    such as its Rooms and Reservations, to the Hotel's database. Everything else is routed by ReplicaRouter.
+    Queries which are not about a given instance are routed to a Hotel's database with of_hotel() or using().
+    """
+
+    def db_for_read(self, model, **hints):
+        return hotel_database_of(hints.get('instance')) or super(HotelRouter, self).db_for_read(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return hotel_database_of(hints.get('instance')) or super(HotelRouter, self).db_for_write(model, **hints)
@@ -0,0 +1,147 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db import transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from reservations.api.models import Guest, Room
+from reservations.api.utils.hotels import hotel_databases
+from reservations.api.utils.metrics import Counter
+
+cache = default_cache
+
+
+def clone(instance):
+    # Model instances share their state object when copied.
+    instance = copy.copy(instance)
+    instance._state = copy.copy(instance._state)
+    return instance
+
+
+lookups = Counter('reservations_lookup_cache_total', 'Lookups of Rooms and Guests by id, by the tier which served them.', 'result')
+
+
+class LRUCache(object):
+    """
+    A small in-process cache which evicts the least recently used entry once full, and entries older than its TTL.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LookupCache(object):
+    """
+    Two-tier cache of a model's instances by primary key: a per-process LRUCache with a short TTL,
+    in front of the shared Django cache, in front of the database.
+    Saves replace the shared entry once committed and drop this process' entry, other processes
+    see the change once their entry expires.
+    """
+
+    def __init__(self, model, version_field=None):
+        self.model = model
+        # Field which increases with every save, so an older instance never replaces a newer one in the shared cache.
+        self.version_field = version_field
+        self.local = LRUCache(settings.RESERVATIONS_LOOKUP_CACHE_LOCAL_SIZE, settings.RESERVATIONS_LOOKUP_CACHE_LOCAL_SECONDS)
+
+    def cache_key(self, pk):
+        return 'lookup_{}_{}'.format(self.model._meta.label_lower, pk)
+
+    def get(self, pk):
+        """
+        Look up an instance by primary key.
+        :param pk: primary key
+        :return: a copy of the instance, which the caller may modify
+        :raises: model.DoesNotExist
+        """
+        key = self.cache_key(pk)
+
+        instance = self.local.get(key)
+        if instance is not None:
+            lookups.inc('local_hit')
+            return clone(instance)
+
+        instance = cache.get(key)
+        if instance is not None:
+            lookups.inc('shared_hit')
+        else:
+            lookups.inc('miss')
+            instance = self.lookup(pk)
+            # A save committed since this read has set the newer instance, which must not be replaced.
+            cache.add(key, instance, settings.RESERVATIONS_LOOKUP_CACHE_SHARED_SECONDS)
+
+        self.local.set(key, instance)
+        return clone(instance)
+
+    def lookup(self, pk):
+        # Lookups validate writes, so they read from the primary rather than a lagging read replica.
+        # Rooms of Hotels on databases of their own are found on the database they live on.
+        for database in hotel_databases():
+            try:
+                return self.model.objects.using(database).get(pk=pk)
+            except self.model.DoesNotExist:
+                pass
+        raise self.model.DoesNotExist('{} matching query does not exist.'.format(self.model._meta.object_name))
+
+    def saved(self, instance):
+        """
+        Replace the cached instance with one just saved.
+        """
+        key = self.cache_key(instance.pk)
+        self.local.delete(key)
+
+        if self.version_field:
+            cached = cache.get(key)
+            if cached is not None and getattr(cached, self.version_field) > getattr(instance, self.version_field):
+                return
+        lookups.inc('invalidation')
+        cache.set(key, clone(instance), settings.RESERVATIONS_LOOKUP_CACHE_SHARED_SECONDS)
+
+
+# Lookup caches by model.
+rooms = LookupCache(Room, version_field='updated')
+guests = LookupCache(Guest)
+LOOKUP_CACHES = {Room: rooms, Guest: guests}
+
+
+# Signal receiver for Room and Guest saves to replace their cached instances once the save commits.
+@receiver(signals.post_save, sender=Room)
+@receiver(signals.post_save, sender=Guest)
+def room_or_guest_saved_update_lookup_cache(sender, instance=None, using=None, **kwargs):
+    instance = clone(instance)
+    transaction.on_commit(lambda: LOOKUP_CACHES[sender].saved(instance), using=using)
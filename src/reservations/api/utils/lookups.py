@@ -0,0 +1,36 @@
+from django.db.models import CharField, Lookup, UUIDField
+
+
+@CharField.register_lookup
+class PrefixILike(Lookup):
+    """
+    Case insensitive prefix match written as `column ILIKE 'prefix%'`.
+    Unlike Django's `istartswith`, which compares `UPPER(column)`, this can be served by a pg_trgm index on the column.
+    """
+    lookup_name = 'iprefix'
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [connection.ops.prep_for_like_query(value) + '%']
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '{} ILIKE {}'.format(lhs, rhs), lhs_params + rhs_params
+
+
+@UUIDField.register_lookup
+class AnyUUID(Lookup):
+    """
+    Match any of a list of UUIDs, written as `column = ANY(%s::uuid[])` with the list given as a single array.
+    Unlike Django's `in`, which takes a parameter for each value, this is the same statement however many are given.
+    """
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [[str(uuid) for uuid in value]]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '{} = ANY({}::uuid[])'.format(lhs, rhs), lhs_params + rhs_params
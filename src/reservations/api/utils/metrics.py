@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+
+# Metrics are recorded by models and caches loaded in every process, so this imports nothing only serving requests
+# needs. They are served by reservations.api.views.MetricsView.
+
+# Metrics exposed by this process, by name. Each process keeps its own, so a scraper sums them across processes.
+_metrics = OrderedDict()
+_lock = threading.Lock()
+
+
+class Counter(object):
+    """
+    A count which only ever increases, optionally broken down by a label.
+    """
+    type = 'counter'
+
+    def __init__(self, name, description, label=None):
+        self.name = name
+        self.description = description
+        self.label = label
+        self._values = OrderedDict()
+        register(self)
+
+    def inc(self, label_value=None, amount=1):
+        with _lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value=None):
+        return self._values.get(label_value, 0)
+
+    def samples(self, collected=None):
+        return list(self._values.items()) or [(None, 0)]
+
+
+class Gauge(object):
+    """
+    A value read when metrics are collected, optionally broken down by a label.
+    """
+    type = 'gauge'
+
+    def __init__(self, name, description, collect, label=None, collector=None):
+        self.name = name
+        self.description = description
+        self.label = label
+        # Returns a value, or a list of (label value, value) pairs when labelled.
+        # Passed what the collector collected, if any.
+        self.collect = collect
+        self.collector = collector
+        register(self)
+
+    def samples(self, collected=None):
+        if self.collector is None:
+            value = self.collect()
+        else:
+            value = self.collect(self.collector.read({} if collected is None else collected))
+        return value if self.label else [(None, value)]
+
+
+class Collector(object):
+    """
+    What several gauges are read from, collected once each time metrics are collected rather than once per gauge.
+    """
+
+    def __init__(self, collect):
+        self.collect = collect
+
+    def read(self, collected):
+        """
+        :param collected: dict of what each collector has collected so far this collection
+        """
+        if self not in collected:
+            collected[self] = self.collect()
+        return collected[self]
+
+
+def register(metric):
+    _metrics[metric.name] = metric
+
+
+def exposition():
+    """
+    Render every metric in the Prometheus text exposition format.
+    :return: str
+    """
+    lines = []
+    collected = {}
+    for metric in list(_metrics.values()):
+        lines.append('# HELP {} {}'.format(metric.name, metric.description))
+        lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+        for label_value, value in metric.samples(collected):
+            if label_value is None:
+                lines.append('{} {}'.format(metric.name, value))
+            else:
+                lines.append('{}{{{}="{}"}} {}'.format(metric.name, metric.label, label_value, value))
+    return '\n'.join(lines) + '\n'
+
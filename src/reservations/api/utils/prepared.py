@@ -0,0 +1,107 @@
+import weakref
+
+from django.db import DatabaseError, connections
+
+# Names of the statements prepared on each open database connection.
+# Prepared statements live as long as the session, and with pooled connections sessions outlive requests.
+_prepared = weakref.WeakKeyDictionary()
+# Names of the statements prepared on each open database connection which must be prepared again before they are next
+# executed, as what they read has changed shape since they were prepared.
+_stale = weakref.WeakKeyDictionary()
+
+# Postgres replans prepared statements after the tables and views they read change, but refuses to execute them if
+# that changes the columns they return, such as once a view they read is recreated with other columns.
+RESULT_TYPE_CHANGED = 'cached plan must not change result type'
+
+
+def is_result_type_changed(error):
+    return RESULT_TYPE_CHANGED in str(error.__cause__ or error)
+
+
+class PreparedStatement(object):
+    """
+    A server-side prepared statement which is planned once per database session and reused on every later execution.
+    The statement's SQL takes its parameters as $1, $2, ... of the given Postgres types.
+    """
+
+    def __init__(self, name, parameter_types, sql):
+        self.name = name
+        self.parameter_types = parameter_types
+        self.sql = sql
+
+    @property
+    def execute_sql(self):
+        if not self.parameter_types:
+            return 'EXECUTE {}'.format(self.name)
+        return 'EXECUTE {}({})'.format(self.name, ', '.join(['%s'] * len(self.parameter_types)))
+
+    def prepare(self, using='default'):
+        """
+        Prepare this statement on the connection for the given database, unless it already has been.
+        :param using: database alias
+        :return: the connection the statement is prepared on
+        """
+        connection = connections[using]
+        connection.ensure_connection()
+
+        prepared = _prepared.setdefault(connection.connection, set())
+        stale = _stale.setdefault(connection.connection, set())
+        if self.name not in prepared or self.name in stale:
+            with connection.cursor() as cursor:
+                if self.name in stale:
+                    cursor.execute('DEALLOCATE {}'.format(self.name))
+                    stale.discard(self.name)
+                if self.parameter_types:
+                    cursor.execute('PREPARE {} ({}) AS {}'.format(self.name, ', '.join(self.parameter_types), self.sql))
+                else:
+                    cursor.execute('PREPARE {} AS {}'.format(self.name, self.sql))
+            prepared.add(self.name)
+
+        return connection
+
+    def retried(self, run, using='default'):
+        """
+        Run what executes this statement, preparing it first if needed. If the statement's result type has changed since
+        it was prepared, it is prepared again and run once more. Within a transaction, which fails along with it, it is
+        prepared again once next executed instead.
+        :param run: callable executing this statement
+        :param using: database alias
+        :return: what run returns
+        """
+        connection = self.prepare(using)
+        try:
+            return run()
+        except DatabaseError as e:
+            if not is_result_type_changed(e):
+                raise
+            _stale.setdefault(connection.connection, set()).add(self.name)
+            if connection.in_atomic_block:
+                raise
+        self.prepare(using)
+        return run()
+
+    def execute(self, params=(), using='default'):
+        """
+        Execute this statement, preparing it first if needed.
+        :param params: parameter values in order
+        :param using: database alias
+        :return: cursor holding the results, which the caller must close
+        """
+        def run():
+            cursor = connections[using].cursor()
+            try:
+                cursor.execute(self.execute_sql, params)
+            except DatabaseError:
+                cursor.close()
+                raise
+            return cursor
+        return self.retried(run, using)
+
+    def raw(self, manager, params=()):
+        """
+        Execute this statement as instances of the manager's model, read once it has been prepared.
+        :param manager: model manager
+        :param params: parameter values in order
+        :return: list of the manager's model instances
+        """
+        return self.retried(lambda: list(manager.raw(self.execute_sql, params)), manager.db)
@@ -0,0 +1,182 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections, transaction
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from reservations.api.models import GuestStayStatistics, Reservation, refresh_current_and_upcoming
+from reservations.api.utils.uuids import uuid7
+
+# Query parameter and header which ask for a request to be profiled.
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+# Statements which may be explained without being executed.
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'EXECUTE')
+
+# Functions whose time is reported separately, by name. Their time is read from the cProfile stats.
+TIMED_FUNCTIONS = {
+    'Reservation.save': Reservation.save,
+    'Reservation.transition_many': Reservation.transition_many.__func__,
+    'refresh_current_and_upcoming': refresh_current_and_upcoming,
+    'GuestStayStatistics.refresh': GuestStayStatistics.refresh.__func__,
+}
+
+
+def profile_requested(request):
+    return request.GET.get(PROFILE_PARAM) not in (None, '', '0') or request.META.get(PROFILE_HEADER) not in (None, '', '0')
+
+
+def is_staff(request):
+    """
+    Whether the request is made by a staff user, authenticated the same ways the API authenticates requests.
+    """
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    authenticators += [SessionAuthentication(), BasicAuthentication()]
+    try:
+        user = Request(request, authenticators=authenticators).user
+    except APIException:
+        return False
+    return bool(user and user.is_staff)
+
+
+class QueryLog(object):
+    """
+    Database execute wrapper recording every query executed along with how long it took.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': self.alias,
+                'sql': sql,
+                'params': params,
+                'many': many,
+                'duration_ms': (time.perf_counter() - start) * 1000,
+            })
+
+
+def explain(query):
+    """
+    The query plan of a query, without executing it.
+    :return: list of plan lines
+    """
+    if query['many'] or not query['sql'].lstrip().upper().startswith(EXPLAINABLE):
+        return None
+
+    connection = connections[query['database']]
+    try:
+        # A failed EXPLAIN must not abort the request's transaction, if it is still open.
+        with transaction.atomic(using=query['database']), connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + query['sql'], query['params'])
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError as err:
+        return ['Could not explain: {}'.format(err).strip()]
+
+
+def function_times(stats):
+    """
+    Time spent in each of TIMED_FUNCTIONS.
+    :param stats: pstats.Stats
+    :return: dict of name to calls and cumulative milliseconds
+    """
+    times = {}
+    for name, function in TIMED_FUNCTIONS.items():
+        code = function.__code__
+        calls, _, _, cumulative, _ = stats.stats.get((code.co_filename, code.co_firstlineno, code.co_name), (0, 0, 0, 0, None))
+        times[name] = {'calls': calls, 'cumulative_ms': cumulative * 1000}
+    return times
+
+
+def report(request, response, duration, profiler, queries):
+    """
+    Summarize a profiled request.
+    :return: dict
+    """
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(settings.RESERVATIONS_PROFILE_FUNCTIONS)
+
+    slowest = sorted(queries, key=lambda query: query['duration_ms'], reverse=True)[:settings.RESERVATIONS_PROFILE_EXPLAIN]
+    return {
+        'method': request.method,
+        # The query string is left out, it may hold Guests' personal details such as names searched for.
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': duration * 1000,
+        'functions': function_times(stats),
+        'queries': {
+            'count': len(queries),
+            'duration_ms': sum(query['duration_ms'] for query in queries),
+            # Parameters are left out, they may hold Guests' personal details.
+            'log': [{key: query[key] for key in ('database', 'sql', 'many', 'duration_ms')} for query in queries],
+            'slowest': [
+                {'database': query['database'], 'sql': query['sql'], 'duration_ms': query['duration_ms'], 'explain': explain(query)}
+                for query in slowest
+            ],
+        },
+        'profile': output.getvalue(),
+    }
+
+
+def profile_path(profile_id, extension):
+    return os.path.join(settings.RESERVATIONS_PROFILE_DIR, '{}.{}'.format(profile_id, extension))
+
+
+class ProfilingMiddleware(object):
+    """
+    Profile requests made by staff users which ask for it with `?profile=1` or an `X-Profile: 1` header.
+    The request's cProfile stats, every query it made with its timing, the plans of its slowest queries and the time
+    it spent saving Reservations and refreshing views are written to RESERVATIONS_PROFILE_DIR. The response names
+    the profile in its X-Profile header, and staff may download it from /profiles/<id>.
+    Requests which do not ask to be profiled pass straight through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request) or not is_staff(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        logs = [QueryLog(connection.alias) for connection in connections.all()]
+        with ExitStack() as stack:
+            for connection, log in zip(connections.all(), logs):
+                stack.enter_context(connection.execute_wrapper(log))
+
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - start
+
+        queries = [query for log in logs for query in log.queries]
+        profile_id = str(uuid7())
+
+        os.makedirs(settings.RESERVATIONS_PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(profile_path(profile_id, 'prof'))
+        with open(profile_path(profile_id, 'json'), 'w') as output:
+            json.dump(dict(report(request, response, duration, profiler, queries), id=profile_id), output, cls=DjangoJSONEncoder, indent=2)
+
+        response['X-Profile'] = profile_id
+        return response
@@ -0,0 +1,50 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from reservations.api.utils.replicas import STICKINESS_COOKIE, STICKINESS_SALT, allow_replica_reads, is_sticky, mark_written
+
+# Views read from replicas routed by reservations.api.utils.replicas. Its router is loaded by every process using the
+# database, including those which never serve a request, so the view mixin using REST framework is kept here.
+
+
+class ReplicaReadMixin(object):
+    """
+    View mixin that serves safe requests from read replicas,
+    unless the requesting client has written within the stickiness window.
+    """
+
+    # Actions which only read, although requested with an unsafe method, such as a POST carrying what to read.
+    # They are served from read replicas and do not make the client sticky, as safe requests.
+    read_only_actions = ()
+
+    def get_replica_ident(self, request):
+        # Authenticated clients are identified by user, anonymous clients the same way as throttles identify them.
+        if request.user and request.user.is_authenticated:
+            return 'user_{}'.format(request.user.pk)
+        return 'anon_{}'.format(BaseThrottle().get_ident(request))
+
+    def is_read_only(self, request):
+        return request.method in SAFE_METHODS or getattr(self, 'action', None) in self.read_only_actions
+
+    def allows_replica_reads(self, request):
+        return self.is_read_only(request) and not is_sticky(self.replica_ident, request)
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication, permissions and throttling always read from the primary.
+        super(ReplicaReadMixin, self).initial(request, *args, **kwargs)
+
+        self.replica_ident = self.get_replica_ident(request)
+        if self.allows_replica_reads(request):
+            allow_replica_reads(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        allow_replica_reads(False)
+
+        # Requests rejected before reaching the handler never wrote anything.
+        if not self.is_read_only(request) and getattr(self, 'replica_ident', None) is not None:
+            mark_written(self.replica_ident)
+            response.set_signed_cookie(STICKINESS_COOKIE, self.replica_ident, salt=STICKINESS_SALT, httponly=True,
+                                       max_age=settings.RESERVATIONS_REPLICA_STICKINESS_SECONDS)
+
+        return super(ReplicaReadMixin, self).finalize_response(request, response, *args, **kwargs)
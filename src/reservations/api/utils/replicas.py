@@ -0,0 +1,94 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+cache = default_cache
+
+# Signed cookie a client which has written carries for the stickiness window, so it reads its own writes from any
+# process, even one whose cache does not hold the mark.
+STICKINESS_COOKIE = 'replica_sticky'
+STICKINESS_SALT = 'reservations.replica_stickiness'
+
+# Whether reads on this thread may be served by a read replica, and by which.
+# Reads go to the primary unless a view has explicitly allowed otherwise.
+_state = threading.local()
+
+
+def allow_replica_reads(allowed):
+    """
+    Allow or disallow reads on this thread to be routed to a read replica. Every read allowed is routed to the same
+    replica, chosen once here, so reads of one request never mix replicas which have replayed to different points.
+    :return: the previous state, to be given to restore_replica_reads()
+    """
+    previous = getattr(_state, 'replica_reads', False), getattr(_state, 'replica', None)
+    _state.replica_reads = allowed
+    _state.replica = random.choice(settings.RESERVATIONS_READ_REPLICAS) if allowed and settings.RESERVATIONS_READ_REPLICAS else None
+    return previous
+
+
+def restore_replica_reads(previous):
+    _state.replica_reads, _state.replica = previous
+
+
+@contextmanager
+def replica_reads():
+    """
+    Allow reads within this block to be routed to a read replica.
+    """
+    previous = allow_replica_reads(True)
+    try:
+        yield
+    finally:
+        restore_replica_reads(previous)
+
+
+def replica_reads_allowed():
+    return getattr(_state, 'replica_reads', False)
+
+
+def stickiness_cache_key(ident):
+    return 'replica_stickiness_{}'.format(ident)
+
+
+def mark_written(ident):
+    """
+    Route reads for this client to the primary for the stickiness window, so they read their own writes.
+    """
+    cache.set(stickiness_cache_key(ident), True, settings.RESERVATIONS_REPLICA_STICKINESS_SECONDS)
+
+
+def is_sticky(ident, request=None):
+    """
+    Whether a client has written within the stickiness window, by the shared mark or the request's signed cookie.
+    """
+    if request is not None:
+        cookie = request.get_signed_cookie(STICKINESS_COOKIE, None, salt=STICKINESS_SALT,
+                                           max_age=settings.RESERVATIONS_REPLICA_STICKINESS_SECONDS)
+        if cookie == ident:
+            return True
+    return cache.get(stickiness_cache_key(ident), False)
+
+
+class ReplicaRouter(object):
+    """
+    Route reads to the replica chosen when replica reads were allowed, everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if replica_reads_allowed() and getattr(_state, 'replica', None) in settings.RESERVATIONS_READ_REPLICAS:
+            return _state.replica
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication.
+        return db not in settings.RESERVATIONS_READ_REPLICAS
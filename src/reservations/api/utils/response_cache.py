@@ -0,0 +1,159 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db import transaction
+from django.db.models import signals
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from reservations.api.models import Guest, Room
+from reservations.api.utils.metrics import Counter
+
+cache = default_cache
+
+responses = Counter('reservations_response_cache_total', 'Reads of cached responses, by whether they were served from the cache.', 'result')
+
+
+def generation_key(model):
+    return 'response_cache_generation_{}'.format(model._meta.label_lower)
+
+
+def generation(model):
+    """
+    The generation of a model's cached responses, moved on by every save of the model.
+    Generations start from the time they are first read, so one lost from the cache never revives older responses.
+    """
+    key = generation_key(model)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, int(time.time() * 1000), None)
+        value = cache.get(key)
+    return value
+
+
+def invalidate(model, using='default'):
+    """
+    Drop every cached response of a model once the current transaction commits.
+    :param model: Room or Guest
+    :param using: database alias
+    """
+    def next_generation():
+        key = generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The generation is no longer cached, and will start again from now.
+            pass
+        responses.inc('invalidation')
+
+    transaction.on_commit(next_generation, using=using)
+
+
+def principal(request):
+    """
+    Who an authenticated request is made by: the user, or anonymous.
+    Responses are only looked up once the request has been authenticated, so credentials which have since been
+    revoked are refused rather than served what was cached for them.
+    """
+    user = request.user
+    return 'user_{}'.format(user.pk) if user and user.is_authenticated else 'anonymous'
+
+
+def cache_key(model, request):
+    """
+    The key of a response by the absolute URL requested, as hyperlinks in it are, the principal and Accept.
+    :param request: authenticated REST framework request
+    """
+    parts = '\n'.join((request.build_absolute_uri(), principal(request), request.META.get('HTTP_ACCEPT', '')))
+    return 'response_cache_{}_{}'.format(model._meta.label_lower, hashlib.sha256(parts.encode('utf-8')).hexdigest())
+
+
+def hit_rate_header():
+    hits, misses = responses.value('hit'), responses.value('miss')
+    return '{:.3f}'.format(hits / (hits + misses)) if hits + misses else '0.000'
+
+
+class CachedResponseMixin(object):
+    """
+    View set mixin that serves reads of rarely changing resources from a full response cache, once authentication,
+    permissions and throttling have passed, ahead of the database and the serializer. Cached responses of the view
+    set's model are dropped on every save of it. Responses carry the view set's Cache-Control and Vary headers, and X-Cache with whether they were served
+    from the cache along with X-Cache-Hit-Rate, the share of reads this process served from the cache.
+    """
+    # Actions whose responses are cached.
+    cached_actions = ('list', 'retrieve')
+    # Cache-Control of cached actions' responses, such as {'private': True, 'max_age': 60}.
+    cache_control = {}
+    # Request headers responses differ by.
+    cache_vary = ('Accept', 'Authorization', 'Cookie')
+
+    def cached_model(self):
+        return self.queryset.model
+
+    def is_cached(self, request):
+        return request.method == 'GET' and self.action_map.get('get') in self.cached_actions
+
+    def allows_replica_reads(self, request):
+        # Responses are cached until the model is next saved, so they are never read from a lagging read replica.
+        return not self.is_cached(request) and super(CachedResponseMixin, self).allows_replica_reads(request)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def cached(self, request, respond):
+        """
+        The cached response of an authenticated read, or the response made by respond() to be cached.
+        """
+        if not self.is_cached(request):
+            return respond()
+
+        model = self.cached_model()
+        key = cache_key(model, request)
+        current = generation(model)
+        cached = cache.get(key)
+        if cached is not None and cached[0] == current:
+            responses.inc('hit')
+            self.cache_result = 'HIT'
+            _, status, content, content_type = cached
+            return HttpResponse(content, status=status, content_type=content_type)
+
+        responses.inc('miss')
+        self.cache_result = 'MISS'
+        self.cache_entry = (key, current)
+        return respond()
+
+    def dispatch(self, request, *args, **kwargs):
+        self.cache_result = self.cache_entry = None
+        response = super(CachedResponseMixin, self).dispatch(request, *args, **kwargs)
+        if self.cache_result is None:
+            return response
+
+        # Only successful JSON responses are cached: browsable API pages hold a form token of their own.
+        if self.cache_entry and response.status_code == 200 and \
+                getattr(getattr(response, 'accepted_renderer', None), 'format', None) == 'json':
+            key, current = self.cache_entry
+            response.render()
+            cache.set(key, (current, response.status_code, response.content, response['Content-Type']),
+                      settings.RESERVATIONS_RESPONSE_CACHE_SECONDS)
+        return self.cache_headers(response, self.cache_result)
+
+    def cache_headers(self, response, result):
+        if response.status_code == 200:
+            patch_cache_control(response, **self.cache_control)
+            patch_vary_headers(response, self.cache_vary)
+        response['X-Cache'] = result
+        response['X-Cache-Hit-Rate'] = hit_rate_header()
+        return response
+
+
+# Signal receiver for Room and Guest saves to drop their cached responses once the save commits.
+@receiver(signals.post_save, sender=Room)
+@receiver(signals.post_save, sender=Guest)
+def room_or_guest_saved_invalidate_responses(sender, using=None, **kwargs):
+    invalidate(sender, using)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from reservations.api.models import SIDE_EFFECTS, SideEffect
+from reservations.api.utils.hotels import hotel_databases
+from reservations.api.utils.metrics import Collector, Gauge
+
+# Side effects queued which are still to be run, and seconds since the oldest of them was queued,
+# along with side effects given up on.
+QUEUE_SQL = """
+  SELECT count(*) FILTER (WHERE attempts < %(attempts)s),
+         coalesce(extract(epoch FROM now() - min(created) FILTER (WHERE attempts < %(attempts)s)), 0),
+         count(*) FILTER (WHERE attempts >= %(attempts)s)
+  FROM {}
+""".format(SideEffect._meta.db_table)
+
+
+def backoff(attempts):
+    """
+    Seconds to wait before running a side effect again once it has failed the given number of times.
+    """
+    return min(2 ** attempts, 60 * 60)
+
+
+def process(using='default', batch_size=100):
+    """
+    Run a batch of the queued side effects which are due, in the order they were queued. Side effects of one kind
+    and key are run once however many times they were queued, each in a transaction of its own which claims,
+    runs and deletes them, so one failing does not undo the others and each is done as soon as it commits.
+    Side effects taken by another worker are skipped rather than waited on.
+    :param using: database alias of the queue
+    :param batch_size: most side effects taken at once
+    :return: tuple of side effects taken, and of those which failed
+    """
+    now = timezone.now()
+    due = SideEffect.objects.using(using).select_for_update(skip_locked=True).filter(
+        run_after__lte=now, attempts__lt=settings.RESERVATIONS_SIDE_EFFECT_ATTEMPTS
+    )
+    taken = failed = 0
+    while taken < batch_size:
+        with transaction.atomic(using=using):
+            first = due.order_by('id').first()
+            if first is None:
+                break
+            effects = list(due.filter(kind=first.kind, key=first.key))
+            taken += len(effects)
+
+            try:
+                with transaction.atomic(using=using):
+                    SIDE_EFFECTS[first.kind](first.key or None, using)
+            except Exception as error:
+                failed += len(effects)
+                for effect in effects:
+                    SideEffect.objects.using(using).filter(pk=effect.pk).update(
+                        attempts=F('attempts') + 1, run_after=now + timedelta(seconds=backoff(effect.attempts + 1)),
+                        error='{}: {}'.format(type(error).__name__, error)
+                    )
+            else:
+                SideEffect.objects.using(using).filter(pk__in=[effect.pk for effect in effects]).delete()
+    return taken, failed
+
+
+def queue(using='default'):
+    """
+    :return: tuple of side effects still to be run, seconds the oldest of them has waited, and side effects given up on
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(QUEUE_SQL, {'attempts': settings.RESERVATIONS_SIDE_EFFECT_ATTEMPTS})
+        depth, lag, given_up = cursor.fetchone()
+        return depth, float(lag), given_up
+
+
+def queues():
+    return [(using, queue(using)) for using in hotel_databases()]
+
+
+def samples(queues, index):
+    return [(using, values[index]) for using, values in queues]
+
+
+# Every queue is read once a scrape, for all of the gauges.
+collector = Collector(queues)
+
+Gauge('reservations_side_effect_queue_depth', 'Side effects of writes queued and still to be run, by database.',
+      lambda queues: samples(queues, 0), 'database', collector)
+Gauge('reservations_side_effect_queue_lag_seconds', 'Seconds the oldest side effect still to be run has been queued, by database.',
+      lambda queues: samples(queues, 1), 'database', collector)
+Gauge('reservations_side_effects_given_up', 'Side effects which failed every attempt, kept for inspection, by database.',
+      lambda queues: samples(queues, 2), 'database', collector)
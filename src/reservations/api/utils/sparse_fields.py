@@ -0,0 +1,116 @@
+from django.db.models import QuerySet
+from model_utils import FieldTracker
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def declared_fields(serializer_class):
+    """
+    The fields a serializer may be trimmed to: its Meta.fields, or its declared fields when it has no Meta.
+    """
+    meta = getattr(serializer_class, 'Meta', None)
+    return list(getattr(meta, 'fields', None) or serializer_class._declared_fields)
+
+
+def columns_of(model, serializer_fields, fields):
+    """
+    The model fields the given serializer fields are read from, always including the primary key.
+    Serializer fields which are not read from a model field, such as hyperlinks, need only the primary key.
+    """
+    names = {field.name for field in model._meta.concrete_fields}
+    columns = [model._meta.pk.name]
+    for name in fields:
+        source = serializer_fields[name].source.split('.')[0]
+        if source in names and source not in columns:
+            columns.append(source)
+    return columns
+
+
+def is_tracked(model):
+    """
+    Whether a model keeps a FieldTracker, which can not track fields deferred by only() and so needs every column.
+    """
+    return any(isinstance(value, FieldTracker) for value in vars(model).values())
+
+
+class SparseFieldsetMixin(object):
+    """
+    View set mixin that lets reads choose the fields serialized with `?fields=`, comma separated.
+    Only the columns those fields are read from are loaded from the database, unless the model keeps a FieldTracker.
+    Extra actions serializing with a serializer of their own name it in action_serializer_classes and serialize
+    with get_serializer(), or trim what they have already serialized with sparse_data(). Fields may not be chosen
+    for any other extra action.
+    """
+    # Whether the columns loaded are pruned to those of the chosen fields.
+    # View sets which read more than their serializer's fields, such as archive locations, turn this off.
+    sparse_columns = True
+
+    # Serializer of each extra action which does not serialize with serializer_class, by action name.
+    action_serializer_classes = {}
+
+    def get_serializer_class(self):
+        return self.action_serializer_classes.get(self.action) or super(SparseFieldsetMixin, self).get_serializer_class()
+
+    def initial(self, request, *args, **kwargs):
+        super(SparseFieldsetMixin, self).initial(request, *args, **kwargs)
+        # Fields are checked before the action runs, whether or not it goes on to serialize anything.
+        self.get_sparse_fields()
+
+    def get_sparse_fields(self):
+        """
+        The fields chosen by this request.
+        :return: list of field names, or None when every field is serialized
+        """
+        request = getattr(self, 'request', None)
+        if request is None or 'fields' not in request.query_params:
+            return None
+        # Reads sent as POST, such as batch reads, are listed in read_only_actions.
+        if request.method not in SAFE_METHODS and self.action not in getattr(self, 'read_only_actions', ()):
+            return None
+        if self.action not in ('list', 'retrieve') and self.action not in self.action_serializer_classes:
+            raise ValidationError({'fields': 'Fields may not be chosen for {}'.format(self.action)})
+
+        fields = [field.strip() for field in request.query_params['fields'].split(',') if field.strip()]
+        allowed = declared_fields(self.get_serializer_class())
+        unknown = [field for field in fields if field not in allowed]
+        if not fields or unknown:
+            raise ValidationError({'fields': 'Must be a comma separated list of {}'.format(', '.join(allowed))})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super(SparseFieldsetMixin, self).get_serializer(*args, **kwargs)
+
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            # Lists are serialized by a child serializer.
+            serializer_fields = getattr(serializer, 'child', serializer).fields
+            for name in list(serializer_fields):
+                if name not in fields:
+                    serializer_fields.pop(name)
+
+        return serializer
+
+    def sparse_data(self, data):
+        """
+        Trim data already serialized, a dict or a list of dicts, to the fields chosen by this request.
+        """
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return data
+        trimmed = [{name: value for name, value in item.items() if name in fields} for item in ([data] if isinstance(data, dict) else data)]
+        return trimmed[0] if isinstance(data, dict) else trimmed
+
+    def get_queryset(self):
+        queryset = super(SparseFieldsetMixin, self).get_queryset()
+
+        fields = self.get_sparse_fields()
+        if fields is None or not self.sparse_columns or not isinstance(queryset, QuerySet) or is_tracked(queryset.model):
+            return queryset
+
+        serializer_class = self.get_serializer_class()
+        # Extra actions may serialize another model than the view set's queryset, which is then read whole.
+        if getattr(getattr(serializer_class, 'Meta', None), 'model', None) is not queryset.model:
+            return queryset
+
+        serializer_fields = serializer_class(context=self.get_serializer_context()).fields
+        return queryset.only(*columns_of(queryset.model, serializer_fields, fields))
@@ -0,0 +1,38 @@
+import os
+import threading
+import time
+import uuid
+
+# State of the last UUID generated in this process, so UUIDs generated within the same millisecond still ascend.
+_lock = threading.Lock()
+_last_timestamp = 0
+_last_sequence = 0
+
+
+def uuid7():
+    """
+    Generate a time-ordered UUID in the layout of UUID version 7: a 48 bit Unix timestamp in milliseconds,
+    a 12 bit sequence which ascends within each millisecond, and 62 random bits.
+    UUIDs generated later sort after those generated earlier, so primary keys are appended to the end of their
+    index rather than inserted at random positions throughout it. They are ordinary UUIDs, stored and compared
+    exactly like the random version 4 UUIDs of existing rows.
+    :return: uuid.UUID
+    """
+    global _last_timestamp, _last_sequence
+
+    with _lock:
+        timestamp = time.time_ns() // 1000000
+        if timestamp > _last_timestamp:
+            # Start each millisecond at a random sequence in the lower half, leaving room to ascend.
+            sequence = int.from_bytes(os.urandom(2), 'big') & 0x7ff
+        else:
+            # Within the same millisecond, or if the clock went backwards, continue from the last UUID.
+            timestamp = _last_timestamp
+            sequence = _last_sequence + 1
+            if sequence > 0xfff:
+                timestamp += 1
+                sequence = 0
+        _last_timestamp, _last_sequence = timestamp, sequence
+
+    random = int.from_bytes(os.urandom(8), 'big') & 0x3fffffffffffffff
+    return uuid.UUID(int=(timestamp << 80) | (0x7 << 76) | (sequence << 64) | (0x2 << 62) | random)
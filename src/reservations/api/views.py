@@ -1,33 +1,191 @@
-from rest_framework import viewsets, mixins
+import io
+import json
+import os
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import router
+from django.http import FileResponse
+from django.utils import timezone
+from rest_framework import status, viewsets, mixins
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.fields import DateField, IntegerField, UUIDField
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BaseRenderer
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
-from reservations.api.models import CurrentAndUpcomingReservation, Guest, Room, Reservation
-from reservations.api.serializers import CurrentAndUpcomingReservationSerializer, GuestSerializer, RoomSerializer, ReservationSerializer
+from reservations.api.models import CURRENT_AND_UPCOMING_DEFAULT_DAYS, CURRENT_AND_UPCOMING_MAX_DAYS, CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT, ArchivedReservation, CurrentAndUpcomingReservation, DailyOccupancy, Guest, GuestStayStatistics, Hotel, HotelCurrentAndUpcomingView, Room, RoomNight, Reservation, ViewVersion, current_and_upcoming_view
+from reservations.api.serializers import ArchivedReservationSerializer, CurrentAndUpcomingReservationSerializer, DailyOccupancySerializer, FrontDeskReservationSerializer, GuestSerializer, GuestStayStatisticsSerializer, HotelCurrentAndUpcomingReservationSerializer, HotelSerializer, JoinedReservationSerializer, RoomSerializer, ReservationBatchGetSerializer, ReservationSerializer, ReservationStatusBatchSerializer
+from reservations.api.utils import bulk_import, changes, freshness, front_desk, metrics, profiling
+from reservations.api.utils.archive import read_archived
+from reservations.api.utils.hotel_views import HotelDatabasesMixin
+from reservations.api.utils.hotels import across_hotels, of_hotel, ordered
+from reservations.api.utils.replica_views import ReplicaReadMixin
+from reservations.api.utils.response_cache import CachedResponseMixin
+from reservations.api.utils.sparse_fields import SparseFieldsetMixin
 from reservations.api.utils.throttles import ReservationStatusRateThrottle
 
 
 # Guest View set
 # We only want to allow GET, POST, GET <id>, and PUT/PATCH <id>
 # so we explicitly declare only those mixins.
-class GuestViewSet(mixins.CreateModelMixin,
+class GuestViewSet(CachedResponseMixin,
+                   ReplicaReadMixin,
+                  SparseFieldsetMixin,
+                  mixins.CreateModelMixin,
                   mixins.RetrieveModelMixin,
                   mixins.UpdateModelMixin,
                   mixins.ListModelMixin,
                   viewsets.GenericViewSet):
     """
     API endpoint that allows reservations to be viewed or edited
+    Guests may be searched by name with `?search=`, tolerating typos, or with `?search=&mode=prefix` to autocomplete.
     """
     authentication_classes = (SessionAuthentication, BasicAuthentication)
+    # Guests are personal, so only the client itself may keep them.
+    cache_control = {'private': True, 'max_age': 60}
 
     queryset = Guest.objects.all().order_by('last_name', 'first_name')
     serializer_class = GuestSerializer
+    action_serializer_classes = {'reservations': ReservationSerializer, 'stats': GuestStayStatisticsSerializer}
+
+    # Number of search results returned by default, and at most.
+    search_limit = 25
+    max_search_limit = 100
+
+    def get_queryset(self):
+        queryset = super(GuestViewSet, self).get_queryset()
+        params = self.request.query_params
+        if self.action != 'list' or not params.get('search', '').strip():
+            return queryset
+
+        mode = params.get('mode', 'similar')
+        if mode not in ('similar', 'prefix'):
+            raise ValidationError({'mode': 'Must be one of similar or prefix'})
+        limit = IntegerField(min_value=1, max_value=self.max_search_limit).run_validation(
+            params.get('limit', self.search_limit)
+        )
+
+        return queryset.search(params['search'], prefix=mode == 'prefix')[:limit]
+
+    @detail_route()
+    def reservations(self, request, pk=None):
+        """
+        All Reservations of this Guest, most recent first, from every database Reservations live on.
+        """
+        reservations = ordered(
+            chain.from_iterable(across_hotels(Reservation.objects.filter(guest=self.get_object()))), ('-in_date',)
+        )
+        return Response(self.get_serializer(reservations, many=True).data)
+
+    @detail_route()
+    def stats(self, request, pk=None):
+        """
+        Stay statistics of this Guest: number of stays, total nights stayed and the last check-out.
+        """
+        return Response(self.get_serializer(GuestStayStatistics.of(self.get_object())).data)
+
+
+def conditional(request, view_version, respond):
+    """
+    Respond with current and upcoming Reservations read at a version of their view, tagged with the version and
+    with the age of the view's snapshot in seconds, X-Snapshot-Age.
+    Clients which already hold what they would read are answered 304 Not Modified, without it being read.
+    :param view_version: ViewVersion of the view, read before the Reservations are, from the same database
+    :param respond: callable reading the Reservations into a Response
+    """
+    if changes.version_of(request.META.get('HTTP_IF_NONE_MATCH')) == view_version.version:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = respond()
+    response['ETag'] = changes.etag(view_version.version)
+    if view_version.refreshed is not None:
+        response['X-Snapshot-Age'] = '{:.3f}'.format(view_version.age())
+    return response
+
+
+# Pagination of the Rooms and Reservations of a Hotel, `limit` at a time from `offset`.
+class HotelListPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+
+# Hotel View set
+# We only want to allow GET, POST, GET <id>, and PUT/PATCH <id>
+# so we explicitly declare only those mixins.
+class HotelViewSet(ReplicaReadMixin,
+                   SparseFieldsetMixin,
+                   mixins.CreateModelMixin,
+                   mixins.RetrieveModelMixin,
+                   mixins.UpdateModelMixin,
+                   mixins.ListModelMixin,
+                   viewsets.GenericViewSet):
+    """
+    API endpoint that allows hotels to be viewed or edited, along with the rooms and reservations of each hotel.
+    """
+    authentication_classes = (SessionAuthentication, BasicAuthentication)
+
+    queryset = Hotel.objects.all().order_by('name')
+    serializer_class = HotelSerializer
+    action_serializer_classes = {
+        'rooms': RoomSerializer,
+        'reservations': ReservationSerializer,
+        'current_and_upcoming': HotelCurrentAndUpcomingReservationSerializer,
+    }
+    hotel_list_pagination_class = HotelListPagination
+
+    def paginated(self, queryset):
+        """
+        Respond with one page of a queryset of the Hotel's Rooms or Reservations.
+        """
+        paginator = self.hotel_list_pagination_class()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @detail_route()
+    def rooms(self, request, pk=None):
+        """
+        The Rooms of this Hotel, by number, a page at a time.
+        """
+        return self.paginated(of_hotel(Room.objects.all(), self.get_object().pk).order_by('number', 'id'))
+
+    @detail_route()
+    def reservations(self, request, pk=None):
+        """
+        The Reservations of this Hotel, by arrival date, a page at a time.
+        """
+        return self.paginated(of_hotel(Reservation.objects.all(), self.get_object().pk).order_by('in_date', 'id'))
+
+    @detail_route()
+    def current_and_upcoming(self, request, pk=None):
+        """
+        Reservations of this Hotel current today or arriving less than `days` days from today, 3 by default,
+        read from the Hotel's own materialized view.
+        """
+        days = IntegerField(min_value=1, max_value=CURRENT_AND_UPCOMING_MAX_DAYS).run_validation(
+            request.query_params.get('days', CURRENT_AND_UPCOMING_DEFAULT_DAYS)
+        )
+        view = HotelCurrentAndUpcomingView(self.get_object().pk)
+        return conditional(request, ViewVersion.of(view.db_table, using=view.using), lambda: Response(
+            self.get_serializer(view.within(days), many=True).data
+        ))
 
 
 # Room View set
 # We only want to allow GET, POST, GET <id>, and PUT/PATCH <id>
 # so we explicitly declare only those mixins.
-class RoomViewSet(mixins.CreateModelMixin,
+class RoomViewSet(CachedResponseMixin,
+                  ReplicaReadMixin,
+                  HotelDatabasesMixin,
+                  SparseFieldsetMixin,
+                  mixins.CreateModelMixin,
                   mixins.RetrieveModelMixin,
                   mixins.UpdateModelMixin,
                   mixins.ListModelMixin,
@@ -36,15 +194,51 @@ class RoomViewSet(mixins.CreateModelMixin,
     API endpoint that allows reservations to be viewed or edited
     """
     authentication_classes = (SessionAuthentication, BasicAuthentication)
+    # Rooms are the same for every client, so shared caches may keep them too.
+    cache_control = {'public': True, 'max_age': 60}
 
     queryset = Room.objects.all().order_by('-number')
     serializer_class = RoomSerializer
 
+    # Longest date range reported at once.
+    max_days = 366
+
+    @list_route()
+    def availability(self, request):
+        """
+        Rooms free each night from the `from` to the `to` query parameters inclusive, counted from the room-night
+        inventory. Rooms of the Hotel given by the `hotel` query parameter are counted, or Rooms not in any Hotel.
+        """
+        params = request.query_params
+        if 'from' not in params or 'to' not in params:
+            raise ValidationError('Availability requires from and to')
+
+        start = DateField().to_internal_value(params['from'])
+        end = DateField().to_internal_value(params['to'])
+        if start > end:
+            raise ValidationError('from must be on or before to')
+        if (end - start).days >= self.max_days:
+            raise ValidationError('Availability may span at most {} days'.format(self.max_days))
+
+        hotel_id = None
+        if 'hotel' in params:
+            hotel_id = UUIDField().run_validation(params['hotel'])
+            if not Hotel.objects.filter(pk=hotel_id).exists():
+                raise NotFound()
+
+        return Response([
+            {'night': night, 'rooms': rooms, 'rooms_free': rooms_free}
+            for night, rooms, rooms_free in RoomNight.availability(start, end, hotel_id)
+        ])
+
 
 # Reservation View set
 # We only want to allow GET, POST, GET <id>, and PUT/PATCH <id>
 # so we explicitly declare only those mixins.
-class ReservationViewSet(mixins.CreateModelMixin,
+class ReservationViewSet(ReplicaReadMixin,
+                         HotelDatabasesMixin,
+                         SparseFieldsetMixin,
+                         mixins.CreateModelMixin,
                          mixins.RetrieveModelMixin,
                          mixins.UpdateModelMixin,
                          mixins.ListModelMixin,
@@ -57,18 +251,341 @@ class ReservationViewSet(mixins.CreateModelMixin,
 
     queryset = Reservation.objects.all().order_by('-in_date')
     serializer_class = ReservationSerializer
+    read_only_actions = ('batch_get',)
+    action_serializer_classes = {
+        'arrivals': FrontDeskReservationSerializer,
+        'departures': FrontDeskReservationSerializer,
+        'batch_get': JoinedReservationSerializer,
+    }
+
+    def front_desk_date(self):
+        if 'date' not in self.request.query_params:
+            return timezone.localdate()
+        return DateField().to_internal_value(self.request.query_params['date'])
+
+    @list_route()
+    def arrivals(self, request):
+        """
+        Reservations arriving on `date`, today by default, which have not been checked in.
+        """
+        return Response(self.sparse_data(front_desk.get(front_desk.ARRIVALS, self.front_desk_date())))
+
+    @list_route()
+    def departures(self, request):
+        """
+        Reservations departing on `date`, today by default, which have been checked in but not checked out.
+        """
+        return Response(self.sparse_data(front_desk.get(front_desk.DEPARTURES, self.front_desk_date())))
+
+    # Transitions many Reservations in one request, so it is not throttled per Reservation like status changes are.
+    @list_route(methods=['post'], throttle_classes=(AnonRateThrottle, UserRateThrottle))
+    def batch_status(self, request):
+        """
+        Transition many Reservations, given as `ids`, to one `status` at once, such as checking in a group.
+        Either every Reservation transitions or, if any may not, none do.
+        """
+        batch = ReservationStatusBatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+
+        try:
+            reservations = Reservation.transition_many(batch.validated_data['ids'], batch.validated_data['status'])
+        except DjangoValidationError as err:
+            raise ValidationError(err.message_dict)
+
+        return Response(self.get_serializer(reservations, many=True).data)
+
+    @list_route(methods=['post'], throttle_classes=(AnonRateThrottle, UserRateThrottle))
+    def batch_get(self, request):
+        """
+        Read many Reservations, given as `ids`, at once, along with their Guests' names and Rooms' numbers.
+        They are read by one query on each database Reservations live on. Responds with the Reservations found, in the order given,
+        and the ids of those not found as `missing`.
+        """
+        batch = ReservationBatchGetSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(batch.validated_data['ids']))
+
+        found = {
+            reservation.pk: reservation
+            for queryset in across_hotels(self.get_queryset().filter(pk__any=ids).select_related('guest', 'room').order_by())
+            for reservation in queryset
+        }
+        return Response({
+            'reservations': self.get_serializer([found[pk] for pk in ids if pk in found], many=True).data,
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    @list_route()
+    def changes(self, request):
+        """
+        The version of the current and upcoming Reservations of `hotel`, or of Rooms not in any Hotel by default,
+        counted up each time they change. Served asynchronously (see reservations/asgi.py), a client passing the
+        version it last read as `since` is answered once they change again, or after 25 seconds at most.
+        """
+        hotel_id = None
+        if 'hotel' in request.query_params:
+            hotel_id = UUIDField().run_validation(request.query_params['hotel'])
+            if not Hotel.objects.filter(pk=hotel_id).exists():
+                raise NotFound()
+        name, using = current_and_upcoming_view(hotel_id)
+        return Response({'hotel': hotel_id, 'version': ViewVersion.current(name, using=using)})
 
 
 # CurrentAndUpcomingReservation View set
 # We only want to allow GET and GET <id> so we explicitly declare only that mixins.
-class CurrentAndUpcomingReservationViewSet(mixins.RetrieveModelMixin,
+class CurrentAndUpcomingReservationViewSet(ReplicaReadMixin,
+                                           SparseFieldsetMixin,
+                                           mixins.RetrieveModelMixin,
                                            mixins.ListModelMixin,
                                            viewsets.GenericViewSet):
     """
     API endpoint that allows current and upcoming reservations, along with guest and information,
     to be viewed quickly in a highly available manner.
+    Reservations arriving less than `days` days from today are included, 3 by default.
     """
     authentication_classes = (SessionAuthentication, BasicAuthentication)
 
-    queryset = CurrentAndUpcomingReservation.objects.all().order_by('in_date', 'status')
+    queryset = CurrentAndUpcomingReservation.lookahead.all().order_by('in_date', 'status')
     serializer_class = CurrentAndUpcomingReservationSerializer
+
+    def get_days(self):
+        return IntegerField(min_value=1, max_value=CURRENT_AND_UPCOMING_MAX_DAYS).run_validation(
+            self.request.query_params.get('days', CURRENT_AND_UPCOMING_DEFAULT_DAYS)
+        )
+
+    def get_queryset(self):
+        days = self.get_days()
+        # Listing is the hot path, served by a prepared statement.
+        if self.action == 'list':
+            return CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT.raw(CurrentAndUpcomingReservation.lookahead.db_manager(getattr(self, 'using', None)), [days])
+        return super(CurrentAndUpcomingReservationViewSet, self).get_queryset().within(days)
+
+    def list(self, request, *args, **kwargs):
+        # Read from the same database as the Reservations, chosen once, so the version is never newer than what is read.
+        self.using = router.db_for_read(CurrentAndUpcomingReservation)
+        view_version = ViewVersion.of(CurrentAndUpcomingReservation._meta.db_table, using=self.using)
+        return conditional(request, view_version, lambda: super(CurrentAndUpcomingReservationViewSet, self).list(request, *args, **kwargs))
+
+    @list_route(permission_classes=(IsAdminUser,))
+    def refreshes(self, request):
+        """
+        How fresh each current and upcoming view is: when it was last refreshed, how long that took, how many rows
+        it holds, and how many seconds it lags behind the newest Reservation it should hold.
+        Only available to admin users.
+        """
+        return Response(freshness.reports())
+
+
+# ArchivedReservation View set
+# Archived Reservations are read-only so we only declare GET and GET <id>.
+class ArchivedReservationViewSet(ReplicaReadMixin,
+                                 HotelDatabasesMixin,
+                                 SparseFieldsetMixin,
+                                 mixins.RetrieveModelMixin,
+                                 mixins.ListModelMixin,
+                                 viewsets.GenericViewSet):
+    """
+    API endpoint that allows archived reservations to be looked up by guest, room or date range.
+    Listing requires at least one of the `guest`, `room`, `from` or `to` query parameters.
+    """
+    authentication_classes = (SessionAuthentication, BasicAuthentication)
+
+    queryset = ArchivedReservation.objects.all().order_by('in_date')
+    serializer_class = ArchivedReservationSerializer
+    # Snapshots are read from the archive location of each row, whatever fields are chosen.
+    sparse_columns = False
+
+    def get_queryset(self):
+        queryset = super(ArchivedReservationViewSet, self).get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        params = self.request.query_params
+        if not any(param in params for param in ('guest', 'room', 'from', 'to')):
+            raise ValidationError('Archived reservations must be filtered by guest, room, from or to')
+
+        if 'guest' in params:
+            queryset = queryset.filter(guest_id=UUIDField().to_internal_value(params['guest']))
+        if 'room' in params:
+            queryset = queryset.filter(room_id=UUIDField().to_internal_value(params['room']))
+        # Archived reservations overlapping the given date range.
+        if 'from' in params:
+            queryset = queryset.filter(out_date__gte=DateField().to_internal_value(params['from']))
+        if 'to' in params:
+            queryset = queryset.filter(in_date__lte=DateField().to_internal_value(params['to']))
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        snapshots = read_archived(self.across_databases(self.filter_queryset(self.get_queryset())))
+        return Response(self.get_serializer(snapshots, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        snapshot, = read_archived([self.get_object()])
+        return Response(self.get_serializer(snapshot).data)
+
+
+# OccupancyReport View set
+# Reports are read-only so we only declare GET.
+class OccupancyReportViewSet(ReplicaReadMixin,
+                             SparseFieldsetMixin,
+                             mixins.ListModelMixin,
+                             viewsets.GenericViewSet):
+    """
+    API endpoint that reports rooms occupied, arrivals, departures and check-ins completed
+    for every date from the `from` to the `to` query parameters inclusive.
+    """
+    authentication_classes = (SessionAuthentication, BasicAuthentication)
+
+    queryset = DailyOccupancy.objects.all().order_by('date')
+    serializer_class = DailyOccupancySerializer
+
+    # Longest date range reported at once.
+    max_days = 3660
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if 'from' not in params or 'to' not in params:
+            raise ValidationError('Occupancy reports require from and to')
+
+        start = DateField().to_internal_value(params['from'])
+        end = DateField().to_internal_value(params['to'])
+        if start > end:
+            raise ValidationError('from must be on or before to')
+        if (end - start).days >= self.max_days:
+            raise ValidationError('Occupancy reports may span at most {} days'.format(self.max_days))
+
+        # Each database records the occupancy of the Rooms on it, which are added up.
+        recorded = {}
+        for queryset in across_hotels(self.get_queryset().filter(date__range=(start, end))):
+            for occupancy in queryset:
+                if occupancy.date in recorded:
+                    recorded[occupancy.date].add(occupancy)
+                else:
+                    recorded[occupancy.date] = occupancy
+        # Dates nothing has been reserved for are not recorded, and are reported with zero counts.
+        days = [
+            recorded.get(date) or DailyOccupancy(date=date)
+            for date in (start + timedelta(days=day) for day in range((end - start).days + 1))
+        ]
+        return Response(self.get_serializer(days, many=True).data)
+
+
+# Import View set
+# Imports only create, so we only declare POST for each model imported.
+class ImportViewSet(viewsets.ViewSet):
+    """
+    API endpoint that allows administrators to bulk import Rooms and Guests.
+    Rows are given as a JSON list of objects, or as an uploaded CSV or NDJSON `file`.
+    """
+    authentication_classes = (SessionAuthentication, BasicAuthentication)
+    permission_classes = (IsAdminUser,)
+
+    def import_rows(self, request, model, **options):
+        if 'file' in request.FILES:
+            upload = request.FILES['file']
+            format = request.data.get('format') or bulk_import.format_of(upload.name)
+            try:
+                rows = list(bulk_import.read_rows(io.TextIOWrapper(upload.file, encoding='utf-8', newline=''), format))
+            except ValueError as err:
+                raise ValidationError({'file': str(err)})
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            raise ValidationError('Rows must be given as a JSON list or an uploaded file')
+
+        if not all(isinstance(row, dict) for row in rows):
+            raise ValidationError('Each row must be an object')
+
+        return Response(bulk_import.IMPORTS[model](rows, **options))
+
+    @list_route(methods=['post'])
+    def rooms(self, request):
+        """
+        Import Rooms, given by `number` and optionally `key`, into the Hotel given as `hotel`, if any.
+        Rows whose number is already taken are reported as `conflicts`, rows which are not valid as `errors`,
+        and `imported` maps each row's key to its new Room id.
+        """
+        hotel = None
+        if 'hotel' in request.query_params:
+            hotel = UUIDField().run_validation(request.query_params['hotel'])
+            if not Hotel.objects.filter(pk=hotel).exists():
+                raise ValidationError({'hotel': 'Hotel does not exist'})
+        return self.import_rows(request, 'rooms', hotel=hotel)
+
+    @list_route(methods=['post'])
+    def guests(self, request):
+        """
+        Import Guests, given by `first_name`, optionally `last_name` and optionally `key`.
+        Rows which are not valid are reported as `errors`, and `imported` maps each row's key to its new Guest id.
+        """
+        return self.import_rows(request, 'guests')
+
+
+# Profile View set
+# Profiles are written by the profiling middleware, so they are only listed and read.
+class ProfileViewSet(viewsets.ViewSet):
+    """
+    API endpoint that allows administrators to download the profiles of requests made with `?profile=1`.
+    """
+    authentication_classes = (SessionAuthentication, BasicAuthentication)
+    permission_classes = (IsAdminUser,)
+
+    def get_path(self, pk, extension):
+        # Profiles are named by UUID, which also keeps the path within the profile directory.
+        path = profiling.profile_path(UUIDField().run_validation(pk), extension)
+        if not os.path.exists(path):
+            raise NotFound()
+        return path
+
+    def list(self, request):
+        """
+        The ids of every profile, most recent first.
+        """
+        if not os.path.isdir(settings.RESERVATIONS_PROFILE_DIR):
+            return Response([])
+        names = os.listdir(settings.RESERVATIONS_PROFILE_DIR)
+        return Response(sorted((name[:-len('.json')] for name in names if name.endswith('.json')), reverse=True))
+
+    def retrieve(self, request, pk=None):
+        """
+        The profile's report: timings, the query log, the plans of the slowest queries and the cProfile summary.
+        """
+        with open(self.get_path(pk, 'json')) as report:
+            return Response(json.load(report))
+
+    @detail_route()
+    def pstats(self, request, pk=None):
+        """
+        The profile's full cProfile stats, to be loaded with pstats or a viewer such as snakeviz.
+        """
+        response = FileResponse(open(self.get_path(pk, 'prof'), 'rb'), content_type='application/octet-stream')
+        response['Content-Disposition'] = 'attachment; filename="{}.prof"'.format(pk)
+        return response
+
+
+# Renders metrics as given, in the Prometheus text exposition format.
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Errors, such as authentication failures, are rendered as plain text too.
+        return data if isinstance(data, str) else str(data)
+
+
+# Metrics View
+# Metrics are not a resource, so this is a plain view rather than a view set.
+class MetricsView(APIView):
+    """
+    API endpoint that exposes this process' metrics to administrators in the Prometheus text format.
+    """
+    authentication_classes = (SessionAuthentication, BasicAuthentication)
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+    # Scrapers are administrators, polling at a rate of their own.
+    throttle_classes = ()
+
+    def get(self, request):
+        return Response(metrics.exposition())
@@ -0,0 +1,30 @@
+"""
+ASGI config for reservations project, for serving long polling clients such as lobby screens. Run from src:
+
+    $ daphne -b 0.0.0.0 -p 8001 reservations.asgi:application
+
+Current and upcoming Reservations, of every Hotel, and their changes are served by consumers which hold waiting
+clients on the event loop rather than on a thread each. Every other request, including every write, is served by
+the same Django views as under WSGI, in a pool of threads.
+"""
+
+import os
+
+import django
+from channels.http import AsgiHandler
+from channels.routing import ProtocolTypeRouter, URLRouter
+from django.urls import re_path
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "reservations.settings")
+django.setup()
+
+from reservations.api import consumers  # NOQA: E402 models may only be imported once Django is set up
+
+application = ProtocolTypeRouter({
+    'http': URLRouter([
+        re_path(r'^reservations/current_and_upcoming/?$', consumers.CurrentAndUpcomingReservationConsumer),
+        re_path(r'^reservations/changes/?$', consumers.ChangesConsumer),
+        re_path(r'^hotels/(?P<pk>[^/.]+)/current_and_upcoming/?$', consumers.HotelCurrentAndUpcomingReservationConsumer),
+        re_path(r'', AsgiHandler),
+    ]),
+})
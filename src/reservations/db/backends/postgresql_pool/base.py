@@ -0,0 +1,66 @@
+"""
+PostgreSQL database backend which keeps a bounded pool of open connections per process.
+
+Django closes its connection at the end of every request unless CONN_MAX_AGE is set. With this backend closing a
+connection returns it to the pool instead, so the next request skips connection setup and reuses the session,
+including any prepared statements made on it (see reservations.api.utils.prepared).
+
+Pool behaviour is configured with the POOL key of the database settings:
+
+    'POOL': {
+        'MAX_SIZE': 10,  # Connections open at once per process.
+        'TIMEOUT': 10,  # Seconds to wait for a connection while all are in use.
+        'HEALTH_CHECK_INTERVAL': 30,  # Idle seconds after which a connection is checked before reuse.
+    }
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+
+from reservations.db.backends.postgresql_pool.pool import close_pools, get_pool
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would prevent it from being dropped.
+        close_pools(test_database_name)
+        super(DatabaseCreation, self)._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        pool_settings = self.settings_dict.get('POOL', {})
+        return get_pool(
+            tuple(sorted(conn_params.items())),
+            lambda: base.Database.connect(**conn_params),
+            max_size=int(pool_settings.get('MAX_SIZE', 10)),
+            timeout=float(pool_settings.get('TIMEOUT', 10)),
+            health_check_interval=float(pool_settings.get('HEALTH_CHECK_INTERVAL', 30)),
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.acquire()
+
+        # As the PostgreSQL backend does for new connections.
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                if self.in_atomic_block:
+                    # Django keeps referencing a connection closed within an atomic block until the block exits,
+                    # so it must not be handed out again.
+                    self.pool.discard(self.connection)
+                else:
+                    self.pool.release(self.connection)
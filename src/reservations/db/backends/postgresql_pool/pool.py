@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+
+from psycopg2 import extensions
+
+# Pools by process and connection parameters.
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Pools inherited from a parent process. Their connections belong to the parent: closing them would terminate the
+# parent's sessions, so they are kept referenced and never touched again.
+_inherited_pools = []
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of psycopg2 connections for one process.
+
+    At most `max_size` connections are open at once. Acquiring a connection blocks for up to `timeout` seconds while
+    the pool is exhausted. Connections which have been idle for longer than `health_check_interval` seconds are
+    checked with a `SELECT 1` before being handed out, and replaced if they are no longer usable.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10, health_check_interval=30):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.size = 0
+        # Idle connections and the time they were returned, most recently returned last.
+        self.idle = []
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhausted('All {} pooled connections are in use'.format(self.max_size))
+                    self.condition.wait(remaining)
+
+                if self.idle:
+                    connection, returned_at = self.idle.pop()
+                else:
+                    # Reserve a slot for a new connection before connecting outside of the lock.
+                    self.size += 1
+                    connection = None
+
+            if connection is None:
+                try:
+                    return self.connect()
+                except Exception:
+                    self.discard(None)
+                    raise
+
+            if self._healthy(connection, returned_at):
+                return connection
+            self.discard(connection)
+
+    def release(self, connection):
+        """
+        Return a connection to the pool, rolling back anything left open on it.
+        """
+        if not connection.closed and connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+
+        if connection.closed or connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            self.discard(connection)
+            return
+
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def close(self):
+        """
+        Close every idle connection. Connections in use are closed when they are released.
+        """
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def _healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def discard(self, connection):
+        if connection is not None and not connection.closed:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+
+def get_pool(key, connect, **options):
+    """
+    Get the pool for the given connection parameters in this process, creating it if needed.
+    """
+    pid = os.getpid()
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and pool.pid != pid:
+            _inherited_pools.append(pool)
+            pool = None
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(connect, **options)
+            pool.pid = pid
+        return pool
+
+
+def close_pools(database=None):
+    """
+    Close idle connections of every pool in this process, or only those of pools connected to the given database.
+    """
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [
+            pool for key, pool in _pools.items()
+            if pool.pid == pid and (database is None or dict(key).get('database') == database)
+        ]
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reservations.api.models import Reservation, ReservationState
+from reservations.api.utils.archive import archive_reservations
+from reservations.api.utils.hotels import hotel_databases
+
+
+class Command(BaseCommand):
+    help = 'Move Reservations checked out more than N days ago into compressed archive files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help='Archive Reservations checked out more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of Reservations written to each archive file.')
+        parser.add_argument('--directory', default=None,
+                            help='Directory to write archives to, defaults to RESERVATIONS_ARCHIVE_DIR.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        # Reservations are archived from every database they live on, each recording its own as archived.
+        for using in hotel_databases():
+            candidates = Reservation.objects.using(using).select_related('guest', 'room').filter(
+                status=ReservationState.checked_out,
+                checkout_datetime__lt=cutoff
+            ).order_by('checkout_datetime', 'id')
+
+            while True:
+                # Archived Reservations leave the table, so the first batch is always the next one.
+                batch = list(candidates[:options['batch_size']])
+                if not batch:
+                    break
+
+                archived = archive_reservations(batch, options['directory'], using=using)
+                total += len(archived)
+                self.stdout.write('Archived {} Reservations to {}'.format(len(archived), archived[0].archive_file))
+
+        self.stdout.write(self.style.SUCCESS('Archived {} Reservations checked out before {}'.format(total, cutoff)))
@@ -0,0 +1,48 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reservations.api.models import Hotel
+from reservations.api.utils.bulk_import import FORMATS, IMPORTS, format_of, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import Rooms or Guests from a CSV or NDJSON file, writing the mapping of row keys to new ids as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(IMPORTS), help='What to import.')
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Format of the file, by default inferred from its extension.')
+        parser.add_argument('--hotel', default=None, help='Primary key of the Hotel to import Rooms into.')
+
+    def handle(self, *args, **options):
+        kwargs = {}
+        if options['hotel']:
+            if options['model'] != 'rooms':
+                raise CommandError('Only Rooms are imported into a Hotel')
+            try:
+                exists = Hotel.objects.filter(pk=options['hotel']).exists()
+            except ValidationError:
+                exists = False
+            if not exists:
+                raise CommandError('Hotel {} does not exist'.format(options['hotel']))
+            kwargs['hotel'] = options['hotel']
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                result = IMPORTS[options['model']](read_rows(stream, options['format'] or format_of(options['path'])), **kwargs)
+        except (OSError, ValueError) as err:
+            raise CommandError(err)
+
+        for conflict in result['conflicts']:
+            self.stderr.write('Line {line}: Room number {number} is already taken by Room {room}'.format(**conflict))
+        for error in result['errors']:
+            self.stderr.write('Line {line}: {error}'.format(**error))
+        self.stderr.write(self.style.SUCCESS('Imported {} {}, {} conflicts, {} errors'.format(
+            len(result['imported']), options['model'], len(result['conflicts']), len(result['errors'])
+        )))
+
+        self.stdout.write(json.dumps(result['imported'], cls=DjangoJSONEncoder, indent=2))
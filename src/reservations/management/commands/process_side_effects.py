@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservations.api.utils import side_effects
+from reservations.api.utils.hotels import hotel_databases
+
+
+class Command(BaseCommand):
+    help = 'Run the side effects of writes queued while RESERVATIONS_DEFER_SIDE_EFFECTS is set, on every database ' \
+           'Reservations live on, until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Most side effects taken at once.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait once no side effect is due.')
+        parser.add_argument('--once', action='store_true', help='Stop once no side effect is due.')
+
+    def handle(self, *args, **options):
+        total_taken = total_failed = 0
+        while True:
+            taken_any = False
+            for using in hotel_databases():
+                taken, failed = side_effects.process(using, options['batch_size'])
+                if taken:
+                    taken_any = True
+                    total_taken += taken
+                    total_failed += failed
+                    self.stdout.write('{}: ran {} side effects, {} failed'.format(using, taken - failed, failed))
+
+            if not taken_any:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Ran {} side effects, {} failed'.format(total_taken - total_failed, total_failed)))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.api.models import DAILY_OCCUPANCY_FIELDS, DailyOccupancy
+
+
+class Command(BaseCommand):
+    help = 'Verify the daily occupancy rollup against a full recompute from all Reservations, and rebuild it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true',
+                            help='Report differences without rebuilding, failing if there are any.')
+
+    def handle(self, *args, **options):
+        differences = DailyOccupancy.differences()
+        for date, recorded, recomputed in differences:
+            self.stdout.write('{}: recorded {} recomputed {}'.format(
+                date,
+                ', '.join('{}={}'.format(field, count) for field, count in zip(DAILY_OCCUPANCY_FIELDS, recorded)),
+                ', '.join('{}={}'.format(field, count) for field, count in zip(DAILY_OCCUPANCY_FIELDS, recomputed)),
+            ))
+
+        if options['verify_only']:
+            if differences:
+                raise CommandError('Daily occupancy differs from a full recompute on {} dates'.format(len(differences)))
+            self.stdout.write(self.style.SUCCESS('Daily occupancy matches a full recompute'))
+            return
+
+        dates = DailyOccupancy.rebuild()
+        self.stdout.write(self.style.SUCCESS('Rebuilt daily occupancy of {} dates, {} of which differed'.format(
+            dates, len(differences)
+        )))
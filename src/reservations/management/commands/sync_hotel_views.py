@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reservations.api.models import Hotel, HotelCurrentAndUpcomingView
+
+
+class Command(BaseCommand):
+    help = 'Recreate the current and upcoming materialized view of every Hotel from the current definition.'
+
+    def handle(self, *args, **options):
+        hotels = Hotel.objects.order_by('pk')
+        for hotel in hotels:
+            view = HotelCurrentAndUpcomingView(hotel.pk)
+            # Reads wait for the new view rather than finding none.
+            with transaction.atomic(using=view.using):
+                view.drop()
+                view.create()
+            self.stdout.write('{}: {}'.format(hotel.name, view.db_table))
+
+        self.stdout.write(self.style.SUCCESS('Synced the views of {} Hotels'.format(len(hotels))))
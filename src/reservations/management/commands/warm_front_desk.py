@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from reservations.api.utils import front_desk
+
+
+class Command(BaseCommand):
+    help = 'Cache the front desk arrivals and departures of today, to be run at date rollover.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default=None,
+                            help='First date to warm as YYYY-MM-DD, defaults to today.')
+        parser.add_argument('--days', type=int, default=1,
+                            help='Number of dates to warm from the first.')
+
+    def handle(self, *args, **options):
+        date = parse_date(options['date']) if options['date'] else timezone.localdate()
+        if date is None:
+            raise CommandError('--date must be YYYY-MM-DD')
+        if options['days'] < 1:
+            raise CommandError('--days must be positive')
+
+        for day in range(options['days']):
+            front_desk.warm(date + timedelta(days=day))
+            self.stdout.write('Warmed front desk arrivals and departures of {}'.format(date + timedelta(days=day)))
@@ -0,0 +1,31 @@
+# Generated by Django 2.0.1 on 2026-10-19 09:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0008_auto_20180119_0750'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('reservation_id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+                ('in_date', models.DateField(db_index=True, editable=False)),
+                ('out_date', models.DateField(db_index=True, editable=False)),
+                ('checkout_datetime', models.DateTimeField(editable=False, null=True)),
+                ('archive_file', models.CharField(editable=False, max_length=255)),
+                ('archive_line', models.IntegerField(editable=False)),
+                ('guest', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, to='reservations.Guest')),
+                ('room', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, to='reservations.Room')),
+            ],
+            options={
+                'ordering': ('in_date',),
+            },
+        ),
+    ]
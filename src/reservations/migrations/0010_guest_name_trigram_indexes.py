@@ -0,0 +1,22 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0009_archivedreservation'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Trigram indexes serve both similarity (%) and case insensitive prefix (ILIKE 'prefix%') Guest name searches.
+        migrations.RunSQL(
+            'CREATE INDEX reservations_guest_first_name_trgm ON reservations_guest USING gin (first_name gin_trgm_ops);',
+            'DROP INDEX reservations_guest_first_name_trgm;'
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX reservations_guest_last_name_trgm ON reservations_guest USING gin (last_name gin_trgm_ops);',
+            'DROP INDEX reservations_guest_last_name_trgm;'
+        ),
+    ]
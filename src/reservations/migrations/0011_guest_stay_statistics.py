@@ -0,0 +1,43 @@
+# Generated by Django 2.0.1 on 2026-10-19 09:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0010_guest_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestStayStatistics',
+            fields=[
+                ('guest', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, primary_key=True, related_name='stay_statistics', serialize=False, to='reservations.Guest')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('stay_count', models.IntegerField(default=0)),
+                ('total_nights', models.IntegerField(default=0)),
+                ('last_checkout', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['guest', 'in_date'], name='reservation_guest_in_date'),
+        ),
+        # Compute the stay statistics of Guests with existing stays.
+        migrations.RunSQL(
+            """
+            INSERT INTO reservations_gueststaystatistics (guest_id, updated, stay_count, total_nights, last_checkout)
+            SELECT guest_id, now(), count(*), coalesce(sum(out_date - in_date), 0), max(checkout_datetime)
+            FROM (
+              SELECT guest_id, in_date, out_date, checkout_datetime FROM reservations_reservation
+              WHERE status IN ('checked_in', 'checked_out')
+              UNION ALL
+              SELECT guest_id, in_date, out_date, checkout_datetime FROM reservations_archivedreservation
+            ) AS stays
+            GROUP BY guest_id;
+            """,
+            migrations.RunSQL.noop
+        ),
+    ]
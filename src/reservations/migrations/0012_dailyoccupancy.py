@@ -0,0 +1,48 @@
+# Generated by Django 2.0.1 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0011_guest_stay_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOccupancy',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('rooms_occupied', models.IntegerField(default=0)),
+                ('arrivals', models.IntegerField(default=0)),
+                ('departures', models.IntegerField(default=0)),
+                ('check_ins', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('date',),
+            },
+        ),
+        # Compute the daily occupancy of existing Reservations.
+        migrations.RunSQL(
+            """
+            INSERT INTO reservations_dailyoccupancy (date, rooms_occupied, arrivals, departures, check_ins)
+            WITH stays AS (
+              SELECT in_date, out_date, status <> 'pending' AS checked_in FROM reservations_reservation
+              UNION ALL
+              SELECT in_date, out_date, true FROM reservations_archivedreservation
+            )
+            SELECT date, sum(rooms_occupied), sum(arrivals), sum(departures), sum(check_ins)
+            FROM (
+              SELECT night::date AS date, 1 AS rooms_occupied, 0 AS arrivals, 0 AS departures, 0 AS check_ins
+              FROM stays, generate_series(in_date, out_date - 1, '1 day') AS night
+              UNION ALL
+              SELECT in_date, 0, 1, 0, checked_in::int FROM stays
+              UNION ALL
+              SELECT out_date, 0, 0, 1, 0 FROM stays
+            ) AS days
+            GROUP BY date;
+            """,
+            migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.0.1 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import reservations.api.utils.uuids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0012_dailyoccupancy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='guest',
+            name='id',
+            field=models.UUIDField(default=reservations.api.utils.uuids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='id',
+            field=models.UUIDField(default=reservations.api.utils.uuids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='id',
+            field=models.UUIDField(default=reservations.api.utils.uuids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.0.1 on 2026-10-19 09:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import reservations.api.utils.uuids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0013_time_ordered_primary_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hotel',
+            fields=[
+                ('id', models.UUIDField(default=reservations.api.utils.uuids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'ordering': ('name',),
+            },
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='number',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='hotel',
+            field=models.ForeignKey(db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='reservations.Hotel'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='hotel',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='reservations.Hotel'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='room',
+            unique_together={('hotel', 'number')},
+        ),
+        # Numbers of Rooms not in any Hotel stay unique among themselves, as unique_together does not compare NULLs.
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX room_number_without_hotel ON reservations_room (number) WHERE hotel_id IS NULL',
+            'DROP INDEX room_number_without_hotel',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.0.1 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0015_view_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='viewversion',
+            name='duration_ms',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='viewversion',
+            name='refreshed',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='viewversion',
+            name='row_count',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['hotel', 'updated'], name='reservation_hotel_updated'),
+        ),
+    ]
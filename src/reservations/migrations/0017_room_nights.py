@@ -0,0 +1,42 @@
+# Generated by Django 2.0.1 on 2026-10-19 10:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0016_view_refreshes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('night', models.DateField(db_index=True)),
+                ('reservation', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='reservations.Reservation')),
+                ('room', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='reservations.Room')),
+            ],
+            options={
+                'ordering': ('night', 'room'),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='roomnight',
+            unique_together={('room', 'night')},
+        ),
+        # Claim the nights of existing Reservations, the earliest made first should any overlap.
+        migrations.RunSQL(
+            """
+            INSERT INTO reservations_roomnight (room_id, night, reservation_id, updated)
+            SELECT room_id, night::date, id, now()
+            FROM reservations_reservation, generate_series(in_date, out_date - 1, '1 day') AS night
+            ORDER BY created, id
+            ON CONFLICT (room_id, night) DO NOTHING;
+            """,
+            migrations.RunSQL.noop
+        ),
+    ]
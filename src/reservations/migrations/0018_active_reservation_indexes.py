@@ -0,0 +1,48 @@
+# Generated by Django 2.0.1 on 2026-10-19 10:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0017_room_nights'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roomnight',
+            name='night',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='roomnight',
+            name='reservation',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='reservations.Reservation'),
+        ),
+        # Checked out Reservations no longer hold their nights.
+        migrations.RunSQL(
+            """
+            UPDATE reservations_roomnight SET reservation_id = NULL, updated = now()
+            FROM reservations_reservation
+            WHERE reservations_reservation.id = reservation_id AND reservations_reservation.status NOT IN ('pending', 'checked_in');
+            """,
+            migrations.RunSQL.noop
+        ),
+        # Only held nights are indexed, by the Reservation holding them and for availability by night.
+        migrations.RunSQL(
+            'CREATE INDEX roomnight_held_reservation ON reservations_roomnight (reservation_id) WHERE reservation_id IS NOT NULL;',
+            'DROP INDEX roomnight_held_reservation;'
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX roomnight_held_night ON reservations_roomnight (night) WHERE reservation_id IS NOT NULL;',
+            'DROP INDEX roomnight_held_night;'
+        ),
+        # Only active Reservations are indexed for the current and upcoming views.
+        migrations.RunSQL(
+            "CREATE INDEX reservation_active_hotel_out_date ON reservations_reservation (hotel_id, out_date) "
+            "WHERE status IN ('pending', 'checked_in');",
+            'DROP INDEX reservation_active_hotel_out_date;'
+        ),
+    ]
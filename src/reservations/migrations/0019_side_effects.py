@@ -0,0 +1,28 @@
+# Generated by Django 2.0.1 on 2026-10-19 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0018_active_reservation_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SideEffect',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=63)),
+                ('key', models.CharField(blank=True, max_length=63)),
+                ('created', models.DateTimeField()),
+                ('run_after', models.DateTimeField()),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.0.1 on 2026-10-19 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0019_side_effects'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewRefreshFailure',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=63)),
+                ('started', models.DateTimeField()),
+                ('duration_ms', models.FloatField()),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ('-started',),
+            },
+        ),
+        migrations.RemoveField(
+            model_name='viewversion',
+            name='row_count',
+        ),
+        migrations.AddIndex(
+            model_name='viewrefreshfailure',
+            index=models.Index(fields=['name', '-started'], name='viewrefreshfailure_name_start'),
+        ),
+    ]
@@ -33,6 +33,25 @@ CACHEOPS_REDIS = {
     'db': 1
 }
 
+# Front desk lists, full responses of Rooms and Guests, read replica stickiness and the shared tier of the Room and Guest
+# lookup cache are read and invalidated by every process, so must live in a cache every process shares: Redis, as run by
+# docker-compose, whenever REDIS_HOST is set. Without it each process keeps a cache of its own in memory, which only
+# suits a single process, such as runserver or the tests.
+if os.getenv('REDIS_HOST'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': 'redis://{}:{}/2'.format(os.getenv('REDIS_HOST'), os.getenv('REDIS_PORT', 6379)),
+            'KEY_PREFIX': 'reservations',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -40,6 +59,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_extensions',
     'django_pgviews',
     'rest_framework',
@@ -53,6 +73,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Profiles requests made by staff users which ask for it, see reservations.api.utils.profiling.
+    'reservations.api.utils.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -97,14 +119,85 @@ WSGI_APPLICATION = 'reservations.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DATABASE_ENGINE', 'django.db.backends.postgresql_psycopg2'),
+        # Connections are kept open in a bounded pool per process, see reservations.db.backends.postgresql_pool.
+        'ENGINE': os.getenv('DATABASE_ENGINE', 'reservations.db.backends.postgresql_pool'),
         'NAME': os.getenv('DATABASE_NAME', 'reservation_api'),
         'USER': os.getenv('DATABASE_USER', 'reservation_api_user'),
         'HOST': os.getenv('DATABASE_HOST', 'localhost'),
-        'PORT': os.getenv('DATABASE_PORT', 5432)
+        'PORT': os.getenv('DATABASE_PORT', 5432),
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DATABASE_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+            'HEALTH_CHECK_INTERVAL': float(os.getenv('DATABASE_POOL_HEALTH_CHECK_INTERVAL', 30)),
+        }
     }
 }
 
+
+def database_at(location):
+    """
+    A database like the default database, at host[:port][/database name]. Anything not given is the same as the
+    default database.
+    """
+    address, _, name = location.partition('/')
+    host, _, port = address.partition(':')
+    return dict(
+        DATABASES['default'],
+        HOST=host or DATABASES['default']['HOST'],
+        PORT=port or DATABASES['default']['PORT'],
+        NAME=name or DATABASES['default']['NAME'],
+        # Tests run against the default database only.
+        TEST={'MIRROR': 'default'}
+    )
+
+
+def configure_read_replicas(replicas):
+    """
+    Add a database for each read replica.
+    :param replicas: list of host[:port][/database name]
+    :return: list of database aliases
+    """
+    aliases = []
+    for index, replica in enumerate(replicas):
+        alias = 'replica_{}'.format(index)
+        DATABASES[alias] = database_at(replica)
+        aliases.append(alias)
+    return aliases
+
+
+def configure_hotel_databases(hotels):
+    """
+    Add a database for each Hotel with a database of its own.
+    :param hotels: list of <hotel id>@host[:port][/database name]
+    :return: dict of hotel id to database alias
+    """
+    aliases = {}
+    for index, hotel in enumerate(hotels):
+        hotel_id, _, location = hotel.partition('@')
+        alias = 'hotel_{}'.format(index)
+        DATABASES[alias] = database_at(location)
+        aliases[hotel_id] = alias
+    return aliases
+
+
+# Read replicas of the default database, e.g. DATABASE_REPLICAS=replica-1:5432,replica-2:5432/reservation_api
+# Each replica is given as host[:port][/database name], anything not given is the same as the default database.
+# Safe requests to the API are read from a replica, see reservations.api.utils.replicas.
+RESERVATIONS_READ_REPLICAS = configure_read_replicas(list(filter(None, os.getenv('DATABASE_REPLICAS', '').split(','))))
+
+# Hotels whose Rooms and Reservations live on a database of their own,
+# e.g. DATABASE_HOTELS=<hotel id>@hotel-db-1:5432,<hotel id>@hotel-db-2/reservation_api
+# Each database is given as host[:port][/database name], anything not given is the same as the default database.
+# Hotels and Guests are kept on the default database, and Guests must be replicated to each Hotel's database.
+# See reservations.api.utils.hotels.
+RESERVATIONS_HOTEL_DATABASES = configure_hotel_databases(list(filter(None, os.getenv('DATABASE_HOTELS', '').split(','))))
+
+DATABASE_ROUTERS = ['reservations.api.utils.hotels.HotelRouter']
+
+# How long reads from a client which has just written are routed to the default database,
+# so that the client reads its own writes regardless of replication lag.
+RESERVATIONS_REPLICA_STICKINESS_SECONDS = int(os.getenv('RESERVATIONS_REPLICA_STICKINESS_SECONDS', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -142,3 +235,59 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.0/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Reservation archive
+# Checked out Reservations moved out of the primary table are written here, see:
+# $ python3 manage.py archive_reservations
+
+RESERVATIONS_ARCHIVE_DIR = os.getenv('RESERVATIONS_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+
+
+# Front desk arrivals and departures
+# Seconds the lists of a date stay cached. Reservation saves invalidate them precisely,
+# so this only bounds how long the lists of past dates are kept. Warm the lists of today at rollover with:
+# $ python3 manage.py warm_front_desk
+
+RESERVATIONS_FRONT_DESK_CACHE_SECONDS = int(os.getenv('RESERVATIONS_FRONT_DESK_CACHE_SECONDS', 60 * 60 * 24 * 2))
+
+
+# Long polling
+# Served asynchronously (see reservations/asgi.py), clients which already hold the latest current and upcoming
+# Reservations wait at most this many seconds for them to change before being answered.
+
+RESERVATIONS_LONG_POLL_SECONDS = int(os.getenv('RESERVATIONS_LONG_POLL_SECONDS', 25))
+
+
+# Room and Guest lookup cache
+# Rooms and Guests looked up by id, such as to validate the Guest and Room of a Reservation, are cached in each process
+# for a few seconds, in front of the shared cache. Saves update the shared cache, other processes see them once their
+# own entries expire.
+RESERVATIONS_LOOKUP_CACHE_LOCAL_SIZE = int(os.getenv('RESERVATIONS_LOOKUP_CACHE_LOCAL_SIZE', 1000))
+RESERVATIONS_LOOKUP_CACHE_LOCAL_SECONDS = int(os.getenv('RESERVATIONS_LOOKUP_CACHE_LOCAL_SECONDS', 5))
+RESERVATIONS_LOOKUP_CACHE_SHARED_SECONDS = int(os.getenv('RESERVATIONS_LOOKUP_CACHE_SHARED_SECONDS', 60 * 60))
+
+
+# Response cache
+# Seconds full responses of Rooms and Guests stay cached. Room and Guest saves drop them precisely,
+# so this only bounds how long responses nobody reads again are kept.
+RESERVATIONS_RESPONSE_CACHE_SECONDS = int(os.getenv('RESERVATIONS_RESPONSE_CACHE_SECONDS', 60 * 60))
+
+
+# Side effects of writes
+# Saving a Reservation refreshes the current and upcoming view of its Hotel and the stay statistics of its Guest in the
+# saving transaction. When deferred, they are queued in it instead, so the save commits without waiting on them, and
+# run by workers, retried at most RESERVATIONS_SIDE_EFFECT_ATTEMPTS times:
+# $ python3 manage.py process_side_effects
+
+RESERVATIONS_DEFER_SIDE_EFFECTS = os.getenv('RESERVATIONS_DEFER_SIDE_EFFECTS') == 'true'
+RESERVATIONS_SIDE_EFFECT_ATTEMPTS = int(os.getenv('RESERVATIONS_SIDE_EFFECT_ATTEMPTS', 8))
+
+
+# Request profiling
+# Requests made by staff users with ?profile=1 or an X-Profile: 1 header are profiled, and their profiles written here.
+# Each profile reports the most expensive functions by cumulative time, and the plans of the slowest queries.
+
+RESERVATIONS_PROFILE_DIR = os.getenv('RESERVATIONS_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+RESERVATIONS_PROFILE_FUNCTIONS = int(os.getenv('RESERVATIONS_PROFILE_FUNCTIONS', 40))
+RESERVATIONS_PROFILE_EXPLAIN = int(os.getenv('RESERVATIONS_PROFILE_EXPLAIN', 3))
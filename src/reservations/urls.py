@@ -4,9 +4,14 @@ from reservations.api import views
 
 router = routers.DefaultRouter()
 router.register(r'guests', views.GuestViewSet)
+router.register(r'hotels', views.HotelViewSet)
+router.register(r'reservations/archived', views.ArchivedReservationViewSet)
 router.register(r'reservations/current_and_upcoming', views.CurrentAndUpcomingReservationViewSet)
 router.register(r'reservations', views.ReservationViewSet)
 router.register(r'rooms', views.RoomViewSet)
+router.register(r'reports/occupancy', views.OccupancyReportViewSet)
+router.register(r'imports', views.ImportViewSet, base_name='import')
+router.register(r'profiles', views.ProfileViewSet, base_name='profile')
 
 # Setup a router that does not require trailing slash
 slashless_router = routers.DefaultRouter(trailing_slash=False)
@@ -15,5 +20,6 @@ slashless_router.registry = router.registry[:]
 urlpatterns = [
     url(r'^', include(router.urls)),
     url(r'^', include(slashless_router.urls)),
+    url(r'^metrics$', views.MetricsView.as_view(), name='metrics'),
     url(r'^api-auth/', include('rest_framework.urls', namespace='rest_framework'))
 ]
@@ -0,0 +1,99 @@
+"""
+Warm up the application before it serves traffic, so the first requests to each process are no slower than the rest.
+
+Serving with gunicorn (see gunicorn.conf.py) loads the application once in the master process and forks workers from
+it. warm_application() runs in the master before the workers are forked, so everything it imports or caches in memory
+is shared with every worker. warm_worker() runs in each worker before it accepts requests, to open the connections
+only a worker may hold.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from reservations.api.models import (
+    CURRENT_AND_UPCOMING_DEFAULT_DAYS, CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT, DAILY_OCCUPANCY_STATEMENT,
+    GUEST_STAY_STATISTICS_STATEMENT, RESERVATION_STATUS_STATEMENT, ROOM_NIGHT_CLAIM_STATEMENT,
+    ROOM_NIGHT_RELEASE_ALL_STATEMENT, ROOM_NIGHT_RELEASE_STATEMENT, SIDE_EFFECT_ENQUEUE_STATEMENT, VIEW_VERSION_STATEMENT,
+    CurrentAndUpcomingReservation
+)
+from reservations.api.utils import front_desk
+from reservations.api.utils.hotels import hotel_databases
+from reservations.db.backends.postgresql_pool.pool import close_pools
+
+logger = logging.getLogger(__name__)
+
+# Statements prepared on every connection, by whether they only read.
+READ_STATEMENTS = (CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT,)
+WRITE_STATEMENTS = (
+    ROOM_NIGHT_CLAIM_STATEMENT, ROOM_NIGHT_RELEASE_STATEMENT, ROOM_NIGHT_RELEASE_ALL_STATEMENT, RESERVATION_STATUS_STATEMENT,
+    GUEST_STAY_STATISTICS_STATEMENT, DAILY_OCCUPANCY_STATEMENT, VIEW_VERSION_STATEMENT, SIDE_EFFECT_ENQUEUE_STATEMENT,
+)
+
+
+def cache_is_shared():
+    """
+    Whether the default cache is shared by every process, rather than kept in the memory of each.
+    Caches invalidated on writes, such as the front desk lists and full responses, are only kept current across
+    processes by a shared cache.
+    """
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def warm_application():
+    """
+    Import every view and serializer and prime the caches shared by every worker.
+    Database connections opened to do so are closed again, as connections must not be shared across a fork.
+    """
+    try:
+        # Resolving a URL imports the URLconf, and with it every view, serializer and model, and compiles its patterns.
+        get_resolver().url_patterns
+        reverse('api-root')
+
+        # Front desk lists are read by every terminal at once when the desk opens.
+        front_desk.warm(timezone.localdate())
+    except Exception:
+        logger.exception('Warming up the application failed, serving cold')
+    finally:
+        connections.close_all()
+        close_pools()
+
+
+def warm_worker(connections_per_database=1):
+    """
+    Open pooled connections to every database and prepare the hot path statements on each of them,
+    then read current and upcoming Reservations once to bring the view into the database's cache.
+    :param connections_per_database: connections to open to each database, as many as threads serving requests
+    """
+    write_databases = hotel_databases()
+    databases = write_databases + list(settings.RESERVATIONS_READ_REPLICAS)
+    # Every thread must hold its connection at once, so each opens a connection of its own rather than reusing one.
+    barrier = threading.Barrier(connections_per_database)
+
+    def warm():
+        try:
+            for database in databases:
+                statements = READ_STATEMENTS + (WRITE_STATEMENTS if database in write_databases else ())
+                for statement in statements:
+                    statement.prepare(database)
+            list(CURRENT_AND_UPCOMING_RESERVATIONS_STATEMENT.raw(CurrentAndUpcomingReservation.lookahead, [CURRENT_AND_UPCOMING_DEFAULT_DAYS]))
+        except Exception:
+            logger.exception('Warming up connections failed, serving cold')
+        finally:
+            try:
+                barrier.wait(timeout=30)
+            except threading.BrokenBarrierError:
+                pass
+            # Return the connections to this worker's pool, along with the statements prepared on them.
+            connections.close_all()
+
+    threads = [threading.Thread(target=warm) for _ in range(connections_per_database)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,28 @@
+"""
+Lean Django settings for management commands and workers, such as cron jobs and one-shot container tasks.
+
+These load only the apps Reservations need: no admin, sessions, messages, static files, authentication tokens or
+django_extensions, and no middleware or templates, which only serving requests needs. manage.py starts the commands
+listed in LEAN_COMMANDS with these settings unless DJANGO_SETTINGS_MODULE says otherwise. Commands which migrate or
+otherwise need every app, such as migrate, still start with reservations.settings.
+
+To compare what starting with each profile costs:
+$ python3 -m benchmarks.startup
+"""
+from reservations.settings import *  # NOQA
+
+INSTALLED_APPS = [
+    # Registers the trigram lookups Guest search filters by.
+    'django.contrib.postgres',
+    'django_pgviews',
+    'reservations.api.apps.ReservationsConfig'
+]
+
+MIDDLEWARE = []
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+# Commands and workers serve no requests, so they route none. System checks load this URLconf in place of every view.
+ROOT_URLCONF = 'reservations.worker_urls'
@@ -0,0 +1,4 @@
+"""
+The URLconf of commands and workers, see reservations.worker_settings. They serve no requests, so route none.
+"""
+urlpatterns = []